@@ -0,0 +1,82 @@
+"""
+Compare per-request post_update against the batched post_updates path.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_update --tags 500 --rounds 20
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+
+from core.geometry import SOLVER_LEAST_SQUARES, SOLVER_TRILATERATION
+from data.repositories.label_repository import LabelRepository
+from data.repositories.position_repository import PositionRepository
+from domain.entities.label import Label
+from domain.entities.update_request import UpdateRequest
+from domain.interactors.label_interactor import LabelInteractor
+
+ANCHORS = {"anchor-1": (0.0, 0.0), "anchor-2": (20.0, 0.0), "anchor-3": (0.0, 20.0), "anchor-4": (20.0, 20.0)}
+
+
+def make_interactor(db_path: str, tags: int, solver: str, refine_steps: int) -> LabelInteractor:
+    repository = LabelRepository(db_path, pooled=True, cache_size=tags + len(ANCHORS))
+    interactor = LabelInteractor(repository=repository, position_repository=PositionRepository(),
+                                 solver=solver, refine_steps=refine_steps)
+    for anchor_id in ANCHORS:
+        interactor.create(Label(id=anchor_id, own_password="corporate_secret", com_password="corporate_secret"))
+    interactor.configure_base_stations({
+        anchor_id: {"label_id": anchor_id, "x": x, "y": y} for anchor_id, (x, y) in ANCHORS.items()
+    })
+    for i in range(tags):
+        repository.add(Label(id=f"tag-{i}", own_password="corporate_secret", com_password="corporate_secret"))
+    return interactor
+
+
+def make_updates(tags: int, rng: random.Random) -> list:
+    updates = []
+    for i in range(tags):
+        x, y = rng.uniform(0, 20), rng.uniform(0, 20)
+        neighbors = {}
+        for anchor_id, (ax, ay) in ANCHORS.items():
+            distance = max(((x - ax) ** 2 + (y - ay) ** 2) ** 0.5, 0.1)
+            neighbors[anchor_id] = round(-59 - 20 * math.log10(distance))
+        updates.append(UpdateRequest(id=f"tag-{i}", neighbors=neighbors))
+    return updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--solver", default=SOLVER_TRILATERATION, choices=[SOLVER_TRILATERATION, SOLVER_LEAST_SQUARES])
+    parser.add_argument("--refine-steps", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        interactor = make_interactor(os.path.join(tmp, "bench.db"), args.tags, args.solver, args.refine_steps)
+        updates = make_updates(args.tags, rng)
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for update in updates:
+                interactor.post_update(update)
+        per_request = args.tags * args.rounds / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            interactor.post_updates(updates)
+        batched = args.tags * args.rounds / (time.perf_counter() - start)
+
+    print(f"tags={args.tags} rounds={args.rounds} solver={args.solver} refine_steps={args.refine_steps}")
+    print(f"per-request post_update: {per_request:,.0f} updates/s")
+    print(f"batched post_updates:    {batched:,.0f} updates/s ({batched / per_request:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
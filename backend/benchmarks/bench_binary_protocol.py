@@ -0,0 +1,109 @@
+"""
+Compare JSON /update ingestion against binary update frames.
+
+Run from the backend directory:
+    python -m benchmarks.bench_binary_protocol --frames 20000
+
+Reports raw decode throughput (JSON + pydantic per update vs one bulk
+binary decode) and in-process HTTP ingestion through routes:app (one JSON
+POST per update vs --per-body frames per POST to /update/binary).
+With --udp HOST:PORT the frames are also sent as datagrams to a running
+server started with GEOMAX_UDP_PORT, --per-body frames per datagram.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import tempfile
+import time
+
+from core.binary_protocol import encode_frame
+from domain.entities.update_request import UpdateRequest
+from udp_server import updates_from_frames
+
+
+def generate(frames: int, neighbors: int, rng: random.Random) -> list:
+    tags = [rng.randint(10000000, 99999999) for _ in range(frames)]
+    return [
+        (tag, {rng.randint(10000000, 99999999): rng.randint(-95, -40) for _ in range(neighbors)})
+        for tag in tags
+    ]
+
+
+async def http_ingest(json_bodies: list, binary_bodies: list) -> tuple:
+    import httpx
+    import routes
+
+    transport = httpx.ASGITransport(app=routes.app)
+    async with routes.app.router.lifespan_context(routes.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            for body in json_bodies:
+                await client.post("/update", content=body, headers={"content-type": "application/json"})
+            json_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for body in binary_bodies:
+                await client.post("/update/binary", content=body,
+                                  headers={"content-type": "application/octet-stream"})
+            binary_elapsed = time.perf_counter() - start
+    return json_elapsed, binary_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--neighbors", type=int, default=3)
+    parser.add_argument("--per-body", type=int, default=32, help="frames per binary POST or datagram")
+    parser.add_argument("--udp", help="HOST:PORT of a running UDP listener")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    updates = generate(args.frames, args.neighbors, random.Random(42))
+    json_bodies = [
+        json.dumps({"id": str(tag), "neighbors": {str(nid): rssi for nid, rssi in neighbors.items()}}).encode()
+        for tag, neighbors in updates
+    ]
+    frames = [encode_frame(tag, neighbors) for tag, neighbors in updates]
+    binary_bodies = [b"".join(frames[i:i + args.per_body]) for i in range(0, len(frames), args.per_body)]
+
+    start = time.perf_counter()
+    for body in json_bodies:
+        UpdateRequest.model_validate_json(body)
+    json_decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = updates_from_frames(b"".join(frames))
+    binary_decode = time.perf_counter() - start
+    assert len(decoded) == args.frames
+
+    json_bytes = sum(len(body) for body in json_bodies) / args.frames
+    binary_bytes = sum(len(frame) for frame in frames) / args.frames
+    print(f"frames={args.frames} neighbors={args.neighbors} per_body={args.per_body}")
+    print(f"decode  JSON + pydantic: {args.frames / json_decode:,.0f} updates/s, {json_bytes:.0f} bytes/update")
+    print(f"decode  binary bulk:     {args.frames / binary_decode:,.0f} updates/s, {binary_bytes:.0f} bytes/update")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("GEOMAX_DB_PATH", os.path.join(tmp, "bench.db"))
+        os.environ.setdefault("GEOMAX_HISTORY_DIR", os.path.join(tmp, "history"))
+        os.environ.setdefault("GEOMAX_SNAPSHOT_PATH", os.path.join(tmp, "positions.snapshot"))
+        json_http, binary_http = asyncio.run(http_ingest(json_bodies, binary_bodies))
+    print(f"ingest  JSON /update:          {args.frames / json_http:,.0f} updates/s")
+    print(f"ingest  binary /update/binary: {args.frames / binary_http:,.0f} updates/s "
+          f"({json_http / binary_http:.1f}x)")
+
+    if args.udp:
+        host, port = args.udp.rsplit(":", 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        start = time.perf_counter()
+        for body in binary_bodies:
+            sock.sendto(body, (host, int(port)))
+        elapsed = time.perf_counter() - start
+        print(f"sent {args.frames} frames over UDP in {elapsed:.2f}s ({args.frames / elapsed:,.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
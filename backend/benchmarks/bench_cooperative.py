@@ -0,0 +1,104 @@
+"""
+Measure cooperative solve time and accuracy against the size of the tag graph.
+
+Tags are scattered over a square site with anchors on a grid, and every
+pair within radio range hears each other at the log-distance RSSI plus
+Gaussian shadowing. Each size is solved cold (no previous solution) and
+then warm, after every tag moved a little and reported again.
+
+Run from the backend directory:
+    python -m benchmarks.bench_cooperative --tags 100 1000 10000 --density 0.02
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from core.calibration import DEFAULT_PATH_LOSS_EXPONENT, DEFAULT_TX_POWER
+from core.cooperative import CooperativeLocalizer
+
+
+def simulate(rng: np.random.Generator, tags: int, args) -> tuple:
+    """Anchors, tag coordinates and a reports builder for one site"""
+    size = math.sqrt(tags / args.density)
+    ticks = np.arange(args.anchor_spacing / 2, size, args.anchor_spacing)
+    anchor_x, anchor_y = (grid.ravel() for grid in np.meshgrid(ticks, ticks))
+    base_stations = {f"anchor-{i}": {"x": float(x), "y": float(y)} for i, (x, y) in enumerate(zip(anchor_x, anchor_y))}
+    anchor_ids = list(base_stations)
+    truth = rng.uniform(0, size, (tags, 2))
+
+    def reports(points: np.ndarray) -> dict:
+        cell = args.radio_range
+        buckets = {}
+        for i, (x, y) in enumerate(points.tolist()):
+            buckets.setdefault((int(x // cell), int(y // cell)), []).append(i)
+        result = {}
+        for i, (x, y) in enumerate(points.tolist()):
+            cx, cy = int(x // cell), int(y // cell)
+            nearby = [j for gx in (cx - 1, cx, cx + 1) for gy in (cy - 1, cy, cy + 1)
+                      for j in buckets.get((gx, gy), ()) if j != i]
+            neighbor_ids = [f"tag-{j}" for j in nearby]
+            others = points[nearby] if nearby else np.empty((0, 2))
+            distances = np.hypot(others[:, 0] - x, others[:, 1] - y)
+            anchor_distances = np.hypot(anchor_x - x, anchor_y - y)
+            heard = anchor_distances < args.radio_range
+            neighbor_ids += [anchor_ids[k] for k in np.flatnonzero(heard).tolist()]
+            distances = np.concatenate([distances, anchor_distances[heard]])
+            in_range = distances < args.radio_range
+            rssi = (DEFAULT_TX_POWER - 10 * DEFAULT_PATH_LOSS_EXPONENT * np.log10(np.maximum(distances, 0.1))
+                    + rng.normal(0, args.noise, len(distances)))
+            result[f"tag-{i}"] = {
+                neighbor_id: int(round(value))
+                for neighbor_id, value, keep in zip(neighbor_ids, rssi.tolist(), in_range.tolist()) if keep
+            }
+        return result
+
+    return base_stations, truth, reports
+
+
+def run(localizer: CooperativeLocalizer, base_stations: dict, reports: dict, truth: np.ndarray, now: float) -> tuple:
+    for label_id, neighbors in reports.items():
+        localizer.observe(label_id, neighbors, now)
+    start = time.perf_counter()
+    solution = localizer.solve(base_stations, now=now)
+    elapsed = time.perf_counter() - start
+    errors = [math.hypot(x - truth[int(label_id[4:]), 0], y - truth[int(label_id[4:]), 1])
+              for label_id, (x, y) in solution.positions.items()]
+    return solution, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--density", type=float, default=0.02, help="tags per square meter")
+    parser.add_argument("--anchor-spacing", type=float, default=25.0, help="anchor grid step in meters")
+    parser.add_argument("--radio-range", type=float, default=20.0, help="meters")
+    parser.add_argument("--noise", type=float, default=2.0, help="RSSI shadowing sigma in dB")
+    parser.add_argument("--move", type=float, default=0.5, help="per-tick movement sigma in meters")
+    parser.add_argument("--iterations", type=int, default=10, help="Gauss-Newton steps")
+    parser.add_argument("--cg-iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"density={args.density}/m2 anchor_spacing={args.anchor_spacing}m range={args.radio_range}m "
+          f"noise={args.noise}dB")
+    print(f"{'tags':>7} {'edges':>8} {'indirect':>8} {'placed':>7}  {'cold ms':>8} {'iter':>4} "
+          f"{'warm ms':>8} {'iter':>4}  {'median err':>10} {'p90 err':>8}")
+    for tags in args.tags:
+        base_stations, truth, reports = simulate(rng, tags, args)
+        localizer = CooperativeLocalizer(max_age=60.0, max_iterations=args.iterations,
+                                         cg_iterations=args.cg_iterations)
+        first = reports(truth)
+        indirect = sum(1 for neighbors in first.values()
+                       if sum(neighbor_id in base_stations for neighbor_id in neighbors) < 3)
+        cold, cold_time, _ = run(localizer, base_stations, first, truth, 0.0)
+        truth += rng.normal(0, args.move, truth.shape)
+        warm, warm_time, errors = run(localizer, base_stations, reports(truth), truth, 1.0)
+        median, p90 = np.percentile(errors, [50, 90]) if errors else (math.nan, math.nan)
+        print(f"{tags:>7} {warm.edges:>8} {indirect:>8} {len(warm.positions):>7}  {cold_time * 1000:>8.1f} "
+              f"{cold.iterations:>4} {warm_time * 1000:>8.1f} {warm.iterations:>4}  {median:>9.2f}m {p90:>7.2f}m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare label lookups per second between the per-call and pooled connection modes.
+
+Run from the backend directory:
+    python -m benchmarks.bench_datasource --labels 5000 --lookups 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from data.datasource import DictionaryManager
+
+
+def populate(db_path: str, labels: int) -> list:
+    manager = DictionaryManager(db_path, pooled=True)
+    ids = [str(10000000 + i) for i in range(labels)]
+    with manager._connection() as conn:
+        conn.executemany(
+            "INSERT INTO dictionaries (id, own_password, com_password) VALUES (?, ?, ?)",
+            [(label_id, "corporate_secret", "corporate_secret") for label_id in ids],
+        )
+    manager.close()
+    return ids
+
+
+def run(db_path: str, ids: list, lookups: int, pooled: bool) -> float:
+    manager = DictionaryManager(db_path, pooled=pooled)
+    rng = random.Random(42)
+    sample = [rng.choice(ids) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    for label_id in sample:
+        manager.get_dictionary_by_id(label_id)
+    elapsed = time.perf_counter() - start
+
+    manager.close()
+    return lookups / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        ids = populate(db_path, args.labels)
+
+        per_call = run(db_path, ids, args.lookups, pooled=False)
+        pooled = run(db_path, ids, args.lookups, pooled=True)
+
+    print(f"labels={args.labels} lookups={args.lookups}")
+    print(f"per-call connections: {per_call:,.0f} lookups/s")
+    print(f"pooled connections:   {pooled:,.0f} lookups/s ({pooled / per_call:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
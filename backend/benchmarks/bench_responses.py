@@ -0,0 +1,67 @@
+"""
+Measure /api/positions body costs: encoding per request as JSONResponse
+does, a cache rebuild after a change, and a cached read.
+
+A rebuild is timed for every coding the cache offers here, with the
+standard library and with orjson when it is installed. Cached reads only
+look up the bytes, whatever the coding.
+
+Run from the backend directory:
+    python -m benchmarks.bench_responses --tags 100000 --repeat 5
+"""
+import argparse
+import random
+import time
+
+from core.response_cache import AVAILABLE_ENCODINGS, ResponseCache, encode_stdlib_json, orjson
+from data.repositories.columnar_position_repository import ColumnarPositionRepository
+from domain.entities.position import Position
+from domain.interactors.label_interactor import LabelInteractor
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    repository = ColumnarPositionRepository()
+    repository.save_positions([
+        Position(label_id=f"tag-{i}", x=rng.uniform(0, 1000), y=rng.uniform(0, 1000), updated_at=0.0)
+        for i in range(args.tags)
+    ])
+    interactor = LabelInteractor(repository=None, position_repository=repository)
+
+    print(f"tags={args.tags}")
+    uncached = timed(lambda: encode_stdlib_json(interactor.get_all_positions()), args.repeat)
+    print(f"{'per request (json)':>24}: {uncached * 1000:8.1f} ms")
+    encoders = ["json"] + (["auto"] if orjson is not None else [])
+    for encoder in encoders:
+        for coding in (None,) + AVAILABLE_ENCODINGS:
+            cache = ResponseCache(encoder=encoder)
+            version = [0]
+
+            def rebuild():
+                version[0] += 1
+                return cache.get_or_build("positions", version[0], interactor.get_all_positions, coding)
+
+            rebuild_time = timed(rebuild, args.repeat)
+            size = len(rebuild().body)
+            hit = timed(lambda: cache.get("positions", version[0], coding), args.repeat)
+            label = f"rebuild ({'orjson' if encoder == 'auto' else 'json'}, {coding or 'identity'})"
+            print(f"{label:>24}: {rebuild_time * 1000:8.1f} ms, {size / 1024:8.0f} KiB, "
+                  f"cached read {hit * 1e6:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure /api/positions/clusters style reads with many viewers and moving tags.
+
+Viewers watch parts of the site and now and then pan or zoom, while a
+share of the fleet keeps reporting new positions between reads. Reads
+are timed with the tile cache and with the cache disabled, which
+rebuilds every tile from the columns.
+
+Run from the backend directory:
+    python -m benchmarks.bench_tiles --tags 100000 --reads 2000 --moves-per-read 20
+"""
+import argparse
+import random
+import time
+
+from data.repositories.columnar_position_repository import ColumnarPositionRepository
+from data.repositories.tile_repository import PositionTileRepository
+from domain.entities.position import Position
+
+
+def run(args, cache_size: int) -> tuple:
+    rng = random.Random(42)
+    repository = ColumnarPositionRepository()
+    tiles = PositionTileRepository(repository, tile_size=args.tile_size, grid=args.grid, cache_size=cache_size)
+    repository.subscribe(tiles.record)
+    repository.save_positions([
+        Position(label_id=f"tag-{i}", x=rng.uniform(0, args.size), y=rng.uniform(0, args.size), updated_at=0.0)
+        for i in range(args.tags)
+    ])
+
+    # Movers cluster in one corner, like a busy loading dock
+    movers = [f"tag-{i}" for i in range(args.tags // 100)]
+    # Each viewer keeps its view and now and then pans or zooms to another one
+    views = [None] * args.viewers
+    latencies = []
+    for _ in range(args.reads):
+        for _ in range(args.moves_per_read):
+            repository.save_position(Position(label_id=rng.choice(movers), x=rng.uniform(0, args.size / 8),
+                                              y=rng.uniform(0, args.size / 8), updated_at=0.0))
+        viewer = rng.randrange(args.viewers)
+        if views[viewer] is None or rng.random() < args.pan:
+            zoom = rng.randint(0, 3)
+            span = args.tile_size / 2 ** zoom * rng.uniform(1, 4)
+            x = rng.uniform(0, args.size - span)
+            y = rng.uniform(0, args.size - span)
+            views[viewer] = (zoom, x, y, x + span, y + span)
+        start = time.perf_counter()
+        tiles.get_clusters(*views[viewer])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies, tiles.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=100000)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--moves-per-read", type=int, default=20)
+    parser.add_argument("--viewers", type=int, default=50)
+    parser.add_argument("--pan", type=float, default=0.1, help="chance a viewer changes its view before a read")
+    parser.add_argument("--size", type=float, default=2000.0, help="site edge length in meters")
+    parser.add_argument("--tile-size", type=float, default=256.0)
+    parser.add_argument("--grid", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"tags={args.tags} viewers={args.viewers} reads={args.reads} moves/read={args.moves_per_read} "
+          f"size={args.size}m")
+    for label, cache_size in (("cached", 10000), ("uncached", 0)):
+        latencies, stats = run(args, cache_size)
+        mean = sum(latencies) / len(latencies)
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(f"{label:>8}: mean {mean * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, "
+              f"tile hit ratio {stats['hit_ratio']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
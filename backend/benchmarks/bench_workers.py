@@ -0,0 +1,136 @@
+"""
+Measure /update throughput of a live server with 1..N uvicorn workers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_workers --workers 1 2 4 --clients 8 --duration 10
+
+For every worker count serve.py is started on a fresh database with
+GEOMAX_POSITION_STORE=--store (sqlite by default), three anchors and --tags tags are
+created, and --clients client processes post /update over keep-alive
+connections for --duration seconds. Updates are solved inline
+(GEOMAX_INGEST_ASYNC=0) unless --async-ingest is given, so the numbers
+include solving and the shared store write. Scaling needs free cores for
+both the workers and the clients.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ANCHORS = ["1", "2", "3"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/positions")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def post(conn: http.client.HTTPConnection, path: str, body: dict) -> int:
+    conn.request("POST", path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def client(port: int, tags: int, duration: float, seed: int, results):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        body = {
+            "id": f"tag-{rng.randrange(tags)}",
+            "neighbors": {anchor: rng.randint(-85, -50) for anchor in ANCHORS},
+        }
+        if post(conn, "/update", body) == 200:
+            done += 1
+        else:
+            errors += 1
+    results.put((done, errors))
+
+
+def run(workers: int, args) -> tuple:
+    port = free_port()
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        GEOMAX_DB_PATH=os.path.join(tmp, "dictionaries.db"),
+        GEOMAX_HISTORY_DIR=os.path.join(tmp, "history"),
+        GEOMAX_SNAPSHOT_PATH=os.path.join(tmp, "positions.snapshot"),
+        GEOMAX_POSITION_STORE=args.store,
+        GEOMAX_INGEST_ASYNC="1" if args.async_ingest else "0",
+        GEOMAX_HOST="127.0.0.1",
+        GEOMAX_PORT=str(port),
+        GEOMAX_WORKERS=str(workers),
+    )
+    server = subprocess.Popen([sys.executable, "serve.py"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for label_id in ANCHORS + [f"tag-{i}" for i in range(args.tags)]:
+            post(conn, "/create", {"id": label_id})
+        post(conn, "/api/base-stations", {
+            "base_station_1": {"label_id": "1", "x": 0, "y": 0},
+            "base_station_2": {"label_id": "2", "x": 10, "y": 0},
+            "base_station_3": {"label_id": "3", "x": 0, "y": 10},
+        })
+
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=client, args=(port, args.tags, args.duration, seed, results))
+            for seed in range(args.clients)
+        ]
+        for process in clients:
+            process.start()
+        totals = [results.get() for _ in clients]
+        for process in clients:
+            process.join()
+        return sum(done for done, _ in totals), sum(errors for _, errors in totals)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--tags", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--store", default="sqlite", help="GEOMAX_POSITION_STORE, in-process stores need --workers 1")
+    parser.add_argument("--async-ingest", action="store_true", help="measure enqueue instead of inline solving")
+    args = parser.parse_args()
+
+    print(f"cpus={os.cpu_count()} clients={args.clients} tags={args.tags} duration={args.duration}s")
+    baseline = None
+    for workers in args.workers:
+        done, errors = run(workers, args)
+        rate = done / args.duration
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:10.0f} updates/s  x{rate / baseline:.2f}  errors={errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measure the per-update cost of zone evaluation with many zones and tags.
+
+Run from the backend directory:
+    python -m benchmarks.bench_zones --zones 5000 --tags 10000 --updates 100000
+"""
+import argparse
+import math
+import random
+import time
+
+from data.repositories.zone_repository import ZoneRepository
+from domain.entities.zone import Zone
+
+
+def random_zone(zone_id: str, rng: random.Random, size: float) -> Zone:
+    cx, cy = rng.uniform(0, size), rng.uniform(0, size)
+    radius = rng.uniform(2, 15)
+    vertices = rng.randint(3, 8)
+    polygon = [
+        (cx + radius * math.cos(2 * math.pi * i / vertices), cy + radius * math.sin(2 * math.pi * i / vertices))
+        for i in range(vertices)
+    ]
+    return Zone(id=zone_id, polygon=polygon)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, default=5000)
+    parser.add_argument("--tags", type=int, default=10000)
+    parser.add_argument("--updates", type=int, default=100000)
+    parser.add_argument("--size", type=float, default=500.0, help="site edge length in meters")
+    parser.add_argument("--cell-size", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    repository = ZoneRepository(cell_size=args.cell_size)
+    events = []
+    repository.subscribe(events.append)
+
+    start = time.perf_counter()
+    for i in range(args.zones):
+        repository.save_zone(random_zone(f"zone-{i}", rng, args.size))
+    indexing = time.perf_counter() - start
+
+    # Tags random-walk so they keep crossing zone borders
+    tags = [[rng.uniform(0, args.size), rng.uniform(0, args.size)] for _ in range(args.tags)]
+    moves = [(rng.randrange(args.tags), rng.gauss(0, 2), rng.gauss(0, 2)) for _ in range(args.updates)]
+
+    start = time.perf_counter()
+    for tag, dx, dy in moves:
+        position = tags[tag]
+        position[0] += dx
+        position[1] += dy
+        repository.evaluate(f"tag-{tag}", position[0], position[1])
+    elapsed = time.perf_counter() - start
+
+    print(f"zones={args.zones} tags={args.tags} updates={args.updates} cell_size={args.cell_size}")
+    print(f"zone indexing: {indexing * 1000:.1f} ms")
+    print(f"evaluate: {elapsed / args.updates * 1e6:.2f} us/update, {args.updates / elapsed:,.0f} updates/s")
+    print(f"transition events: {len(events)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Load-test the backend with a fleet of simulated ESP tags.
+
+Run from the backend directory (needs httpx):
+    python -m benchmarks.fleet --tags 1000 --interval 1 --duration 30
+    python -m benchmarks.fleet --url http://127.0.0.1:8000 --tags 5000 --output fleet.json
+
+Without --url the fleet talks to routes:app in-process through
+httpx.ASGITransport on a fresh temporary database. Reports per-endpoint
+requests/s and p50/p99 latency plus the distance between served
+positions and ground truth; --output saves the report as JSON so runs
+can be compared across changes. --interval 0 makes every tag post
+back-to-back for a closed-loop throughput test.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict
+
+from benchmarks.fleet.simulator import FleetConfig, simulate
+
+
+async def run(args, config: FleetConfig) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.0) as client:
+            return await simulate(client, config)
+
+    import routes
+
+    transport = httpx.ASGITransport(app=routes.app)
+    async with routes.app.router.lifespan_context(routes.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://fleet", timeout=30.0) as client:
+            return await simulate(client, config)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server, default is in-process")
+    parser.add_argument("--tags", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of updates after boot")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between updates of one tag")
+    parser.add_argument("--area", type=float, default=10.0, help="site edge length in meters")
+    parser.add_argument("--speed", type=float, default=1.0, help="tag speed in m/s")
+    parser.add_argument("--noise", type=float, default=2.0, help="RSSI noise sigma in dB")
+    parser.add_argument("--radio-range", type=float, default=50.0, help="meters")
+    parser.add_argument("--boot-spread", type=float, default=1.0, help="seconds over which tags boot")
+    parser.add_argument("--access-rate", type=float, default=0.0, help="chance of an /access call per update")
+    parser.add_argument("--tag-beacons", action="store_true",
+                        help="tags also hear each other, so anchors may drop out of the top 3")
+    parser.add_argument("--connections", type=int, default=64, help="client connection limit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    config = FleetConfig(
+        tags=args.tags,
+        duration=args.duration,
+        interval=args.interval,
+        area=args.area,
+        speed=args.speed,
+        noise=args.noise,
+        radio_range=args.radio_range,
+        boot_spread=args.boot_spread,
+        access_rate=args.access_rate,
+        tag_beacons=args.tag_beacons,
+        seed=args.seed,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.url:
+            os.environ.setdefault("GEOMAX_DB_PATH", os.path.join(tmp, "fleet.db"))
+            os.environ.setdefault("GEOMAX_HISTORY_DIR", os.path.join(tmp, "history"))
+            os.environ.setdefault("GEOMAX_SNAPSHOT_PATH", os.path.join(tmp, "positions.snapshot"))
+        result = asyncio.run(run(args, config))
+
+    report = {
+        "timestamp": time.time(),
+        "revision": git_revision(),
+        "target": args.url or "in-process",
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "env": {key: value for key, value in os.environ.items() if key.startswith("GEOMAX_")},
+        "config": asdict(config),
+        **result,
+    }
+
+    print(f"{config.tags} tags for {result['elapsed_s']:.1f}s against {report['target']}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<20} {stats['requests']:>8} req {stats['rps']:>9.1f} req/s "
+              f"p50 {stats['p50_ms']:7.2f} ms  p99 {stats['p99_ms']:7.2f} ms  {stats['statuses']}")
+    error = report["position_error"]
+    if "mean_m" in error:
+        print(f"position error: mean {error['mean_m']:.2f} m  p50 {error['p50_m']:.2f} m  "
+              f"p95 {error['p95_m']:.2f} m  ({error['tags_located']}/{error['tags_reported']} tags located)")
+    else:
+        print(f"position error: no tags located ({error['tags_reported']} reported)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
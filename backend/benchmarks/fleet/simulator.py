@@ -0,0 +1,218 @@
+"""
+Virtual tags that follow the metka.ino lifecycle against routes:app.
+
+Anchors and tags get random 8-digit ids like the firmware. Every tag
+posts /create at boot, then every `interval` seconds moves its ground
+truth position, builds the RSSI map it would have heard over ESP-NOW
+and posts its 3 strongest neighbors to /update. With `access_rate` a
+tag also calls /access for one of those neighbors.
+"""
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.spatial import SpatialGrid
+
+# Same path loss model as core.geometry.rssi_to_distance
+TX_POWER = -59
+PATH_LOSS_EXPONENT = 2.0
+# Weakest RSSI an ESP32 still reports
+RSSI_FLOOR = -100
+
+
+@dataclass
+class FleetConfig:
+    tags: int = 100
+    duration: float = 30.0
+    interval: float = 5.0
+    area: float = 10.0
+    speed: float = 1.0
+    noise: float = 2.0
+    radio_range: float = 50.0
+    boot_spread: float = 1.0
+    access_rate: float = 0.0
+    tag_beacons: bool = False
+    seed: int = 42
+
+
+def rssi_at(distance: float) -> int:
+    """Noise-free RSSI at a distance, inverse of rssi_to_distance"""
+    distance = max(distance, 0.1)
+    return round(TX_POWER - 10 * PATH_LOSS_EXPONENT * math.log10(distance))
+
+
+class LatencyRecorder:
+    """Per-endpoint request latencies and status codes"""
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def post(self, client, endpoint: str, body: dict) -> int:
+        start = time.perf_counter()
+        try:
+            status = (await client.post(endpoint, json=body)).status_code
+        except Exception:
+            # Transport errors are counted as status 0
+            status = 0
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][status] += 1
+        return status
+
+    def summary(self, elapsed: float) -> Dict[str, Dict]:
+        result = {}
+        for endpoint, samples in self.latencies.items():
+            latencies = np.array(samples) * 1000
+            result[endpoint] = {
+                "requests": len(samples),
+                "rps": len(samples) / elapsed if elapsed else 0.0,
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "max_ms": float(latencies.max()),
+                "statuses": {str(status): count for status, count in sorted(self.statuses[endpoint].items())},
+            }
+        return result
+
+
+class Fleet:
+    """Ground truth for anchors and tags plus the coroutines that drive them"""
+    def __init__(self, config: FleetConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        ids = self.rng.sample(range(10000000, 99999999), config.tags + 3)
+        self.anchor_ids = [str(i) for i in ids[:3]]
+        self.tag_ids = [str(i) for i in ids[3:]]
+        # Same layout as the default base stations, scaled to the area
+        self.anchors = {
+            self.anchor_ids[0]: (0.0, 0.0),
+            self.anchor_ids[1]: (config.area, 0.0),
+            self.anchor_ids[2]: (0.0, config.area),
+        }
+        self.truth: Dict[str, Tuple[float, float]] = {}
+        self.headings: Dict[str, float] = {}
+        # Ground truth at the moment of the last update each tag sent
+        self.reported: Dict[str, Tuple[float, float]] = {}
+        self._grid = SpatialGrid(max(config.radio_range, 1.0))
+        for tag_id in self.tag_ids:
+            position = (self.rng.uniform(0, config.area), self.rng.uniform(0, config.area))
+            self.truth[tag_id] = position
+            self.headings[tag_id] = self.rng.uniform(0, 2 * math.pi)
+            self._grid.update(tag_id, *position)
+        self.recorder = LatencyRecorder()
+
+    def base_stations_config(self) -> Dict:
+        return {
+            f"base_station_{i + 1}": {"label_id": anchor_id, "x": x, "y": y}
+            for i, (anchor_id, (x, y)) in enumerate(self.anchors.items())
+        }
+
+    def move(self, tag_id: str, dt: float):
+        """Random walk with reflection at the area border"""
+        x, y = self.truth[tag_id]
+        heading = self.headings[tag_id] + self.rng.gauss(0, 0.5)
+        step = self.config.speed * dt
+        x, y = x + step * math.cos(heading), y + step * math.sin(heading)
+        area = self.config.area
+        if not 0 <= x <= area:
+            x = min(max(x, 0.0), area)
+            heading = math.pi - heading
+        if not 0 <= y <= area:
+            y = min(max(y, 0.0), area)
+            heading = -heading
+        self.truth[tag_id] = (x, y)
+        self.headings[tag_id] = heading
+        self._grid.update(tag_id, x, y)
+
+    def heard(self, tag_id: str) -> Dict[str, int]:
+        """RSSI of every broadcaster in radio range, as OnDataRecv would collect it"""
+        x, y = self.truth[tag_id]
+        sources = [(anchor_id, math.hypot(ax - x, ay - y)) for anchor_id, (ax, ay) in self.anchors.items()]
+        if self.config.tag_beacons:
+            sources += [(other, distance) for other, distance in self._grid.within_radius(x, y, self.config.radio_range)
+                        if other != tag_id]
+        neighbors = {}
+        for source_id, distance in sources:
+            if distance > self.config.radio_range:
+                continue
+            rssi = rssi_at(distance) + round(self.rng.gauss(0, self.config.noise))
+            if rssi >= RSSI_FLOOR:
+                neighbors[source_id] = min(rssi, -1)
+        return neighbors
+
+    async def run_tag(self, client, tag_id: str, deadline: float):
+        config = self.config
+        await asyncio.sleep(self.rng.uniform(0, config.boot_spread))
+        if await self.recorder.post(client, "/create", {"id": tag_id}) != 200:
+            return
+        last_move = time.monotonic()
+        while True:
+            # loop() waits 0-100 ms before each broadcast
+            await asyncio.sleep(config.interval + self.rng.uniform(0, 0.1) if config.interval else 0)
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            self.move(tag_id, now - last_move)
+            last_move = now
+            heard = self.heard(tag_id)
+            top = dict(sorted(heard.items(), key=lambda item: item[1], reverse=True)[:3])
+            if not top:
+                continue
+            self.reported[tag_id] = self.truth[tag_id]
+            await self.recorder.post(client, "/update", {"id": tag_id, "neighbors": top})
+            if config.access_rate and self.rng.random() < config.access_rate:
+                await self.recorder.post(client, "/access", {"my_id": tag_id, "seen_id": next(iter(top))})
+
+    async def run(self, client) -> float:
+        """Boot the anchors, configure them and run every tag, returns the elapsed time"""
+        for anchor_id in self.anchor_ids:
+            await self.recorder.post(client, "/create", {"id": anchor_id})
+        await self.recorder.post(client, "/api/base-stations", self.base_stations_config())
+        start = time.monotonic()
+        deadline = start + self.config.duration
+        await asyncio.gather(*(self.run_tag(client, tag_id, deadline) for tag_id in self.tag_ids))
+        return time.monotonic() - start
+
+    def position_error(self, positions: List[Dict]) -> Dict:
+        """Compare server positions with the ground truth each tag last reported from"""
+        served = {p["label_id"]: (p["x"], p["y"]) for p in positions if not p.get("is_base_station")}
+        errors = np.array([
+            math.hypot(served[tag_id][0] - x, served[tag_id][1] - y)
+            for tag_id, (x, y) in self.reported.items() if tag_id in served
+        ])
+        result = {"tags_reported": len(self.reported), "tags_located": len(errors)}
+        if len(errors):
+            result.update({
+                "mean_m": float(errors.mean()),
+                "p50_m": float(np.percentile(errors, 50)),
+                "p95_m": float(np.percentile(errors, 95)),
+                "max_m": float(errors.max()),
+            })
+        return result
+
+
+async def wait_for_ingest(client, timeout: float = 30.0):
+    """Wait until the server's ingest queue is drained so positions are final"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = (await client.get("/api/stats/ingest")).json()
+        if not stats.get("enabled") or (stats["depth"] == 0 and stats.get("in_flight", 0) == 0):
+            return
+        await asyncio.sleep(0.05)
+
+
+async def simulate(client, config: FleetConfig) -> Dict:
+    """Run a fleet against an httpx client and collect the report"""
+    fleet = Fleet(config)
+    elapsed = await fleet.run(client)
+    await wait_for_ingest(client)
+    positions = (await client.get("/api/positions")).json()
+    return {
+        "elapsed_s": elapsed,
+        "endpoints": fleet.recorder.summary(elapsed),
+        "position_error": fleet.position_error(positions),
+    }
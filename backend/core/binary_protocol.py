@@ -0,0 +1,84 @@
+"""
+Compact binary frame format for tag updates.
+
+A frame is little-endian:
+    uint32 tag_id
+    uint8  count
+    count x (uint32 neighbor_id, int8 rssi)
+
+Ids are the numeric tag ids the firmware generates, sent as integers and
+turned back into decimal strings. A body or datagram may hold any number of
+frames back to back.
+"""
+import struct
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from core.errors import MalformedFrameException
+
+HEADER = struct.Struct("<IB")
+PAIR = struct.Struct("<Ib")
+MAX_NEIGHBORS = 255
+
+
+def encode_frame(tag_id: int, neighbors: Dict[int, int]) -> bytes:
+    """Encode one update frame, keeping at most MAX_NEIGHBORS neighbors"""
+    pairs = list(neighbors.items())[:MAX_NEIGHBORS]
+    return HEADER.pack(tag_id, len(pairs)) + b"".join(PAIR.pack(nid, rssi) for nid, rssi in pairs)
+
+
+def decode_frames(data: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode concatenated frames in bulk.
+
+    Only frame boundaries are found in Python; ids and RSSI values of all
+    frames are then gathered with NumPy in one pass.
+
+    Returns:
+        (tag_ids, counts, neighbor_ids, rssi) where the neighbors of frame i
+        are the next counts[i] entries of neighbor_ids/rssi
+    """
+    size = len(data)
+    offsets = []
+    counts = []
+    position = 0
+    while position < size:
+        if position + HEADER.size > size:
+            raise MalformedFrameException(f"truncated frame header at byte {position}")
+        count = data[position + 4]
+        offsets.append(position)
+        counts.append(count)
+        position += HEADER.size + PAIR.size * count
+    if position != size:
+        raise MalformedFrameException(f"truncated frame at byte {offsets[-1]}")
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    offsets = np.array(offsets, dtype=np.int64)
+    counts = np.array(counts, dtype=np.int64)
+    id_bytes = np.arange(4)
+
+    tag_ids = buffer[offsets[:, None] + id_bytes].copy().view("<u4").ravel()
+
+    total = int(counts.sum())
+    first_pair = np.cumsum(counts) - counts
+    pair_index = np.arange(total) - np.repeat(first_pair, counts)
+    pair_offsets = np.repeat(offsets + HEADER.size, counts) + PAIR.size * pair_index
+    neighbor_ids = buffer[pair_offsets[:, None] + id_bytes].copy().view("<u4").ravel()
+    rssi = buffer[pair_offsets + 4].view(np.int8)
+    return tag_ids, counts, neighbor_ids, rssi
+
+
+def decode_updates(data: bytes) -> List[Tuple[str, Dict[str, int]]]:
+    """Decode frames into (tag_id, {neighbor_id: rssi}) pairs with string ids"""
+    tag_ids, counts, neighbor_ids, rssi = decode_frames(data)
+    # Vectorized int -> decimal string conversion
+    neighbor_ids = neighbor_ids.astype(np.str_).tolist()
+    rssi = rssi.tolist()
+    ends = np.cumsum(counts).tolist()
+    updates = []
+    start = 0
+    for tag_id, end in zip(tag_ids.astype(np.str_).tolist(), ends):
+        updates.append((tag_id, dict(zip(neighbor_ids[start:end], rssi[start:end]))))
+        start = end
+    return updates
@@ -0,0 +1,121 @@
+"""
+Per-anchor path loss calibration and RSSI-to-distance lookup tables.
+
+A profile is the (tx_power, n) pair of the log-distance model used by
+core.geometry.rssi_to_distance, fitted from reference captures: RSSI
+readings a tag took at known distances from one anchor. Since an ESP32
+reports RSSI as an int8, every profile compiles into a 256-entry table
+indexed by the reading's two's complement byte, and the solvers turn
+readings into distances with an array index instead of a power.
+Readings outside the int8 range are clamped to it.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_TX_POWER = -59.0
+DEFAULT_PATH_LOSS_EXPONENT = 2.0
+# Plausible path loss exponents, from waveguide corridors to dense indoor clutter
+MIN_PATH_LOSS_EXPONENT = 1.0
+MAX_PATH_LOSS_EXPONENT = 6.0
+MIN_SAMPLES = 3
+
+# Every int8 reading, in the order of its unsigned byte: 0..127, -128..-1
+_RSSI_BY_BYTE = np.arange(256, dtype=np.uint8).view(np.int8).astype(np.float64)
+
+
+def distance_table(tx_power: float = DEFAULT_TX_POWER, n: float = DEFAULT_PATH_LOSS_EXPONENT) -> np.ndarray:
+    """
+    Distances in meters for every int8 RSSI, indexed by rssi & 0xFF.
+
+    Entry 0 is -1.0 like rssi_to_distance for a zero reading.
+    """
+    table = np.power(10.0, (tx_power - _RSSI_BY_BYTE) / (10 * n))
+    table[0] = -1.0
+    return table
+
+
+DEFAULT_DISTANCE_TABLE = distance_table()
+
+
+class DistanceTables:
+    """
+    Lookup tables of the calibrated anchors among a set of base stations.
+
+    `matrix` stacks the default table in row 0 and one row per calibrated
+    anchor, `index` maps anchor ids to their row; anchors without a
+    profile use row 0. `rows` holds the same tables as Python lists for
+    the scalar solver, where indexing a list is cheaper than numpy; a
+    list also takes a negative int8 reading directly as its index.
+    """
+    def __init__(self, base_stations: Dict[str, Dict[str, float]]):
+        profiles = [(bs_id, bs["tx_power"], bs["n"]) for bs_id, bs in base_stations.items() if "n" in bs]
+        self.index: Dict[str, int] = {bs_id: row + 1 for row, (bs_id, _, _) in enumerate(profiles)}
+        self.matrix = np.vstack([DEFAULT_DISTANCE_TABLE] + [distance_table(tx_power, n) for _, tx_power, n in profiles])
+        self.default_row: List[float] = self.matrix[0].tolist()
+        self.rows: Dict[str, List[float]] = {bs_id: self.matrix[row].tolist() for bs_id, row in self.index.items()}
+
+    def lookup(self, bs_ids: np.ndarray, rssi: np.ndarray) -> np.ndarray:
+        """Distances for parallel arrays of anchor rows (see `index`) and RSSI readings"""
+        # Negative indices wrap like rssi & 0xFF
+        return self.matrix[bs_ids, np.clip(rssi, -128, 127)]
+
+
+DEFAULT_DISTANCE_TABLES = DistanceTables({})
+
+
+def fit_profiles(captures: Dict[str, Tuple[Sequence[float], Sequence[int]]]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """
+    Least-squares fit of tx_power and n for many anchors at once.
+
+    rssi = tx_power - 10 * n * log10(distance) is linear in log10(distance),
+    so each anchor's fit is a simple linear regression. The samples of all
+    anchors are concatenated and the per-anchor sums are taken with
+    np.bincount, which fits every anchor in a handful of array passes.
+
+    Args:
+        captures: {anchor_id: (distances in meters, RSSI readings)}
+
+    Returns:
+        ({anchor_id: {"tx_power", "n", "rmse", "samples"}}, {anchor_id: error})
+    """
+    anchor_ids = list(captures)
+    if not anchor_ids:
+        return {}, {}
+    sizes = np.array([len(captures[anchor_id][0]) for anchor_id in anchor_ids])
+    groups = np.repeat(np.arange(len(anchor_ids)), sizes)
+    distances = np.concatenate([np.asarray(captures[anchor_id][0], dtype=np.float64) for anchor_id in anchor_ids])
+    rssi = np.concatenate([np.asarray(captures[anchor_id][1], dtype=np.float64) for anchor_id in anchor_ids])
+
+    x = -10.0 * np.log10(np.maximum(distances, 1e-3))
+    count = np.maximum(sizes, 1)
+    mean_x = np.bincount(groups, x, len(anchor_ids)) / count
+    mean_y = np.bincount(groups, rssi, len(anchor_ids)) / count
+    dx = x - mean_x[groups]
+    dy = rssi - mean_y[groups]
+    sxx = np.bincount(groups, dx * dx, len(anchor_ids))
+    sxy = np.bincount(groups, dx * dy, len(anchor_ids))
+
+    spread = sxx > 1e-9 * np.maximum(sizes, 1)
+    n = sxy / np.where(spread, sxx, 1.0)
+    tx_power = mean_y - n * mean_x
+    residuals = rssi - (tx_power[groups] + n[groups] * x)
+    rmse = np.sqrt(np.bincount(groups, residuals * residuals, len(anchor_ids)) / count)
+
+    profiles: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    for i, anchor_id in enumerate(anchor_ids):
+        if sizes[i] < MIN_SAMPLES:
+            errors[anchor_id] = f"needs at least {MIN_SAMPLES} samples"
+        elif not spread[i]:
+            errors[anchor_id] = "needs samples at two or more distances"
+        elif not MIN_PATH_LOSS_EXPONENT <= n[i] <= MAX_PATH_LOSS_EXPONENT:
+            errors[anchor_id] = f"fitted path loss exponent {n[i]:.2f} is out of range"
+        else:
+            profiles[anchor_id] = {
+                "tx_power": float(tx_power[i]),
+                "n": float(n[i]),
+                "rmse": float(rmse[i]),
+                "samples": int(sizes[i]),
+            }
+    return profiles, errors
@@ -0,0 +1,131 @@
+import os
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# Label storage
+DB_PATH = os.getenv("GEOMAX_DB_PATH", "dictionaries.db")
+DB_POOLED = env_bool("GEOMAX_DB_POOLED", True)
+LABEL_CACHE_SIZE = env_int("GEOMAX_LABEL_CACHE_SIZE", 50000)
+LABEL_CACHE_TTL = env_float("GEOMAX_LABEL_CACHE_TTL", 300.0)
+# Unknown ids are remembered for a shorter time
+LABEL_NEGATIVE_TTL = env_float("GEOMAX_LABEL_NEGATIVE_TTL", 30.0)
+# Memoized /access/batch decisions, dropped whenever a label changes
+ACCESS_CACHE_SIZE = env_int("GEOMAX_ACCESS_CACHE_SIZE", 100000)
+ACCESS_CACHE_TTL = env_float("GEOMAX_ACCESS_CACHE_TTL", 300.0)
+
+# Positioning: "trilateration" (3 strongest anchors) or "least_squares" (all anchors)
+SOLVER = os.getenv("GEOMAX_SOLVER", "trilateration")
+SOLVER_REFINE_STEPS = env_int("GEOMAX_SOLVER_REFINE_STEPS", 0)
+
+# Live position stream
+STREAM_MAX_PENDING = env_int("GEOMAX_STREAM_MAX_PENDING", 10000)
+# Minimum delay between pushes to one client, lets bursts coalesce
+STREAM_INTERVAL = env_float("GEOMAX_STREAM_INTERVAL", 0.5)
+STREAM_HEARTBEAT = env_float("GEOMAX_STREAM_HEARTBEAT", 15.0)
+
+# Asynchronous /update ingestion
+INGEST_ASYNC = env_bool("GEOMAX_INGEST_ASYNC", True)
+INGEST_MAX_DEPTH = env_int("GEOMAX_INGEST_MAX_DEPTH", 10000)
+INGEST_WORKERS = env_int("GEOMAX_INGEST_WORKERS", 2)
+INGEST_BATCH_SIZE = env_int("GEOMAX_INGEST_BATCH_SIZE", 256)
+
+# Position history
+HISTORY_DIR = os.getenv("GEOMAX_HISTORY_DIR", "history")
+HISTORY_CAPACITY = env_int("GEOMAX_HISTORY_CAPACITY", 128)
+HISTORY_MAX_TAGS = env_int("GEOMAX_HISTORY_MAX_TAGS", 20000)
+HISTORY_SEGMENT_SECONDS = env_int("GEOMAX_HISTORY_SEGMENT_SECONDS", 3600)
+HISTORY_RETENTION_SECONDS = env_float("GEOMAX_HISTORY_RETENTION_SECONDS", 7 * 24 * 3600)
+HISTORY_FLUSH_INTERVAL = env_float("GEOMAX_HISTORY_FLUSH_INTERVAL", 30.0)
+
+# Append-only log of accepted updates for replay.py
+UPDATE_LOG_ENABLED = env_bool("GEOMAX_UPDATE_LOG", True)
+UPDATE_LOG_DIR = os.getenv("GEOMAX_UPDATE_LOG_DIR", "update_log")
+UPDATE_LOG_MAX_BYTES = env_int("GEOMAX_UPDATE_LOG_MAX_BYTES", 64 * 1024 * 1024)
+UPDATE_LOG_FLUSH_INTERVAL = env_float("GEOMAX_UPDATE_LOG_FLUSH_INTERVAL", 1.0)
+UPDATE_LOG_MAX_QUEUE = env_int("GEOMAX_UPDATE_LOG_MAX_QUEUE", 100000)
+
+# Tags without an update for this many seconds are dropped from the position
+# store, 0 keeps them forever; the sweeper runs every expiry resolution
+POSITION_TTL = env_float("GEOMAX_POSITION_TTL", 600.0)
+POSITION_EXPIRY_RESOLUTION = env_float("GEOMAX_POSITION_EXPIRY_RESOLUTION", 1.0)
+
+# Cooperative localization of tags hearing fewer than 3 anchors from tag-to-tag
+# readings, solved every interval seconds over reports at most max age old; 0 disables
+COOPERATIVE_INTERVAL = env_float("GEOMAX_COOPERATIVE_INTERVAL", 1.0)
+COOPERATIVE_MAX_AGE = env_float("GEOMAX_COOPERATIVE_MAX_AGE", 10.0)
+COOPERATIVE_ITERATIONS = env_int("GEOMAX_COOPERATIVE_ITERATIONS", 10)
+# Share of one core the solver may take: after a solve the next one waits
+# at least the interval and long enough to stay under this load
+COOPERATIVE_MAX_LOAD = env_float("GEOMAX_COOPERATIVE_MAX_LOAD", 0.25)
+
+# Binary snapshot of positions and base stations for warm restarts, written
+# every interval seconds by in-memory stores; 0 disables
+SNAPSHOT_PATH = os.getenv("GEOMAX_SNAPSHOT_PATH", "positions.snapshot")
+SNAPSHOT_INTERVAL = env_float("GEOMAX_SNAPSHOT_INTERVAL", 30.0)
+
+# Grid cell edge in meters for the proximity index
+SPATIAL_CELL_SIZE = env_float("GEOMAX_SPATIAL_CELL_SIZE", 5.0)
+
+# Clustered tiles for /api/positions/clusters: tile edge in meters at zoom 0,
+# halved per zoom level, and clusters per tile edge
+TILE_SIZE = env_float("GEOMAX_TILE_SIZE", 1024.0)
+TILE_GRID = env_int("GEOMAX_TILE_GRID", 16)
+TILE_MAX_ZOOM = env_int("GEOMAX_TILE_MAX_ZOOM", 20)
+TILE_CACHE_SIZE = env_int("GEOMAX_TILE_CACHE_SIZE", 10000)
+TILE_MAX_PER_REQUEST = env_int("GEOMAX_TILE_MAX_PER_REQUEST", 256)
+
+# Encoded bodies of /api/positions, /api/positions/binary and /clusters kept
+# per store version: max cached responses, codings offered in order of
+# preference ("br" only when brotli is installed), smallest body worth
+# compressing, and "auto" (orjson when installed) or "json" encoding
+RESPONSE_CACHE_SIZE = env_int("GEOMAX_RESPONSE_CACHE_SIZE", 256)
+RESPONSE_ENCODINGS = [coding.strip() for coding in os.getenv("GEOMAX_RESPONSE_ENCODINGS", "br,gzip").split(",")
+                      if coding.strip()]
+RESPONSE_MIN_COMPRESS_SIZE = env_int("GEOMAX_RESPONSE_MIN_COMPRESS_SIZE", 1024)
+RESPONSE_GZIP_LEVEL = env_int("GEOMAX_RESPONSE_GZIP_LEVEL", 1)
+RESPONSE_BROTLI_QUALITY = env_int("GEOMAX_RESPONSE_BROTLI_QUALITY", 4)
+JSON_ENCODER = os.getenv("GEOMAX_JSON_ENCODER", "auto")
+
+# Zones
+ZONE_CELL_SIZE = env_float("GEOMAX_ZONE_CELL_SIZE", 5.0)
+# Zones over this many grid cells are tested against every position instead,
+# zones wider or taller than the max extent in meters are rejected
+ZONE_MAX_CELLS = env_int("GEOMAX_ZONE_MAX_CELLS", 4096)
+ZONE_MAX_EXTENT = env_float("GEOMAX_ZONE_MAX_EXTENT", 10000.0)
+ZONE_EVENT_QUEUE = env_int("GEOMAX_ZONE_EVENT_QUEUE", 1000)
+
+# Position storage backend: "dict" (pydantic objects), "columnar" (NumPy arrays)
+# or "sqlite" (table next to the label database, shared by uvicorn workers)
+POSITION_STORE = os.getenv("GEOMAX_POSITION_STORE", "columnar")
+# The sqlite store is shared by uvicorn workers. State kept in each process
+# (label and access caches, zones, the cooperative graph) would diverge
+# between them, so it is turned off with that store
+PER_PROCESS_STATE = POSITION_STORE != "sqlite"
+
+# Binary update datagrams, 0 disables the UDP listener
+UDP_HOST = os.getenv("GEOMAX_UDP_HOST", "0.0.0.0")
+UDP_PORT = env_int("GEOMAX_UDP_PORT", 0)
+
+# Prometheus /metrics and hot path timing hooks
+METRICS_ENABLED = env_bool("GEOMAX_METRICS", True)
+
+# HTTP server started by serve.py
+SERVER_HOST = os.getenv("GEOMAX_HOST", "0.0.0.0")
+SERVER_PORT = env_int("GEOMAX_PORT", 8000)
+SERVER_WORKERS = env_int("GEOMAX_WORKERS", 1)
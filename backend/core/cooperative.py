@@ -0,0 +1,324 @@
+"""
+Cooperative localization over the neighbour RSSI graph.
+
+The ESP-NOW broadcast of every tag is heard by every tag in range, so an
+update carries readings of other mobile tags besides the anchors. A tag
+hearing fewer than 3 anchors gets no fix of its own, but it is usually
+tied to neighbours that do. CooperativeLocalizer keeps the latest report
+of every tag as a sparse graph and, once per tick, solves the positions
+of all tags jointly as one sparse weighted least-squares problem over
+the edge lengths, with anchors held fixed. Each Gauss-Newton step is a
+conjugate gradient solve whose matrix products are np.bincount passes
+over the edge list, and the solve starts from the previous tick's
+solution, so a tick usually takes a few steps.
+"""
+import math
+import threading
+import time
+from itertools import chain, repeat
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from core.geometry import distance_tables
+from core.timing_wheel import TimingWheel
+
+# Distinct located neighbours a node needs before it is solved
+MIN_SUPPORT = 3
+
+
+class CooperativeSolution(NamedTuple):
+    # Tags that heard fewer than 3 anchors in their latest report
+    positions: Dict[str, Tuple[float, float]]
+    nodes: int
+    edges: int
+    iterations: int
+    # Root mean square of (solved - measured) edge length in meters
+    rms_error: float
+
+
+class CooperativeLocalizer:
+    """
+    Joint position solver over recent tag-to-tag and tag-to-anchor readings.
+
+    Only the latest report of each tag is kept, and reports older than
+    max_age seconds drop out of the graph. A node is solved once it has
+    MIN_SUPPORT neighbours that are anchors or solved themselves, found
+    by growing outward from the anchors. Readings in both directions of
+    a pair are merged into one edge at the geometric mean distance.
+    """
+    def __init__(self, max_age: float = 10.0, max_iterations: int = 10, cg_iterations: int = 10,
+                 tolerance: float = 0.05):
+        self.max_age = max_age
+        self.max_iterations = max_iterations
+        # Conjugate gradient iterations per Gauss-Newton step
+        self.cg_iterations = cg_iterations
+        # Root mean square node move in meters at which the iteration stops
+        self.tolerance = tolerance
+        # label_id -> neighbours {neighbour_id: rssi} of its latest report
+        self._reports: Dict[str, Dict[str, int]] = {}
+        self._expiry = TimingWheel(resolution=1.0)
+        # Previous tick's coordinates of every solved node, the warm start
+        self._solution: Dict[str, Tuple[float, float]] = {}
+        self._rng = np.random.default_rng(0)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def observe(self, label_id: str, neighbors: Dict[str, int], now: Optional[float] = None):
+        """Replace the report of a tag"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._reports[label_id] = neighbors
+            self._expiry.schedule(label_id, now + self.max_age)
+
+    def forget(self, label_id: str):
+        """Drop a deleted or expired tag from the graph"""
+        with self._lock:
+            self._reports.pop(label_id, None)
+            self._expiry.discard(label_id)
+            self._solution.pop(label_id, None)
+
+    def solve(self, base_stations: Dict[str, Dict[str, float]], solver_cache: Optional[dict] = None,
+              locate: Optional[Callable[[str], Optional[Tuple[float, float]]]] = None,
+              now: Optional[float] = None,
+              store: Optional[Callable[[Dict[str, Tuple[float, float]]], None]] = None) -> CooperativeSolution:
+        """
+        Solve every tag in the graph.
+
+        Args:
+            base_stations: anchor index, see PositionRepository.get_anchor_index
+            solver_cache: cache of the same anchor version, holds the distance tables
+            locate: stored coordinates of a tag, the starting point of tags
+                the previous tick did not solve
+            now: time the report ages are measured against
+            store: called with the returned positions while the lock is
+                held, so a concurrent forget() either drops the tag first
+                or runs after its position was stored
+
+        Returns:
+            CooperativeSolution; the solve covers all reporting tags, but only
+            the ones without a direct fix are returned
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for label_id in self._expiry.advance(now):
+                del self._reports[label_id]
+            reports = list(self._reports.items())
+            previous = self._solution
+
+        # Reporting tags first, then anchors that did not report
+        index: Dict[str, int] = {label_id: i for i, (label_id, _) in enumerate(reports)}
+        observers = len(index)
+        for bs_id in base_stations:
+            index.setdefault(bs_id, len(index))
+        size = len(index)
+        counts = np.fromiter((len(neighbors) for _, neighbors in reports), dtype=np.int64, count=observers)
+        edge_count = int(counts.sum())
+        neighbor_ids = chain.from_iterable(neighbors for _, neighbors in reports)
+        dst_index = np.fromiter(map(index.get, neighbor_ids, repeat(-1)), dtype=np.int64, count=edge_count)
+        rssi = np.fromiter(
+            chain.from_iterable(neighbors.values() for _, neighbors in reports), dtype=np.int64, count=edge_count)
+        src_index = np.repeat(np.arange(observers), counts)
+        known = (dst_index >= 0) & (dst_index != src_index)
+        src_index, dst_index, rssi = src_index[known], dst_index[known], rssi[known]
+        if not len(src_index):
+            with self._lock:
+                self._solution = {}
+            return CooperativeSolution({}, 0, 0, 0, 0.0)
+        label_ids = list(index)
+
+        tables = distance_tables(base_stations, solver_cache)
+        fixed = np.zeros(size, dtype=bool)
+        table_rows = np.zeros(size, dtype=np.int64)
+        px = np.full(size, np.nan)
+        py = np.full(size, np.nan)
+        for bs_id, bs in base_stations.items():
+            i = index[bs_id]
+            fixed[i] = True
+            table_rows[i] = tables.index.get(bs_id, 0)
+            px[i] = bs["x"]
+            py[i] = bs["y"]
+        for i in np.flatnonzero(~fixed[:observers]).tolist():
+            label_id = label_ids[i]
+            start = previous.get(label_id)
+            if start is None and locate is not None:
+                start = locate(label_id)
+            if start is not None:
+                px[i], py[i] = start
+
+        # Counted like LabelInteractor._count_anchors: tags with 3 anchors were placed directly
+        direct = np.bincount(src_index[fixed[dst_index]], minlength=size) >= MIN_SUPPORT
+
+        # The transmitting side's profile applies: anchors are calibrated, tags use the default
+        distance = tables.lookup(table_rows[dst_index], rssi)
+        usable = (distance > 0) & ~(fixed[src_index] & fixed[dst_index])
+        low = np.minimum(src_index, dst_index)[usable]
+        high = np.maximum(src_index, dst_index)[usable]
+        pairs, inverse = np.unique(low * size + high, return_inverse=True)
+        readings = np.bincount(inverse)
+        distance = np.exp(np.bincount(inverse, np.log(distance[usable])) / readings)
+        u = pairs // size
+        v = pairs % size
+        # Same 1/d^2 weighting as core.geometry.multilaterate, per reading
+        weight = readings / np.maximum(distance, 0.1) ** 2
+
+        located = fixed.copy()
+        while True:
+            support = (np.bincount(u[located[v]], minlength=size)
+                       + np.bincount(v[located[u]], minlength=size))
+            added = ~located & (support >= MIN_SUPPORT)
+            if not added.any():
+                break
+            self._guess(added & np.isnan(px), located, u, v, distance, weight, px, py)
+            located |= added
+
+        active = located[u] & located[v]
+        u, v, distance, weight = u[active], v[active], distance[active], weight[active]
+        free = located & ~fixed
+        iterations = self._refine(px, py, u, v, distance, weight, free) if free.any() else 0
+
+        residual = np.hypot(px[u] - px[v], py[u] - py[v]) - distance
+        rms_error = math.sqrt(float(np.mean(residual * residual))) if len(residual) else 0.0
+        solved = np.flatnonzero(free).tolist()
+        xs = px.tolist()
+        ys = py.tolist()
+        indirect = np.flatnonzero(free[:observers] & ~direct[:observers]).tolist()
+        with self._lock:
+            # Tags forgotten during the solve must not come back through its results
+            current = self._reports
+            self._solution = {label_ids[i]: (xs[i], ys[i]) for i in solved if label_ids[i] in current}
+            positions = {label_ids[i]: (xs[i], ys[i]) for i in indirect if label_ids[i] in current}
+            if store is not None and positions:
+                store(positions)
+        return CooperativeSolution(positions, int(located.sum()), len(u), iterations, rms_error)
+
+    def _guess(self, nodes: np.ndarray, located: np.ndarray, u: np.ndarray, v: np.ndarray,
+               distance: np.ndarray, weight: np.ndarray, px: np.ndarray, py: np.ndarray):
+        """
+        Start nodes without coordinates at the linearized least-squares fix
+        from their located neighbours, see core.geometry.multilaterate; the
+        per-node sums are taken with np.bincount. Nodes whose neighbours are
+        collinear start at their weighted centroid.
+        """
+        if not nodes.any():
+            return
+        size = len(nodes)
+        from_v = nodes[u] & located[v]
+        from_u = nodes[v] & located[u]
+        target = np.concatenate([u[from_v], v[from_u]])
+        source = np.concatenate([v[from_v], u[from_u]])
+        w = np.concatenate([weight[from_v], weight[from_u]])
+        d = np.concatenate([distance[from_v], distance[from_u]])
+        x = px[source]
+        y = py[source]
+        k = x * x + y * y - d * d
+
+        def mean(values: np.ndarray) -> np.ndarray:
+            return np.bincount(target, w * values, size) / total
+
+        total = np.maximum(np.bincount(target, w, size), 1e-300)
+        mean_x, mean_y, mean_k = mean(x), mean(y), mean(k)
+        sxx = 4 * (mean(x * x) - mean_x * mean_x)
+        sxy = 4 * (mean(x * y) - mean_x * mean_y)
+        syy = 4 * (mean(y * y) - mean_y * mean_y)
+        bx = 2 * (mean(x * k) - mean_x * mean_k)
+        by = 2 * (mean(y * k) - mean_y * mean_k)
+        det = sxx * syy - sxy * sxy
+        trace = sxx + syy
+        solvable = det > 1e-6 * trace * trace
+        det = np.where(solvable, det, 1.0)
+        guess_x = np.where(solvable, (syy * bx - sxy * by) / det, mean_x)
+        guess_y = np.where(solvable, (sxx * by - sxy * bx) / det, mean_y)
+        # Jitter in meters, nodes started at the same point would otherwise never separate
+        jitter = self._rng.normal(scale=0.5, size=(2, int(nodes.sum())))
+        px[nodes] = guess_x[nodes] + jitter[0]
+        py[nodes] = guess_y[nodes] + jitter[1]
+
+    def _refine(self, px: np.ndarray, py: np.ndarray, u: np.ndarray, v: np.ndarray,
+                distance: np.ndarray, weight: np.ndarray, free: np.ndarray) -> int:
+        """
+        Damped Gauss-Newton on the weighted edge length residuals, in place.
+
+        The normal equations J^T W J step = -J^T W r are sparse with one 2x2
+        block per edge endpoint, so each step is solved by conjugate gradients
+        preconditioned with the per-node diagonal blocks, and a product with
+        J^T W J is four np.bincount calls. Returns the number of steps.
+        """
+        size = len(px)
+        held = ~free
+
+        def scatter(values: np.ndarray) -> np.ndarray:
+            return np.bincount(u, values, size) - np.bincount(v, values, size)
+
+        def gather(values: np.ndarray) -> np.ndarray:
+            return np.bincount(u, values, size) + np.bincount(v, values, size)
+
+        iterations = 0
+        for iterations in range(1, self.max_iterations + 1):
+            dx = px[u] - px[v]
+            dy = py[u] - py[v]
+            length = np.maximum(np.hypot(dx, dy), 1e-9)
+            ex = dx / length
+            ey = dy / length
+            residual = weight * (length - distance)
+            gx = scatter(residual * ex)
+            gy = scatter(residual * ey)
+            gx[held] = 0.0
+            gy[held] = 0.0
+
+            # Diagonal blocks [[a, b], [b, c]], damped so a node with collinear neighbours stays put
+            a = gather(weight * ex * ex)
+            b = gather(weight * ex * ey)
+            c = gather(weight * ey * ey)
+            damping = 1e-2 * (a + c) + 1e-9
+            a += damping
+            c += damping
+            det = a * c - b * b
+
+            def product(zx: np.ndarray, zy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+                projected = weight * (ex * (zx[u] - zx[v]) + ey * (zy[u] - zy[v]))
+                hx = scatter(projected * ex) + damping * zx
+                hy = scatter(projected * ey) + damping * zy
+                hx[held] = 0.0
+                hy[held] = 0.0
+                return hx, hy
+
+            step_x = np.zeros(size)
+            step_y = np.zeros(size)
+            rx, ry = -gx, -gy
+            zx, zy = (c * rx - b * ry) / det, (a * ry - b * rx) / det
+            qx, qy = zx.copy(), zy.copy()
+            rz = rx @ zx + ry @ zy
+            for _ in range(self.cg_iterations):
+                if rz <= 1e-18:
+                    break
+                hx, hy = product(qx, qy)
+                alpha = rz / (qx @ hx + qy @ hy)
+                step_x += alpha * qx
+                step_y += alpha * qy
+                rx -= alpha * hx
+                ry -= alpha * hy
+                zx, zy = (c * rx - b * ry) / det, (a * ry - b * rx) / det
+                rz, previous = rx @ zx + ry @ zy, rz
+                qx = zx + rz / previous * qx
+                qy = zy + rz / previous * qy
+            # Halve the step of nodes it takes uphill, the linear model overshoots near flips
+            before = gather(weight * (length - distance) ** 2)
+            for _ in range(2):
+                moved_x = px + step_x
+                moved_y = py + step_y
+                moved_length = np.hypot(moved_x[u] - moved_x[v], moved_y[u] - moved_y[v])
+                after = gather(weight * (moved_length - distance) ** 2)
+                uphill = after > before
+                if not uphill.any():
+                    break
+                step_x[uphill] *= 0.5
+                step_y[uphill] *= 0.5
+            px += step_x
+            py += step_y
+            # A few weakly tied nodes keep wandering, so the typical move decides
+            if math.sqrt(float(np.mean(step_x[free] ** 2 + step_y[free] ** 2))) < self.tolerance:
+                break
+        return iterations
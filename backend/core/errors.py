@@ -6,4 +6,25 @@ class NotFoundLabelException(Exception):
 class DismatchPasswordException(Exception):
     def __init__(self, message):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class NotFoundZoneException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+class InvalidZoneException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+class NotFoundCalibrationException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class MalformedFrameException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
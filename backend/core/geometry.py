@@ -1,6 +1,13 @@
 import math
 from typing import Tuple, Optional, List
 
+import numpy as np
+
+from core.calibration import DEFAULT_DISTANCE_TABLES, DistanceTables
+
+SOLVER_TRILATERATION = "trilateration"
+SOLVER_LEAST_SQUARES = "least_squares"
+
 def rssi_to_distance(rssi: int, tx_power: int = -59, n: float = 2.0) -> float:
     """
     Convert RSSI to distance in meters using log-distance path loss model.
@@ -57,30 +64,196 @@ def trilaterate(p1: Tuple[float, float], d1: float,
     return (x, y)
 
 
-def calculate_position_from_signals(signals: dict, base_stations: dict) -> Optional[Tuple[float, float]]:
+def trilateration_coefficients(p1: Tuple[float, float],
+                               p2: Tuple[float, float],
+                               p3: Tuple[float, float]) -> Optional[Tuple[float, ...]]:
+    """
+    Precompute the distance-independent part of trilaterate for an anchor triple.
+
+    Returns:
+        (ex, fx, ey, fy, c0, f0) such that with C = d1^2 - d2^2 + c0 and
+        F = d2^2 - d3^2 + f0 the position is (ex*C + fx*F, ey*C + fy*F),
+        or None if the anchors are collinear
+    """
+    x1, y1 = p1
+    x2, y2 = p2
+    x3, y3 = p3
+
+    A = 2 * (x2 - x1)
+    B = 2 * (y2 - y1)
+    D = 2 * (x3 - x2)
+    E = 2 * (y3 - y2)
+
+    denominator = (A * E - B * D)
+    if abs(denominator) < 1e-10:
+        return None
+
+    c0 = - x1**2 + x2**2 - y1**2 + y2**2
+    f0 = - x2**2 + x3**2 - y2**2 + y3**2
+    return (E / denominator, -B / denominator, D / denominator, -A / denominator, c0, f0)
+
+
+# solver_cache.get default telling a missing entry from cached None (collinear anchors)
+_MISSING = object()
+
+
+def _cached_coefficients(solver_cache: dict, anchor_ids: Tuple[str, ...],
+                         base_stations: dict) -> Optional[Tuple[float, ...]]:
+    # One lookup: a cache entry may not outlive a membership test in another thread
+    coefficients = solver_cache.get(anchor_ids, _MISSING)
+    if coefficients is not _MISSING:
+        return coefficients
+    points = [(base_stations[bs_id]["x"], base_stations[bs_id]["y"]) for bs_id in anchor_ids]
+    coefficients = trilateration_coefficients(*points)
+    solver_cache[anchor_ids] = coefficients
+    return coefficients
+
+
+# solver_cache key of the DistanceTables built from the same base stations
+DISTANCE_TABLES_KEY = "distance_tables"
+
+
+def distance_tables(base_stations: dict, solver_cache: Optional[dict] = None) -> DistanceTables:
+    """
+    Lookup tables for the calibrated anchors among base_stations.
+
+    Base stations carrying "tx_power" and "n" are calibrated. The tables
+    are kept in solver_cache, which belongs to one anchor version.
+    """
+    if solver_cache is not None:
+        tables = solver_cache.get(DISTANCE_TABLES_KEY)
+        if tables is not None:
+            return tables
+    if any("n" in bs for bs in base_stations.values()):
+        tables = DistanceTables(base_stations)
+    else:
+        tables = DEFAULT_DISTANCE_TABLES
+    if solver_cache is not None:
+        solver_cache[DISTANCE_TABLES_KEY] = tables
+    return tables
+
+
+def multilaterate(anchors: List[Tuple[Tuple[float, float], float]],
+                  refine_steps: int = 0) -> Optional[Tuple[float, float]]:
+    """
+    Weighted least-squares position from any number of reference points.
+
+    Scalar counterpart of multilaterate_batch for a single tag, see there
+    for the formulation.
+    
+    Args:
+        anchors: list of ((x, y), distance) pairs
+        refine_steps: number of Gauss-Newton iterations
+    
+    Returns:
+        (x, y) coordinates, or None if fewer than 3 usable anchors or they are collinear
+    """
+    anchors = [(p, d) for p, d in anchors if d > 0]
+    if len(anchors) < 3:
+        return None
+
+    weights = [1.0 / max(d, 0.1) ** 2 for _, d in anchors]
+    total = sum(weights)
+    ks = [x * x + y * y - d * d for (x, y), d in anchors]
+    mean_x = sum(w * x for w, ((x, _), _) in zip(weights, anchors)) / total
+    mean_y = sum(w * y for w, ((_, y), _) in zip(weights, anchors)) / total
+    mean_k = sum(w * k for w, k in zip(weights, ks)) / total
+
+    sxx = sxy = syy = bx = by = 0.0
+    for w, ((x, y), _), k in zip(weights, anchors, ks):
+        cx = 2 * (x - mean_x)
+        cy = 2 * (y - mean_y)
+        ck = k - mean_k
+        sxx += w * cx * cx
+        sxy += w * cx * cy
+        syy += w * cy * cy
+        bx += w * cx * ck
+        by += w * cy * ck
+
+    det = sxx * syy - sxy * sxy
+    trace = sxx + syy
+    if det <= 1e-9 * trace * trace:
+        return None
+    px = (syy * bx - sxy * by) / det
+    py = (sxx * by - sxy * bx) / det
+
+    for _ in range(refine_steps):
+        jxx = jxy = jyy = rx = ry = 0.0
+        for w, ((x, y), d) in zip(weights, anchors):
+            dx = px - x
+            dy = py - y
+            r = max(math.hypot(dx, dy), 1e-9)
+            ux = dx / r
+            uy = dy / r
+            residual = r - d
+            jxx += w * ux * ux
+            jxy += w * ux * uy
+            jyy += w * uy * uy
+            rx += w * ux * residual
+            ry += w * uy * residual
+        det = jxx * jyy - jxy * jxy
+        if abs(det) <= 1e-12:
+            break
+        px -= (jyy * rx - jxy * ry) / det
+        py -= (jxx * ry - jxy * rx) / det
+
+    return (px, py)
+
+
+def calculate_position_from_signals(signals: dict, base_stations: dict,
+                                    solver: str = SOLVER_TRILATERATION,
+                                    refine_steps: int = 0,
+                                    solver_cache: Optional[dict] = None) -> Optional[Tuple[float, float]]:
     """
     Calculate position from signal strengths to multiple base stations.
     
     Args:
         signals: dict of {base_station_id: rssi}
-        base_stations: dict of {base_station_id: {"x": float, "y": float}}
+        base_stations: dict of {base_station_id: {"x": float, "y": float}}, plus
+            "tx_power" and "n" for calibrated anchors
+        solver: SOLVER_TRILATERATION uses the three strongest anchors,
+            SOLVER_LEAST_SQUARES uses every anchor the tag hears
+        refine_steps: Gauss-Newton iterations after the least-squares solve
+        solver_cache: optional dict of precomputed trilateration coefficients
+            keyed by anchor triple and distance tables, filled on demand
     
     Returns:
         (x, y) coordinates or None if not enough data
     """
-    # Get the three strongest signals that are also base stations
+    tables = distance_tables(base_stations, solver_cache)
+    rows, default_row = tables.rows, tables.default_row
     available_bases = []
     for bs_id, rssi in signals.items():
         if bs_id in base_stations:
-            distance = rssi_to_distance(rssi)
+            row = rows.get(bs_id, default_row)
+            # Python lists take negative indices, so row[rssi] is row[rssi & 0xFF] for int8 readings;
+            # anything else is clamped first, like DistanceTables.lookup, or it would wrap around
+            distance = row[rssi if -128 <= rssi <= 127 else max(-128, min(rssi, 127))]
             available_bases.append((bs_id, rssi, distance))
-    
+
+    if solver == SOLVER_LEAST_SQUARES:
+        anchors = []
+        for bs_id, _, distance in available_bases:
+            bs = base_stations[bs_id]
+            anchors.append(((bs["x"], bs["y"]), distance))
+        return multilaterate(anchors, refine_steps)
+
     if len(available_bases) < 3:
         return None
     
     # Sort by RSSI (strongest first) and take top 3
     available_bases.sort(key=lambda x: x[1], reverse=True)
     top_3 = available_bases[:3]
+
+    if solver_cache is not None:
+        coefficients = _cached_coefficients(solver_cache, tuple(bs_id for bs_id, _, _ in top_3), base_stations)
+        if coefficients is None:
+            return None
+        ex, fx, ey, fy, c0, f0 = coefficients
+        d1, d2, d3 = (distance for _, _, distance in top_3)
+        C = d1**2 - d2**2 + c0
+        F = d2**2 - d3**2 + f0
+        return (ex * C + fx * F, ey * C + fy * F)
     
     # Get positions and distances
     positions = []
@@ -96,3 +269,205 @@ def calculate_position_from_signals(signals: dict, base_stations: dict) -> Optio
                         positions[2], distances[2])
     
     return result
+
+
+def trilaterate_batch(points: np.ndarray, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trilaterate many tags at once.
+
+    Args:
+        points: (T, 3, 2) array with the three reference points of every tag
+        distances: (T, 3) array with the distances to those points
+
+    Returns:
+        (T, 2) array of positions and a (T,) boolean mask of solvable rows
+    """
+    x1, y1 = points[:, 0, 0], points[:, 0, 1]
+    x2, y2 = points[:, 1, 0], points[:, 1, 1]
+    x3, y3 = points[:, 2, 0], points[:, 2, 1]
+    d1, d2, d3 = distances[:, 0], distances[:, 1], distances[:, 2]
+
+    A = 2 * (x2 - x1)
+    B = 2 * (y2 - y1)
+    C = d1**2 - d2**2 - x1**2 + x2**2 - y1**2 + y2**2
+
+    D = 2 * (x3 - x2)
+    E = 2 * (y3 - y2)
+    F = d2**2 - d3**2 - x2**2 + x3**2 - y2**2 + y3**2
+
+    denominator = A * E - B * D
+    valid = np.abs(denominator) >= 1e-10
+    safe = np.where(valid, denominator, 1.0)
+
+    result = np.empty((len(points), 2))
+    result[:, 0] = (C * E - F * B) / safe
+    result[:, 1] = (C * D - A * F) / safe
+    return result, valid
+
+
+def multilaterate_batch(points: np.ndarray, distances: np.ndarray, mask: np.ndarray,
+                        refine_steps: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted linear least-squares multilateration over all anchors of many tags.
+
+    Each anchor contributes 2*a_i.p - R = |a_i|^2 - d_i^2 with R = |p|^2,
+    weighted by 1/d_i^2 since RSSI ranging error grows with distance.
+    Eliminating R leaves a 2x2 weighted system on anchor coordinates centred
+    at their weighted mean, solved in closed form for every tag. The estimate
+    can then be refined with Gauss-Newton steps on the true range residuals.
+
+    Args:
+        points: (T, K, 2) anchor coordinates, padded rows are ignored
+        distances: (T, K) distances to the anchors
+        mask: (T, K) boolean array of anchors that take part in the solve
+        refine_steps: number of Gauss-Newton iterations
+
+    Returns:
+        (T, 2) array of positions and a (T,) boolean mask of solvable rows
+    """
+    mask = mask & (distances > 0)
+    weights = np.where(mask, 1.0 / np.maximum(distances, 0.1) ** 2, 0.0)
+    total = np.maximum(weights.sum(axis=1, keepdims=True), 1e-300)
+
+    k = (points ** 2).sum(axis=2) - distances ** 2
+    mean_point = (weights[:, :, None] * points).sum(axis=1) / total
+    centred = 2 * (points - mean_point[:, None, :])
+    centred_k = k - (weights * k).sum(axis=1, keepdims=True) / total
+
+    wx = weights * centred[:, :, 0]
+    wy = weights * centred[:, :, 1]
+    sxx = (wx * centred[:, :, 0]).sum(axis=1)
+    sxy = (wx * centred[:, :, 1]).sum(axis=1)
+    syy = (wy * centred[:, :, 1]).sum(axis=1)
+    bx = (wx * centred_k).sum(axis=1)
+    by = (wy * centred_k).sum(axis=1)
+
+    # Scale-free singularity test: near-collinear anchors give det << trace^2
+    det = sxx * syy - sxy * sxy
+    trace = sxx + syy
+    valid = (mask.sum(axis=1) >= 3) & (det > 1e-9 * trace * trace)
+    safe_det = np.where(valid, det, 1.0)
+
+    result = np.empty((len(points), 2))
+    result[:, 0] = (syy * bx - sxy * by) / safe_det
+    result[:, 1] = (sxx * by - sxy * bx) / safe_det
+
+    for _ in range(refine_steps):
+        delta = result[:, None, :] - points
+        ranges = np.maximum(np.sqrt((delta ** 2).sum(axis=2)), 1e-9)
+        jacobian = delta / ranges[:, :, None]
+        residuals = ranges - distances
+
+        JtW = jacobian.transpose(0, 2, 1) * weights[:, None, :]
+        jtj = JtW @ jacobian
+        jtr = (JtW @ residuals[:, :, None])[:, :, 0]
+
+        det = jtj[:, 0, 0] * jtj[:, 1, 1] - jtj[:, 0, 1] * jtj[:, 1, 0]
+        step_ok = valid & (np.abs(det) > 1e-12)
+        safe_det = np.where(step_ok, det, 1.0)
+        step_x = (jtj[:, 1, 1] * jtr[:, 0] - jtj[:, 0, 1] * jtr[:, 1]) / safe_det
+        step_y = (jtj[:, 0, 0] * jtr[:, 1] - jtj[:, 1, 0] * jtr[:, 0]) / safe_det
+        result[:, 0] -= np.where(step_ok, step_x, 0.0)
+        result[:, 1] -= np.where(step_ok, step_y, 0.0)
+
+    return result, valid
+
+
+def calculate_positions_batch(signals_list: List[dict], base_stations: dict,
+                              solver: str = SOLVER_TRILATERATION,
+                              refine_steps: int = 0,
+                              solver_cache: Optional[dict] = None) -> List[Optional[Tuple[float, float]]]:
+    """
+    Batched calculate_position_from_signals for many tags.
+
+    Anchor selection stays per tag, the linear systems of all tags are
+    built and solved in one vectorized pass.
+
+    Args:
+        signals_list: list of {base_station_id: rssi} dicts, one per tag
+        base_stations: dict of {base_station_id: {"x": float, "y": float}}, plus
+            "tx_power" and "n" for calibrated anchors
+        solver: SOLVER_TRILATERATION or SOLVER_LEAST_SQUARES
+        refine_steps: Gauss-Newton iterations for SOLVER_LEAST_SQUARES
+        solver_cache: optional dict of precomputed trilateration coefficients
+            and distance tables
+
+    Returns:
+        List of (x, y) coordinates or None, in the order of signals_list
+    """
+    results: List[Optional[Tuple[float, float]]] = [None] * len(signals_list)
+    rows = []
+    selected = []
+    for index, signals in enumerate(signals_list):
+        available = [(bs_id, value) for bs_id, value in signals.items() if bs_id in base_stations]
+        if len(available) < 3:
+            continue
+        if solver != SOLVER_LEAST_SQUARES:
+            available.sort(key=lambda x: x[1], reverse=True)
+            available = available[:3]
+        rows.append(index)
+        selected.append(available)
+
+    if not rows:
+        return results
+
+    tables = distance_tables(base_stations, solver_cache)
+    if solver != SOLVER_LEAST_SQUARES and solver_cache is not None:
+        return _trilaterate_batch_cached(results, rows, selected, base_stations, solver_cache, tables)
+
+    width = max(len(anchors) for anchors in selected)
+    points = np.zeros((len(rows), width, 2))
+    rssi = np.zeros((len(rows), width), dtype=np.int64)
+    table_rows = np.zeros((len(rows), width), dtype=np.intp)
+    mask = np.zeros((len(rows), width), dtype=bool)
+    table_index = tables.index
+    for row, anchors in enumerate(selected):
+        for column, (bs_id, value) in enumerate(anchors):
+            bs = base_stations[bs_id]
+            points[row, column] = (bs["x"], bs["y"])
+            rssi[row, column] = value
+            if table_index:
+                table_rows[row, column] = table_index.get(bs_id, 0)
+            mask[row, column] = True
+    distances = tables.lookup(table_rows, rssi)
+
+    if solver == SOLVER_LEAST_SQUARES:
+        solved, valid = multilaterate_batch(points, distances, mask, refine_steps)
+    else:
+        solved, valid = trilaterate_batch(points, distances)
+
+    for row, (x, y), ok in zip(rows, solved.tolist(), valid.tolist()):
+        if ok:
+            results[row] = (x, y)
+    return results
+
+
+def _trilaterate_batch_cached(results: list, rows: List[int], selected: list, base_stations: dict,
+                              solver_cache: dict, tables: DistanceTables) -> List[Optional[Tuple[float, float]]]:
+    solvable = []
+    coefficients = []
+    rssi = []
+    table_rows = []
+    table_index = tables.index
+    for row, anchors in zip(rows, selected):
+        row_coefficients = _cached_coefficients(solver_cache, tuple(bs_id for bs_id, _ in anchors), base_stations)
+        if row_coefficients is None:
+            continue
+        solvable.append(row)
+        coefficients.append(row_coefficients)
+        rssi.append([value for _, value in anchors])
+        if table_index:
+            table_rows.append([table_index.get(bs_id, 0) for bs_id, _ in anchors])
+
+    if not solvable:
+        return results
+
+    ex, fx, ey, fy, c0, f0 = np.array(coefficients).T
+    rssi = np.array(rssi, dtype=np.int64)
+    table_rows = np.array(table_rows, dtype=np.intp) if table_index else np.zeros(rssi.shape, dtype=np.intp)
+    squared = tables.lookup(table_rows, rssi) ** 2
+    C = squared[:, 0] - squared[:, 1] + c0
+    F = squared[:, 1] - squared[:, 2] + f0
+    for row, x, y in zip(solvable, (ex * C + fx * F).tolist(), (ey * C + fy * F).tolist()):
+        results[row] = (x, y)
+    return results
@@ -0,0 +1,126 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class Subscription:
+    """Per-client pending changes, coalesced to the latest payload per key"""
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.overflowed = False
+        self._event = asyncio.Event()
+
+    def push(self, key: Hashable, payload: Any):
+        self.pending[key] = payload
+        self.pending.move_to_end(key)
+        if len(self.pending) > self.max_pending:
+            # Too far behind: drop the backlog and ask for a fresh snapshot
+            self.pending.clear()
+            self.overflowed = True
+        self._event.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> Tuple[Dict[Hashable, Any], bool]:
+        """
+        Wait for changes and take them all.
+
+        Returns (changes, resync); resync is True when the client fell behind
+        and must reload a full snapshot. Returns ({}, False) on timeout.
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}, False
+        self._event.clear()
+        batch, self.pending = dict(self.pending), OrderedDict()
+        resync, self.overflowed = self.overflowed, False
+        return batch, resync
+
+
+class CoalescingHub:
+    """
+    asyncio fan-out of keyed changes to many subscribers.
+
+    publish() may be called from any thread; delivery happens on the event
+    loop the hub is attached to. A slow subscriber only ever holds the latest
+    payload per key, bounded by max_pending.
+    """
+    def __init__(self, max_pending: int = 10000):
+        self.max_pending = max_pending
+        self._subscribers: List[Subscription] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_pending)
+        self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers = [s for s in self._subscribers if s is not subscription]
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, key: Hashable, payload: Any):
+        if not self._subscribers or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._dispatch(key, payload)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._dispatch, key, payload)
+
+    def _dispatch(self, key: Hashable, payload: Any):
+        for subscription in self._subscribers:
+            subscription.push(key, payload)
+
+
+class EventHub:
+    """
+    asyncio fan-out of events that must not be coalesced.
+
+    Every subscriber gets its own bounded asyncio.Queue; when a slow
+    subscriber's queue is full its oldest event is dropped and counted.
+    """
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._subscribers: List[asyncio.Queue] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers = self._subscribers + [queue]
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers = [q for q in self._subscribers if q is not queue]
+
+    def publish(self, event: Any):
+        if not self._subscribers or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._dispatch(event)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Any):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
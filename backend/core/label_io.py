@@ -0,0 +1,64 @@
+"""
+JSON lines and CSV codecs for bulk label import and export.
+
+Both formats carry the label fields id, own_password and com_password;
+CSV files start with a header row naming them. Rows are parsed and
+encoded lazily so a file of any size streams through in constant memory.
+"""
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, Union
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+FORMATS = (FORMAT_JSONL, FORMAT_CSV)
+FIELDS = ("id", "own_password", "com_password")
+
+
+def format_from_name(name: str, default: str = FORMAT_JSONL) -> str:
+    """Guess the format from a file name or media type"""
+    return FORMAT_CSV if name.lower().endswith("csv") else default
+
+
+def read_rows(lines: Iterable[str], fmt: str) -> Iterator[Union[Dict, ValueError]]:
+    """
+    Parse label rows, one item per data row.
+
+    A row that cannot be parsed is yielded as a ValueError so it keeps
+    its place and can be reported by row number.
+    """
+    if fmt == FORMAT_CSV:
+        for row in csv.DictReader(lines):
+            yield {key: row.get(key) for key in FIELDS}
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+            continue
+        yield row if isinstance(row, dict) else ValueError("not a JSON object")
+
+
+def write_rows(rows: Iterable[Dict], fmt: str, batch_size: int = 1000) -> Iterator[str]:
+    """Encode label rows, joined batch_size rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if fmt == FORMAT_CSV else None
+    if writer:
+        writer.writerow(FIELDS)
+    count = 0
+    for row in rows:
+        if writer:
+            writer.writerow([row[key] for key in FIELDS])
+        else:
+            buffer.write(json.dumps({key: row[key] for key in FIELDS}) + "\n")
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
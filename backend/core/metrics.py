@@ -0,0 +1,240 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Upper bounds in seconds, from a cache hit to a slow SQLite write
+DEFAULT_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter"""
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self._value}",
+        ]
+
+
+class _HistogramShard:
+    """Counts of one label set written by one thread"""
+    __slots__ = ("counts", "total")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets and optional labels.
+
+    Every thread writes to its own shard of each series, so observe() is
+    a bisect and two additions without a lock; render() sums the shards.
+    """
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._shards: Dict[Tuple[Tuple[str, ...], int], _HistogramShard] = {}
+        self._lock = threading.Lock()
+
+    def _get_shard(self, label_values: Tuple[str, ...]) -> _HistogramShard:
+        key = (label_values, threading.get_ident())
+        shard = self._shards.get(key)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(key, _HistogramShard(len(self.buckets) + 1))
+        return shard
+
+    def observe(self, seconds: float, *label_values: str):
+        shard = self._get_shard(label_values)
+        shard.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        shard.total += seconds
+
+    def stages(self, *label_values: str) -> "StageClock":
+        """Clock splitting one operation into stages, the stage is the last label"""
+        return StageClock(self, label_values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            shards = list(self._shards.items())
+        series: Dict[Tuple[str, ...], List] = {}
+        for (label_values, _), shard in shards:
+            counts, total = series.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0.0])
+            for index, count in enumerate(shard.counts):
+                counts[index] += count
+            series[label_values][1] = total + shard.total
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += counts[-1]
+            labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class StageClock:
+    """
+    Times consecutive stages of an operation into a labelled histogram.
+
+        since = clock.start()
+        ...
+        since = clock.mark("lookup", since)
+    """
+    def __init__(self, histogram: Histogram, label_values: Tuple[str, ...]):
+        self._histogram = histogram
+        self._label_values = label_values
+        self._buckets = histogram.buckets
+        # (stage, thread id) -> shard, resolved once
+        self._shards: Dict[Tuple[str, int], _HistogramShard] = {}
+
+    def start(self) -> float:
+        return time.perf_counter()
+
+    def mark(self, stage: str, since: float) -> float:
+        """Record the time since `since` for a stage, returns the new start"""
+        now = time.perf_counter()
+        key = (stage, threading.get_ident())
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = self._shards[key] = self._histogram._get_shard(self._label_values + (stage,))
+        elapsed = now - since
+        shard.counts[bisect.bisect_left(self._buckets, elapsed)] += 1
+        shard.total += elapsed
+        return now
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {float(self.read())}",
+        ]
+
+
+class _NullInstrument:
+    """Stands in for every instrument while metrics are disabled"""
+    def inc(self, amount: int = 1):
+        pass
+
+    def observe(self, seconds: float, *label_values: str):
+        pass
+
+    def stages(self, *label_values: str) -> "_NullInstrument":
+        return self
+
+    def start(self) -> float:
+        return 0.0
+
+    def mark(self, stage: str, since: float) -> float:
+        return 0.0
+
+
+NULL_INSTRUMENT = _NullInstrument()
+
+
+class MetricsRegistry:
+    """
+    Named instruments rendered as Prometheus text.
+
+    A disabled registry hands out a shared no-op instrument, so
+    instrumented code costs one method call per hook and keeps no state.
+    Instruments with the same name are shared between callers.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._instruments: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, create: Callable[[], object]):
+        if not self.enabled:
+            return NULL_INSTRUMENT
+        with self._lock:
+            instrument = self._instruments.get(name)
+            if instrument is None:
+                instrument = self._instruments[name] = create()
+            return instrument
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(name, lambda: Counter(name, help))
+
+    def histogram(self, name: str, help: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, label_names, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        return self._register(name, lambda: Gauge(name, help, read))
+
+    def render(self) -> str:
+        with self._lock:
+            instruments = list(self._instruments.values())
+        lines = []
+        for instrument in instruments:
+            lines.extend(instrument.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method and route template"""
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.histogram = registry.histogram(
+            "geomax_http_request_seconds",
+            "Time from receiving a request to the end of its handler, including body parsing",
+            ("method", "route"),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            self.histogram.observe(time.perf_counter() - start, scope["method"], path)
+
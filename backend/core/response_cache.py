@@ -0,0 +1,165 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Sequence
+
+# Optional faster encoder and compressor, used when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content codings the cache can produce, in order of preference
+AVAILABLE_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+IDENTITY = "identity"
+
+
+def encode_stdlib_json(content: Any) -> bytes:
+    """Compact UTF-8 JSON, the same bytes JSONResponse sends"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_json(content: Any) -> bytes:
+    """Compact UTF-8 JSON with orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return encode_stdlib_json(content)
+
+
+class CachedBody(NamedTuple):
+    version: int
+    body: bytes
+    # Content-Encoding of body, None when sent as is
+    encoding: Optional[str]
+
+
+class _Entry:
+    __slots__ = ("version", "variants")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        # coding -> bytes; None marks a coding not worth it for this body
+        self.variants: Dict[str, Optional[bytes]] = {IDENTITY: body}
+
+
+class ResponseCache:
+    """
+    Encoded response bodies of read endpoints for the current state version.
+
+    Each key holds the JSON (or raw) bytes built for one version of the
+    position store, plus the compressed variants clients asked for, each
+    made once on first use. Builds are single-flight: concurrent readers
+    of a stale key wait for the first one and then share its bytes.
+    Versions only grow, so a body built for a newer version also answers
+    readers that saw an older one.
+    """
+    def __init__(self, max_size: int = 256, encodings: Sequence[str] = AVAILABLE_ENCODINGS, min_size: int = 1024,
+                 gzip_level: int = 1, brotli_quality: int = 4, encoder: str = "auto"):
+        self.max_size = max_size
+        self.encodings = tuple(coding for coding in encodings if coding in AVAILABLE_ENCODINGS)
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # "auto" picks orjson when installed, "json" always uses the standard library
+        self.encode = encode_json if encoder == "auto" else encode_stdlib_json
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Striped build locks, a key always maps to the same one
+        self._build_locks = [threading.Lock() for _ in range(16)]
+        self.hits = 0
+        self.misses = 0
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Preferred coding both sides support for an Accept-Encoding header, None for identity"""
+        if not accept_encoding or not self.encodings:
+            return None
+        accepted = {}
+        for item in accept_encoding.split(","):
+            coding, _, params = item.strip().partition(";")
+            quality = 1.0
+            for param in params.split(";"):
+                name, _, value = param.strip().partition("=")
+                if name == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            accepted[coding.strip().lower()] = quality
+        best, best_quality = None, 0.0
+        for coding in self.encodings:
+            quality = accepted.get(coding, accepted.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def get(self, key: Hashable, version: int, encoding: Optional[str] = None) -> Optional[CachedBody]:
+        """The cached body if it is at least `version` and has the coding, None otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version < version or (encoding or IDENTITY) not in entry.variants:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._pick(entry, encoding)
+
+    def get_or_build(self, key: Hashable, version: int, build: Callable[[], Any], encoding: Optional[str] = None,
+                     raw: bool = False) -> CachedBody:
+        """
+        The cached body for `version`, building it first if needed. `build`
+        returns JSON-serializable content, or bytes when `raw` is set.
+        """
+        coding = encoding or IDENTITY
+        with self._build_locks[hash(key) % len(self._build_locks)]:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.version >= version and coding in entry.variants:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._pick(entry, encoding)
+                self.misses += 1
+            if entry is None or entry.version < version:
+                content = build()
+                entry = _Entry(version, content if raw else self.encode(content))
+            if coding not in entry.variants:
+                body = entry.variants[IDENTITY]
+                entry.variants[coding] = self._compress(body, coding) if len(body) >= self.min_size else None
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return self._pick(entry, encoding)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the size of the cached bodies"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": sum(len(body) for entry in self._entries.values()
+                             for body in entry.variants.values() if body is not None),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "encoder": "orjson" if self.encode is encode_json and orjson is not None else "json",
+                "encodings": list(self.encodings),
+            }
+
+    @staticmethod
+    def _pick(entry: _Entry, encoding: Optional[str]) -> CachedBody:
+        body = entry.variants.get(encoding) if encoding else None
+        if body is None:
+            return CachedBody(entry.version, entry.variants[IDENTITY], None)
+        return CachedBody(entry.version, body, encoding)
+
+    def _compress(self, body: bytes, coding: str) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
@@ -0,0 +1,202 @@
+import heapq
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+Cell = Tuple[int, int]
+
+
+class SpatialGrid:
+    """
+    Uniform grid index over labelled points, updated in place on every move.
+
+    Queries only visit the cells overlapping the searched area, so their cost
+    depends on local density rather than on the total number of points.
+    Points with a non-finite coordinate are not indexed, and queries around
+    one find nothing.
+    """
+    def __init__(self, cell_size: float = 5.0):
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Dict[str, Tuple[float, float]]] = {}
+        self._where: Dict[str, Cell] = {}
+        # Occupied cell extent, bounds nearest-neighbour rings. None when the
+        # grid is empty or a cell on its edge was emptied; recomputed on use
+        self._extent: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def update(self, key: str, x: float, y: float):
+        if not (math.isfinite(x) and math.isfinite(y)):
+            self.remove(key)
+            return
+        cell = self._cell(x, y)
+        old = self._where.get(key)
+        if old is not None and old != cell:
+            self._discard(key, old)
+        self._cells.setdefault(cell, {})[key] = (x, y)
+        self._where[key] = cell
+        if self._extent is not None:
+            min_x, min_y, max_x, max_y = self._extent
+            self._extent = (min(min_x, cell[0]), min(min_y, cell[1]), max(max_x, cell[0]), max(max_y, cell[1]))
+
+    def update_many(self, keys: List[str], xs: np.ndarray, ys: np.ndarray):
+        """
+        update() for many points, e.g. when restoring a snapshot.
+
+        An empty grid is filled in bulk: cells are computed and grouped with
+        NumPy and every cell's bucket is built with a single dict() call.
+        """
+        if self._where or not len(keys):
+            for key, x, y in zip(keys, xs.tolist(), ys.tolist()):
+                self.update(key, x, y)
+            return
+        finite = np.isfinite(xs) & np.isfinite(ys)
+        if not finite.all():
+            keys = np.asarray(keys, dtype=object)[finite].tolist()
+            xs, ys = xs[finite], ys[finite]
+            if not keys:
+                return
+        cx = np.floor(xs / self.cell_size).astype(np.int64)
+        cy = np.floor(ys / self.cell_size).astype(np.int64)
+        order = np.lexsort((cy, cx))
+        cx, cy = cx[order], cy[order]
+        starts = np.flatnonzero(np.r_[True, (cx[1:] != cx[:-1]) | (cy[1:] != cy[:-1])])
+        ends = np.r_[starts[1:], len(order)]
+        sorted_keys = np.asarray(keys, dtype=object)[order].tolist()
+        points = list(zip(xs[order].tolist(), ys[order].tolist()))
+        cells = list(zip(cx[starts].tolist(), cy[starts].tolist()))
+        for cell, start, end in zip(cells, starts.tolist(), ends.tolist()):
+            self._cells[cell] = dict(zip(sorted_keys[start:end], points[start:end]))
+            self._where.update(dict.fromkeys(sorted_keys[start:end], cell))
+        self._extent = (int(cx.min()), int(cy.min()), int(cx.max()), int(cy.max()))
+
+    def remove(self, key: str):
+        cell = self._where.pop(key, None)
+        if cell is not None:
+            self._discard(key, cell)
+
+    def clear(self):
+        self._cells.clear()
+        self._where.clear()
+        self._extent = None
+
+    def _discard(self, key: str, cell: Cell):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+                if self._extent is not None and (cell[0] in (self._extent[0], self._extent[2])
+                                                 or cell[1] in (self._extent[1], self._extent[3])):
+                    self._extent = None
+
+    def _bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        if self._extent is None and self._cells:
+            cxs, cys = zip(*self._cells)
+            self._extent = (min(cxs), min(cys), max(cxs), max(cys))
+        return self._extent
+
+    @staticmethod
+    def _finite(*values: float) -> bool:
+        return all(map(math.isfinite, values))
+
+    def _cells_in_box(self, x0: float, y0: float, x1: float, y1: float) -> Iterator[Dict[str, Tuple[float, float]]]:
+        cx0, cy0 = self._cell(x0, y0)
+        cx1, cy1 = self._cell(x1, y1)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            # Query area spans more cells than are occupied: scan occupied cells instead
+            for (cx, cy), bucket in self._cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield bucket
+            return
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket:
+                    yield bucket
+
+    def within_box(self, x0: float, y0: float, x1: float, y1: float) -> List[str]:
+        """Keys of points with x0 <= x <= x1 and y0 <= y <= y1"""
+        if not self._finite(x0, y0, x1, y1):
+            return []
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        return [
+            key
+            for bucket in self._cells_in_box(x0, y0, x1, y1)
+            for key, (x, y) in bucket.items()
+            if x0 <= x <= x1 and y0 <= y <= y1
+        ]
+
+    def within_radius(self, x: float, y: float, radius: float) -> List[Tuple[str, float]]:
+        """(key, distance) of points within radius, nearest first"""
+        if not self._finite(x, y, radius):
+            return []
+        found = []
+        radius_sq = radius * radius
+        for bucket in self._cells_in_box(x - radius, y - radius, x + radius, y + radius):
+            for key, (px, py) in bucket.items():
+                distance_sq = (px - x) ** 2 + (py - y) ** 2
+                if distance_sq <= radius_sq:
+                    found.append((key, math.sqrt(distance_sq)))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def nearest(self, x: float, y: float, k: int, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        (key, distance) of the k nearest points, searching rings of cells
+        outwards. Once the rings would have visited more cells than are
+        occupied, the occupied cells outside them are scanned instead, so a
+        far outlier or a k above the point count costs O(occupied cells).
+        """
+        if k <= 0 or not self._cells or not self._finite(x, y):
+            return []
+        cx, cy = self._cell(x, y)
+        min_x, min_y, max_x, max_y = self._bounds()
+        max_ring = max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+
+        best: List[Tuple[float, str]] = []  # max-heap of (-distance, key)
+
+        def visit(bucket: Dict[str, Tuple[float, float]]):
+            for key, (px, py) in bucket.items():
+                if key == exclude:
+                    continue
+                distance = math.hypot(px - x, py - y)
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, key))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, key))
+
+        visited = 0
+        for ring in range(max_ring + 1):
+            if visited >= len(self._cells):
+                for (px, py), bucket in self._cells.items():
+                    if max(abs(px - cx), abs(py - cy)) >= ring:
+                        visit(bucket)
+                break
+            for cell in self._ring(cx, cy, ring):
+                bucket = self._cells.get(cell)
+                if bucket:
+                    visit(bucket)
+            visited += 8 * ring or 1
+            # Anything outside the scanned rings is at least ring * cell_size away
+            if len(best) == k and -best[0][0] <= ring * self.cell_size:
+                break
+        return sorted(((key, -negative) for negative, key in best), key=lambda item: item[1])
+
+    @staticmethod
+    def _ring(cx: int, cy: int, ring: int) -> Iterator[Cell]:
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
@@ -0,0 +1,82 @@
+import math
+import time
+from typing import Dict, Hashable, List, Optional, Set
+
+import numpy as np
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel of per-key deadlines.
+
+    Slot i holds keys whose deadline falls in a tick (resolution seconds)
+    congruent to i, so advance() only visits the slots that came due
+    instead of scanning every key. Rescheduling a key to a later
+    deadline just records it: the key stays in its old slot and is moved
+    on when that slot comes due, so a tag that keeps reporting costs one
+    dict write per update and one move per TTL.
+    """
+    def __init__(self, resolution: float = 1.0, slots: int = 512, now: Optional[float] = None):
+        self.resolution = resolution
+        self._slots: List[Set[Hashable]] = [set() for _ in range(slots)]
+        self._deadlines: Dict[Hashable, float] = {}
+        # Tick of the next slot to visit; deadlines before it go into its slot
+        self._cursor = self._tick(time.time() if now is None else now)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Set or move the deadline of a key"""
+        previous = self._deadlines.get(key)
+        self._deadlines[key] = deadline
+        if previous is None or deadline < previous:
+            self._insert(key, deadline)
+
+    def schedule_many(self, keys: List[Hashable], deadlines: np.ndarray):
+        """schedule() for many keys at once, slots are computed with NumPy"""
+        ticks = np.maximum(np.floor(deadlines / self.resolution).astype(np.int64), self._cursor) % len(self._slots)
+        for key, deadline, slot in zip(keys, deadlines.tolist(), ticks.tolist()):
+            previous = self._deadlines.get(key)
+            self._deadlines[key] = deadline
+            if previous is None or deadline < previous:
+                self._slots[slot].add(key)
+
+    def discard(self, key: Hashable):
+        """Forget a key; its slot entry is dropped lazily"""
+        self._deadlines.pop(key, None)
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Remove and return the keys whose deadline is at or before now"""
+        now = time.time() if now is None else now
+        current = self._tick(now)
+        expired = []
+        # A full turn visits every slot, later ticks would repeat them
+        for tick in range(max(self._cursor, current - len(self._slots) + 1), current + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            keys = list(slot)
+            slot.clear()
+            for key in keys:
+                deadline = self._deadlines.get(key)
+                if deadline is None:
+                    continue
+                if deadline <= now:
+                    del self._deadlines[key]
+                    expired.append(key)
+                else:
+                    self._insert(key, deadline, current)
+        # The current tick may still hold keys due later within it
+        self._cursor = current
+        return expired
+
+    def _tick(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.resolution)
+
+    def _insert(self, key: Hashable, deadline: float, cursor: Optional[int] = None):
+        tick = max(self._tick(deadline), self._cursor if cursor is None else cursor)
+        self._slots[tick % len(self._slots)].add(key)
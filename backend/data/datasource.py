@@ -1,19 +1,95 @@
 import sqlite3
 import logging
-from typing import Dict, List, Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Прагмы для долгоживущих соединений в пуле
+POOLED_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Размер кэша подготовленных выражений на одно соединение
+STATEMENT_CACHE_SIZE = 256
+
+# Максимум параметров в одном запросе IN (...), ниже лимита SQLite в 999
+IN_QUERY_CHUNK = 500
+
+# Строк на один вызов executemany при массовой записи
+BULK_CHUNK = 1000
+
+UPSERT_DICTIONARY = '''
+    INSERT INTO dictionaries (id, own_password, com_password)
+    VALUES (?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        own_password = excluded.own_password,
+        com_password = excluded.com_password
+'''
+
+
 class DictionaryManager:
-    def __init__(self, db_path: str = "dictionaries.db"):
+    def __init__(self, db_path: str = "dictionaries.db", pooled: bool = False):
         self.db_path = db_path
+        self.pooled = pooled
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._pool: List[sqlite3.Connection] = []
         self._create_table()
+
+    def _open_pooled_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=5.0,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            # each connection is used by its own thread only; close() may run elsewhere
+            check_same_thread=False,
+        )
+        for pragma in POOLED_PRAGMAS:
+            conn.execute(pragma)
+        with self._pool_lock:
+            self._pool.append(conn)
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yield a connection wrapped in a transaction.
+
+        In pooled mode every thread keeps one long-lived WAL connection, so
+        repeated queries reuse sqlite3's per-connection prepared statement cache.
+        Otherwise a fresh connection is opened for each call.
+        """
+        if not self.pooled:
+            with sqlite3.connect(self.db_path) as conn:
+                yield conn
+            return
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_pooled_connection()
+            self._local.conn = conn
+        with conn:
+            yield conn
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+        self._local = threading.local()
     
     def _create_table(self) -> None:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS dictionaries (
@@ -36,7 +112,7 @@ class DictionaryManager:
             return False
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO dictionaries (id, own_password, com_password)
@@ -53,19 +129,111 @@ class DictionaryManager:
             return False
     
     def insert_dictionaries(self, dictionaries: List[Dict]) -> bool:
-        success_count = 0
+        """Вставка пачкой в одной транзакции; существующие id пропускаются"""
+        required_keys = {'id', 'own_password', 'com_password'}
+        rows = [(d['id'], d['own_password'], d['com_password'])
+                for d in dictionaries if all(key in d for key in required_keys)]
         total_count = len(dictionaries)
-        
-        for dictionary in dictionaries:
-            if self.insert_dictionary(dictionary):
-                success_count += 1
+        try:
+            with self._connection() as conn:
+                before = conn.total_changes
+                for start in range(0, len(rows), BULK_CHUNK):
+                    conn.executemany('''
+                        INSERT OR IGNORE INTO dictionaries (id, own_password, com_password)
+                        VALUES (?, ?, ?)
+                    ''', rows[start:start + BULK_CHUNK])
+                success_count = conn.total_changes - before
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при вставке словарей: {e}")
+            return False
         
         logger.info(f"Успешно добавлено {success_count} из {total_count} словарей")
         return success_count == total_count
     
+    def upsert_dictionaries(self, dictionaries: Iterable[Dict]) -> Dict:
+        """
+        Вставка или обновление потока словарей в одной транзакции.
+
+        Строки пишутся через executemany пачками по BULK_CHUNK; если пачка
+        не записалась, её строки повторяются по одной, чтобы найти ошибочные.
+        Транзакция открывается явно: без неё SAVEPOINT пачки сам начинал бы
+        транзакцию, а RELEASE фиксировал бы каждую пачку отдельно. При ошибке
+        SQLite откатывается весь поток, и все записанные строки считаются
+        неудачными.
+        Возвращает {"inserted", "updated", "failed", "errors": [{"row", "id", "error"}]},
+        row - номер строки во входном потоке, начиная с 0.
+        """
+        report = {"inserted": 0, "updated": 0, "failed": 0, "errors": []}
+        required_keys = ('id', 'own_password', 'com_password')
+        chunk = []
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for row, dictionary in enumerate(dictionaries):
+                    if isinstance(dictionary, Exception):
+                        self._report_error(report, row, None, str(dictionary))
+                        continue
+                    missing = [key for key in required_keys if not dictionary.get(key)]
+                    if missing:
+                        self._report_error(report, row, dictionary.get('id'), f"missing {', '.join(missing)}")
+                        continue
+                    chunk.append((row, tuple(str(dictionary[key]) for key in required_keys)))
+                    if len(chunk) >= BULK_CHUNK:
+                        self._upsert_chunk(conn, chunk, report)
+                        chunk = []
+                if chunk:
+                    self._upsert_chunk(conn, chunk, report)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при массовой записи словарей: {e}")
+            report["errors"].append({"row": None, "id": None, "error": str(e)})
+            # Rows still waiting in the current chunk are lost with the rest
+            report["failed"] += report["inserted"] + report["updated"] + len(chunk)
+            report["inserted"] = report["updated"] = 0
+            return report
+        
+        logger.info(f"Массовая запись: добавлено {report['inserted']}, обновлено {report['updated']}, "
+                    f"ошибок {report['failed']}")
+        return report
+    
+    def _upsert_chunk(self, conn: sqlite3.Connection, chunk: List, report: Dict) -> None:
+        ids = list(dict.fromkeys(values[0] for _, values in chunk))
+        existing = set()
+        for start in range(0, len(ids), IN_QUERY_CHUNK):
+            part = ids[start:start + IN_QUERY_CHUNK]
+            cursor = conn.execute(f"SELECT id FROM dictionaries WHERE id IN ({', '.join('?' * len(part))})", part)
+            existing.update(result[0] for result in cursor)
+        
+        conn.execute("SAVEPOINT bulk_chunk")
+        try:
+            conn.executemany(UPSERT_DICTIONARY, [values for _, values in chunk])
+            conn.execute("RELEASE SAVEPOINT bulk_chunk")
+            written = chunk
+        except sqlite3.Error:
+            conn.execute("ROLLBACK TO SAVEPOINT bulk_chunk")
+            conn.execute("RELEASE SAVEPOINT bulk_chunk")
+            written = []
+            for row, values in chunk:
+                try:
+                    conn.execute(UPSERT_DICTIONARY, values)
+                    written.append((row, values))
+                except sqlite3.Error as e:
+                    self._report_error(report, row, values[0], str(e))
+        
+        for _, values in written:
+            if values[0] in existing:
+                report["updated"] += 1
+            else:
+                report["inserted"] += 1
+                existing.add(values[0])
+    
+    @staticmethod
+    def _report_error(report: Dict, row: int, dict_id: Optional[str], error: str) -> None:
+        report["failed"] += 1
+        report["errors"].append({"row": row, "id": dict_id, "error": error})
+    
     def get_dictionary_by_id(self, dict_id) -> Optional[Dict]:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, own_password, com_password 
@@ -87,30 +255,69 @@ class DictionaryManager:
             logger.error(f"Ошибка при получении словаря: {e}")
             return None
     
-    def get_all_dictionaries(self) -> List[Dict]:
+    def get_dictionaries_by_ids(self, dict_ids: List[str]) -> Dict[str, Dict]:
+        """Найденные словари по id; отсутствующие id в результат не попадают"""
+        unique_ids = list(dict.fromkeys(dict_ids))
+        found = {}
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id, own_password, com_password 
-                    FROM dictionaries 
-                    ORDER BY id
-                ''')
-                results = cursor.fetchall()
-                
-                dictionaries = []
+                for start in range(0, len(unique_ids), IN_QUERY_CHUNK):
+                    chunk = unique_ids[start:start + IN_QUERY_CHUNK]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(f'''
+                        SELECT id, own_password, com_password
+                        FROM dictionaries
+                        WHERE id IN ({placeholders})
+                    ''', chunk)
+                    for result in cursor.fetchall():
+                        found[result[0]] = {
+                            'id': result[0],
+                            'own_password': result[1],
+                            'com_password': result[2]
+                        }
+            return found
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при получении словарей: {e}")
+            return {}
+    
+    def get_all_dictionaries(self) -> List[Dict]:
+        dictionaries = list(self.iter_dictionaries())
+        logger.info(f"Получено {len(dictionaries)} словарей")
+        return dictionaries
+    
+    def iter_dictionaries(self, batch_size: int = BULK_CHUNK) -> Iterator[Dict]:
+        """
+        Потоковое чтение всех словарей курсором, по batch_size строк за раз.
+
+        Использует отдельное соединение: генератор можно продолжать из
+        другого потока, а снимок WAL остаётся согласованным до конца чтения.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при получении всех словарей: {e}")
+            return
+        try:
+            cursor = conn.execute('''
+                SELECT id, own_password, com_password 
+                FROM dictionaries 
+                ORDER BY id
+            ''')
+            while True:
+                results = cursor.fetchmany(batch_size)
+                if not results:
+                    break
                 for result in results:
-                    dictionaries.append({
+                    yield {
                         'id': result[0],
                         'own_password': result[1],
                         'com_password': result[2]
-                    })
-                
-                logger.info(f"Получено {len(dictionaries)} словарей")
-                return dictionaries
+                    }
         except sqlite3.Error as e:
             logger.error(f"Ошибка при получении всех словарей: {e}")
-            return []
+        finally:
+            conn.close()
     
     def update_dictionary(self, dictionary: Dict) -> bool:
         required_keys = {'id', 'own_password', 'com_password'}
@@ -119,7 +326,7 @@ class DictionaryManager:
             return False
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE dictionaries 
@@ -140,7 +347,7 @@ class DictionaryManager:
     
     def delete_dictionary(self, dict_id) -> bool:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM dictionaries WHERE id = ?', (dict_id,))
                 
@@ -157,7 +364,7 @@ class DictionaryManager:
     
     def get_dictionaries_count(self) -> int:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT COUNT(*) FROM dictionaries')
                 count = cursor.fetchone()[0]
@@ -168,7 +375,7 @@ class DictionaryManager:
     
     def clear_all_dictionaries(self) -> bool:
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM dictionaries')
                 conn.commit()
@@ -0,0 +1,181 @@
+import math
+from typing import Dict, Iterator, List, MutableMapping, Optional
+
+import numpy as np
+
+from data.repositories.position_repository import PositionColumns, PositionRepository, PositionState
+from domain.entities.position import Position
+
+FLAG_ACTIVE = 1
+FLAG_BASE_STATION = 2
+
+
+class ColumnarPositionStore(MutableMapping):
+    """
+    Mapping of label id to Position backed by parallel NumPy arrays.
+
+    Each label owns a slot; deleted slots go to a free list and are reused.
+    Position objects are only materialized on item access, bulk readers use
+    columns() which returns read-only views of the arrays without copying.
+    The arrays are copy-on-write: once columns() has handed them out, the
+    next write copies them first, so a reader keeps an unchanging snapshot
+    and readers between two writes share it.
+    """
+    def __init__(self, capacity: int = 1024):
+        self._reset(capacity)
+
+    def _reset(self, capacity: int):
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._high_water = 0
+        self.label_ids = np.empty(capacity, dtype=object)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.distance_to_base = np.full(capacity, np.nan)
+        self.updated_at = np.full(capacity, np.nan)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        # Set while columns() views of the current arrays may be in use
+        self._shared = False
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._slots))
+
+    def __contains__(self, label_id) -> bool:
+        return label_id in self._slots
+
+    def __getitem__(self, label_id: str) -> Position:
+        slot = self._slots[label_id]
+        distance = self.distance_to_base[slot]
+        updated_at = self.updated_at[slot]
+        return Position.model_construct(
+            label_id=label_id,
+            x=float(self.x[slot]),
+            y=float(self.y[slot]),
+            is_base_station=bool(self.flags[slot] & FLAG_BASE_STATION),
+            distance_to_base=None if math.isnan(distance) else float(distance),
+            updated_at=None if math.isnan(updated_at) else float(updated_at),
+        )
+
+    def __setitem__(self, label_id: str, position: Position):
+        self._unshare()
+        slot = self._slots.get(label_id)
+        if slot is None:
+            slot = self._allocate()
+            self._slots[label_id] = slot
+            self.label_ids[slot] = label_id
+        self.x[slot] = position.x
+        self.y[slot] = position.y
+        self.distance_to_base[slot] = np.nan if position.distance_to_base is None else position.distance_to_base
+        self.updated_at[slot] = np.nan if position.updated_at is None else position.updated_at
+        self.flags[slot] = FLAG_ACTIVE | (FLAG_BASE_STATION if position.is_base_station else 0)
+
+    def __delitem__(self, label_id: str):
+        slot = self._slots.pop(label_id)
+        self._unshare()
+        self.flags[slot] = 0
+        self.label_ids[slot] = None
+        self._free.append(slot)
+
+    def copy(self) -> Dict[str, Position]:
+        return {label_id: self[label_id] for label_id in self._slots}
+
+    def load(self, label_ids: List[str], columns: PositionColumns):
+        """Replace the contents with the rows of columns, in bulk"""
+        count = len(label_ids)
+        self._reset(max(len(self.x), 1 << max(count - 1, 0).bit_length()))
+        self.label_ids[:count] = columns.label_ids
+        self.x[:count] = columns.x
+        self.y[:count] = columns.y
+        self.updated_at[:count] = columns.updated_at
+        self.flags[:count] = np.where(columns.is_base_station, FLAG_ACTIVE | FLAG_BASE_STATION, FLAG_ACTIVE)
+        self._slots = dict(zip(label_ids, range(count)))
+        self._high_water = count
+
+    def columns(self) -> PositionColumns:
+        """Read-only views of the used slots; free slots have active False"""
+        self._shared = True
+        size = self._high_water
+        flags = self.flags[:size]
+        return PositionColumns(
+            label_ids=self._view(self.label_ids, size),
+            x=self._view(self.x, size),
+            y=self._view(self.y, size),
+            is_base_station=(flags & FLAG_BASE_STATION) != 0,
+            updated_at=self._view(self.updated_at, size),
+            active=(flags & FLAG_ACTIVE) != 0,
+        )
+
+    @staticmethod
+    def _view(array: np.ndarray, size: int) -> np.ndarray:
+        view = array[:size]
+        view.flags.writeable = False
+        return view
+
+    def _unshare(self):
+        """Give writers private arrays while views of the current ones are out"""
+        if self._shared:
+            for name in ("label_ids", "x", "y", "distance_to_base", "updated_at", "flags"):
+                setattr(self, name, getattr(self, name).copy())
+            self._shared = False
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._high_water == len(self.x):
+            self._grow(2 * len(self.x))
+        slot = self._high_water
+        self._high_water += 1
+        return slot
+
+    def _grow(self, capacity: int):
+        # New arrays are private, old ones stay valid for readers holding views of them
+        for name, fill in (("label_ids", None), ("x", 0.0), ("y", 0.0),
+                           ("distance_to_base", np.nan), ("updated_at", np.nan), ("flags", 0)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._shared = False
+
+
+class ColumnarPositionRepository(PositionRepository):
+    """PositionRepository keeping positions in a ColumnarPositionStore"""
+    def __init__(self, cell_size: float = 5.0, capacity: int = 1024, ttl: Optional[float] = None,
+                 expiry_resolution: float = 1.0):
+        super().__init__(cell_size=cell_size, ttl=ttl, expiry_resolution=expiry_resolution)
+        self._positions = ColumnarPositionStore(capacity)
+
+    def get_columns(self) -> PositionColumns:
+        """
+        Get read-only views of the stored columns without copying them.
+        Writers copy the arrays before their next change, so the views stay
+        consistent after the lock is released.
+        """
+        with self._lock:
+            return self._positions.columns()
+
+    def export_state(self) -> PositionState:
+        """Copy positions and anchor state; writers only wait while the views are taken"""
+        with self._lock:
+            columns = self._positions.columns()
+            state = (self._base_stations_config, self._calibration, self._labels_created)
+        return PositionState(self._active_columns(columns), *state)
+
+    @staticmethod
+    def _active_columns(columns: PositionColumns) -> PositionColumns:
+        """Array copies of the active rows"""
+        active = columns.active
+        return PositionColumns(
+            label_ids=columns.label_ids[active],
+            x=columns.x[active],
+            y=columns.y[active],
+            is_base_station=columns.is_base_station[active],
+            updated_at=columns.updated_at[active],
+            active=np.ones(int(active.sum()), dtype=bool),
+        )
+
+    def _load_columns(self, label_ids: List[str], columns: PositionColumns):
+        self._positions.load(label_ids, columns)
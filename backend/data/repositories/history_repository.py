@@ -0,0 +1,333 @@
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from domain.entities.position import Position
+
+logger = logging.getLogger(__name__)
+
+# In-memory ring buffer record
+RING_DTYPE = np.dtype([("timestamp", "<f8"), ("x", "<f4"), ("y", "<f4")])
+# On-disk segment record, fixed layout so segments can be memory-mapped
+SEGMENT_DTYPE = np.dtype([("label_id", "S24"), ("timestamp", "<f8"), ("x", "<f4"), ("y", "<f4")])
+# Offset table next to each segment: one entry per run of a tag's records
+INDEX_DTYPE = np.dtype([("label_id", "S24"), ("offset", "<i8"), ("count", "<i8")])
+SEGMENT_PREFIX = "positions-"
+SEGMENT_SUFFIX = ".bin"
+INDEX_SUFFIX = ".idx"
+KEY_SIZE = SEGMENT_DTYPE["label_id"].itemsize
+
+
+def disk_key(label_id: str) -> bytes:
+    """
+    Fixed-width key of a tag in segment files: the UTF-8 id, or for ids
+    that do not fit a "~" and a hash of the id, instead of truncating it
+    """
+    key = label_id.encode()
+    if len(key) <= KEY_SIZE and not key.endswith(b"\0"):
+        return key
+    return b"~" + hashlib.blake2b(key, digest_size=(KEY_SIZE - 1) // 2).hexdigest().encode()
+
+
+def _index_path(path: str) -> str:
+    return path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+class _SegmentIndex:
+    """Offset table of one segment as read so far, sorted by tag for lookups"""
+    __slots__ = ("entries", "keys", "order", "covered")
+
+    def __init__(self):
+        self.entries = np.empty(0, dtype=INDEX_DTYPE)
+        self.keys = self.entries["label_id"]
+        self.order = np.empty(0, dtype=np.int64)
+        # Records from the start of the segment that the entries cover
+        self.covered = 0
+
+    def extend(self, entries: np.ndarray):
+        self.entries = np.concatenate([self.entries, entries])
+        self.order = np.argsort(self.entries["label_id"], kind="stable")
+        self.keys = self.entries["label_id"][self.order]
+        self.covered = int((entries["offset"] + entries["count"]).max(initial=self.covered))
+
+    def runs(self, key: bytes) -> np.ndarray:
+        lo, hi = np.searchsorted(self.keys, key, "left"), np.searchsorted(self.keys, key, "right")
+        return self.entries[self.order[lo:hi]]
+
+
+class PositionHistoryRepository:
+    """
+    Per-tag position history.
+
+    The latest `capacity` points of every tag live in one preallocated
+    (max_tags, capacity) ring buffer array. flush() appends the points not
+    yet on disk to one append-only binary file per time segment, sorted by
+    tag so each flush leaves one run per tag, and appends the offsets of
+    those runs to the segment's index file. Range queries look the tag up
+    in the index, memory-map the segment and read only its runs, then add
+    the unflushed tail from memory. Memory stays bounded by
+    max_tags * capacity, disk by retention.
+
+    Processes sharing a directory pass distinct `writer` names so each one
+    appends to its own files; queries read the segments of every writer.
+    """
+    def __init__(self, directory: str = "history", capacity: int = 128, max_tags: int = 20000,
+                 segment_seconds: int = 3600, retention_seconds: Optional[float] = 7 * 24 * 3600,
+                 writer: str = "", index_cache_size: int = 32):
+        self.directory = directory
+        self.writer = writer
+        self.capacity = capacity
+        self.max_tags = max_tags
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        os.makedirs(directory, exist_ok=True)
+
+        # np.zeros is lazily backed by the OS, untouched slots cost no memory
+        self._rings = np.zeros((max_tags, capacity), dtype=RING_DTYPE)
+        self._heads = np.zeros(max_tags, dtype=np.int64)
+        self._counts = np.zeros(max_tags, dtype=np.int64)
+        self._unflushed = np.zeros(max_tags, dtype=np.int64)
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free_slots: List[int] = list(range(max_tags - 1, -1, -1))
+        self._flushed_until: Dict[str, float] = {}
+        # Unflushed points of evicted tags, written by the next flush
+        self._orphans: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        # Segment indexes loaded by queries, refreshed as their files grow
+        self.index_cache_size = index_cache_size
+        self._indexes: "OrderedDict[str, _SegmentIndex]" = OrderedDict()
+        self._index_lock = threading.Lock()
+        # Records covered by the index of each segment this process appended to
+        self._covered: Dict[str, int] = {}
+        # Segment appends and index bookkeeping, one flush at a time
+        self._write_lock = threading.Lock()
+
+    def record(self, label_id: str, position: Optional[Position], timestamp: Optional[float] = None):
+        """Append a point; usable as a PositionRepository listener"""
+        if position is None:
+            self.forget(label_id)
+            return
+        if position.is_base_station:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            slot = self._slot_for(label_id)
+            head = self._heads[slot]
+            self._rings[slot, head] = (timestamp, position.x, position.y)
+            self._heads[slot] = (head + 1) % self.capacity
+            self._counts[slot] = min(self._counts[slot] + 1, self.capacity)
+            # Points overwritten before a flush are lost from disk history
+            self._unflushed[slot] = min(self._unflushed[slot] + 1, self.capacity)
+
+    def forget(self, label_id: str):
+        """Drop the in-memory ring of a tag, flushed history stays on disk"""
+        with self._lock:
+            slot = self._slots.pop(label_id, None)
+            if slot is not None:
+                self._release(slot)
+            self._flushed_until.pop(label_id, None)
+
+    def flush(self) -> int:
+        """Write unflushed points to their segment files, returns the number written"""
+        with self._lock:
+            chunks, self._orphans = self._orphans, []
+            for label_id, slot in self._slots.items():
+                if not self._unflushed[slot]:
+                    continue
+                chunk = self._unflushed_records(label_id, slot)
+                chunks.append(chunk)
+                self._unflushed[slot] = 0
+                self._flushed_until[label_id] = float(chunk["timestamp"][-1])
+            if not chunks:
+                return 0
+        pending = np.concatenate(chunks)
+
+        segments = (pending["timestamp"] // self.segment_seconds).astype(np.int64) * self.segment_seconds
+        order = np.lexsort((pending["timestamp"], pending["label_id"], segments))
+        pending = pending[order]
+        segments = segments[order]
+        with self._write_lock:
+            for segment in np.unique(segments):
+                self._append(self._segment_path(int(segment)), pending[segments == segment])
+            self._apply_retention()
+        return len(pending)
+
+    def get_history(self, label_id: str, start: Optional[float] = None,
+                    end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get (timestamps, x, y) arrays of a tag between start and end, oldest first"""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        key = disk_key(label_id)
+
+        parts = []
+        for segment, path in self._segments():
+            if segment + self.segment_seconds < start or segment > end:
+                continue
+            # The index is read before the data, whose records it covers are already written
+            index = self._segment_index(path)
+            try:
+                size = os.path.getsize(path) // SEGMENT_DTYPE.itemsize
+            except OSError:
+                continue
+            if not size:
+                continue
+            records = np.memmap(path, dtype=SEGMENT_DTYPE, mode="r", shape=(size,))
+            # Records past the index, e.g. of segments written before it existed, are scanned
+            entries = index.runs(key)
+            runs = [records[offset:offset + count]
+                    for offset, count in zip(entries["offset"].tolist(), entries["count"].tolist())]
+            tail = records[index.covered:]
+            runs.append(tail[tail["label_id"] == key])
+            for run in runs:
+                selected = run[(run["timestamp"] >= start) & (run["timestamp"] <= end)]
+                parts.append(selected[["timestamp", "x", "y"]].astype(RING_DTYPE))
+
+        with self._lock:
+            slot = self._slots.get(label_id)
+            if slot is not None:
+                tail = self._tail(slot, int(self._counts[slot]))
+                tail = tail[tail["timestamp"] > self._flushed_until.get(label_id, -np.inf)]
+                parts.append(tail[(tail["timestamp"] >= start) & (tail["timestamp"] <= end)])
+
+        if not parts:
+            empty = np.empty(0)
+            return empty, empty, empty
+        history = np.concatenate(parts)
+        history = history[np.argsort(history["timestamp"], kind="stable")]
+        return history["timestamp"], history["x"], history["y"]
+
+    def _slot_for(self, label_id: str) -> int:
+        slot = self._slots.get(label_id)
+        if slot is not None:
+            self._slots.move_to_end(label_id)
+            return slot
+        if not self._free_slots:
+            # Evict the least recently updated tag
+            evicted_id, evicted = self._slots.popitem(last=False)
+            if self._unflushed[evicted]:
+                self._orphans.append(self._unflushed_records(evicted_id, evicted))
+            self._flushed_until.pop(evicted_id, None)
+            self._release(evicted)
+        slot = self._free_slots.pop()
+        self._slots[label_id] = slot
+        return slot
+
+    def _release(self, slot: int):
+        self._heads[slot] = 0
+        self._counts[slot] = 0
+        self._unflushed[slot] = 0
+        self._free_slots.append(slot)
+
+    def _unflushed_records(self, label_id: str, slot: int) -> np.ndarray:
+        records = self._tail(slot, int(self._unflushed[slot]))
+        chunk = np.empty(len(records), dtype=SEGMENT_DTYPE)
+        chunk["label_id"] = disk_key(label_id)
+        chunk["timestamp"] = records["timestamp"]
+        chunk["x"] = records["x"]
+        chunk["y"] = records["y"]
+        return chunk
+
+    def _tail(self, slot: int, count: int) -> np.ndarray:
+        """Last `count` records of a ring, oldest first"""
+        indices = (self._heads[slot] - count + np.arange(count)) % self.capacity
+        return self._rings[slot, indices]
+
+    def _segment_path(self, segment: int) -> str:
+        name = f"{segment}-{self.writer}" if self.writer else str(segment)
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{name}{SEGMENT_SUFFIX}")
+
+    def _append(self, path: str, records: np.ndarray):
+        """Append tag-sorted records to a segment and their runs to its index"""
+        itemsize = SEGMENT_DTYPE.itemsize
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size % itemsize:
+            # A record cut short by a crash would misalign everything after it
+            with open(path, "r+b") as f:
+                f.truncate(size - size % itemsize)
+            size -= size % itemsize
+        offset = size // itemsize
+        index_path = _index_path(path)
+        covered = self._covered.get(path)
+        if covered is None:
+            indexed = self._read_index(index_path, 0)
+            covered = int((indexed["offset"] + indexed["count"]).max(initial=0))
+        entries = []
+        if covered < offset:
+            # Records without index entries: a flush cut short, or a segment from before the index
+            entries.append(self._runs(np.memmap(path, dtype=SEGMENT_DTYPE, mode="r", shape=(offset,))[covered:],
+                                      covered))
+        with open(path, "ab") as f:
+            f.write(records.tobytes())
+        entries.append(self._runs(records, offset))
+        with open(index_path, "ab") as f:
+            f.write(np.concatenate(entries).tobytes())
+        self._covered[path] = offset + len(records)
+
+    @staticmethod
+    def _runs(records: np.ndarray, offset: int) -> np.ndarray:
+        """Index entries of the runs of equal label ids in records stored at offset"""
+        keys = records["label_id"]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])) if len(keys) else np.empty(0, int)
+        entries = np.empty(len(starts), dtype=INDEX_DTYPE)
+        entries["label_id"] = keys[starts]
+        entries["offset"] = starts + offset
+        entries["count"] = np.diff(np.append(starts, len(keys)))
+        return entries
+
+    @staticmethod
+    def _read_index(index_path: str, first: int) -> np.ndarray:
+        """Complete index entries from entry `first` on"""
+        try:
+            with open(index_path, "rb") as f:
+                f.seek(first * INDEX_DTYPE.itemsize)
+                data = f.read()
+        except OSError:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return np.frombuffer(data, dtype=INDEX_DTYPE, count=len(data) // INDEX_DTYPE.itemsize).copy()
+
+    def _segment_index(self, path: str) -> _SegmentIndex:
+        """Cached index of a segment, extended by the entries appended since the last query"""
+        with self._index_lock:
+            index = self._indexes.get(path)
+            if index is None:
+                index = self._indexes[path] = _SegmentIndex()
+                while len(self._indexes) > self.index_cache_size:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(path)
+            entries = self._read_index(_index_path(path), len(index.entries))
+            if len(entries):
+                index.extend(entries)
+            return index
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for path in glob.glob(os.path.join(self.directory, f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")):
+            name = os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].split("-", 1)[0]
+            if name.isdigit():
+                segments.append((int(name), path))
+        return sorted(segments)
+
+    def _apply_retention(self):
+        if self.retention_seconds is None:
+            return
+        cutoff = time.time() - self.retention_seconds
+        for segment, path in self._segments():
+            if segment + self.segment_seconds < cutoff:
+                self._covered.pop(path, None)
+                with self._index_lock:
+                    self._indexes.pop(path, None)
+                for removed in (path, _index_path(path)):
+                    try:
+                        os.remove(removed)
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logger.warning(f"Could not remove history segment {removed}: {e}")
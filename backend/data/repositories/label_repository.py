@@ -1,44 +1,150 @@
-from typing import List, Optional
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+from core.cache import LRUCache, MISSING
 from data.datasource import DictionaryManager
 from domain.entities.label import Label
 from data.translators.label_translator import LabelTranslator
 
 
 class LabelRepository:
-    def __init__(self, db_path: str = "dictionaries.db"):
-        self._manager = DictionaryManager(db_path)
+    def __init__(self, db_path: str = "dictionaries.db", pooled: bool = False,
+                 cache_size: int = 0, cache_ttl: Optional[float] = None,
+                 negative_ttl: Optional[float] = None):
+        self._manager = DictionaryManager(db_path, pooled=pooled)
         self.translator = LabelTranslator()
+        # Write-through cache in front of get_by_id; None marks a known-missing id
+        self._cache = LRUCache(max_size=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+        self._negative_ttl = negative_ttl
+        # Bumped by every write so derived caches can tell their entries are stale
+        self._version = 0
+        # Orders version bumps and cache updates of writers against readers
+        # filling the cache, see _fill
+        self._lock = threading.Lock()
 
     def add(self, label: Label) -> bool:
         document = self.translator.to_document(label=label)
-        return self._manager.insert_dictionary(document)
+        added = self._manager.insert_dictionary(document)
+        self._write_through(label, added)
+        return added
 
     def add_all(self, labels: List[Label]) -> bool:
         documents = [self.translator.to_document(model) for model in labels]
-        return self._manager.insert_dictionaries(documents)
+        added = self._manager.insert_dictionaries(documents)
+        with self._lock:
+            self._version += 1
+            if self._cache is not None:
+                for label in labels:
+                    self._cache.invalidate(label.id)
+        return added
 
     def get_by_id(self, label_id: str) -> Optional[Label]:
+        if self._cache is not None:
+            cached = self._cache.get(label_id)
+            if cached is not MISSING:
+                return cached
+
+        version = self._version
         raw = self._manager.get_dictionary_by_id(label_id)
-        if raw is None:
-            return None
-        return self.translator.from_document(raw)
+        label = None if raw is None else self.translator.from_document(raw)
+        self._fill({label_id: label}, version)
+        return label
+
+    def get_by_ids(self, label_ids: List[str]) -> Dict[str, Optional[Label]]:
+        """Look up many labels with one query for the cache misses, None for unknown ids"""
+        labels: Dict[str, Optional[Label]] = {}
+        missing = []
+        for label_id in label_ids:
+            if label_id in labels:
+                continue
+            cached = self._cache.get(label_id) if self._cache is not None else MISSING
+            if cached is MISSING:
+                missing.append(label_id)
+            labels[label_id] = None if cached is MISSING else cached
+        if not missing:
+            return labels
+
+        version = self._version
+        found = self._manager.get_dictionaries_by_ids(missing)
+        loaded = {}
+        for label_id in missing:
+            raw = found.get(label_id)
+            loaded[label_id] = None if raw is None else self.translator.from_document(raw)
+        labels.update(loaded)
+        self._fill(loaded, version)
+        return labels
 
     def get_all(self) -> List[Label]:
-        raw_list = self._manager.get_all_dictionaries()
-        return [
-            self.translator.from_document(item)
-            for item in raw_list
-        ]
+        return list(self.iter_all())
+
+    def iter_all(self) -> Iterator[Label]:
+        """Stream every label from a database cursor"""
+        for item in self._manager.iter_dictionaries():
+            yield self.translator.from_document(item)
+
+    def upsert_all(self, documents: Iterable) -> Dict:
+        """Insert or overwrite a stream of label documents in one transaction, see DictionaryManager.upsert_dictionaries"""
+        report = self._manager.upsert_dictionaries(documents)
+        self._clear_cache()
+        return report
 
     def update(self, label: Label) -> bool:
         document = self.translator.to_document(label)
-        return self._manager.update_dictionary(document)
+        updated = self._manager.update_dictionary(document)
+        self._write_through(label, updated)
+        return updated
 
     def delete(self, dict_id: str) -> bool:
-        return self._manager.delete_dictionary(dict_id)
+        deleted = self._manager.delete_dictionary(dict_id)
+        with self._lock:
+            self._version += 1
+            if self._cache is not None:
+                self._cache.invalidate(dict_id)
+        return deleted
 
     def count(self) -> int:
         return self._manager.get_dictionaries_count()
 
     def clear(self) -> bool:
-        return self._manager.clear_all_dictionaries()
\ No newline at end of file
+        cleared = self._manager.clear_all_dictionaries()
+        self._clear_cache()
+        return cleared
+
+    @property
+    def version(self) -> int:
+        """Incremented on every add, update, delete or clear"""
+        return self._version
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """Hit/miss/eviction counters of the get_by_id cache, None when disabled"""
+        return self._cache.stats() if self._cache is not None else None
+
+    def _fill(self, labels: Dict[str, Optional[Label]], version: int):
+        """
+        Cache labels read from the database while the repository was at
+        `version`. A write in the meantime may have made them stale, e.g. a
+        delete that invalidated the id before this reader got here, so then
+        they are dropped rather than written back.
+        """
+        if self._cache is None:
+            return
+        with self._lock:
+            if self._version != version:
+                return
+            for label_id, label in labels.items():
+                self._cache.set(label_id, label, ttl=self._negative_ttl if label is None else None)
+
+    def _write_through(self, label: Label, written: bool):
+        with self._lock:
+            self._version += 1
+            if self._cache is None:
+                return
+            if written:
+                self._cache.set(label.id, label)
+            else:
+                self._cache.invalidate(label.id)
+
+    def _clear_cache(self):
+        with self._lock:
+            self._version += 1
+            if self._cache is not None:
+                self._cache.clear()
@@ -1,15 +1,137 @@
-from typing import Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from core.spatial import SpatialGrid
+from core.timing_wheel import TimingWheel
 from domain.entities.position import Position
 
+# Upper bound on cached per-anchor-set solver coefficients
+SOLVER_CACHE_LIMIT = 4096
+
+# Called with (label_id, position) on save and (label_id, None) on removal
+PositionListener = Callable[[str, Optional[Position]], None]
+
+# Default coordinates handed to the first labels that are created
+DEFAULT_BASE_STATIONS = [(0.0, 0.0), (10.0, 0.0), (0.0, 10.0)]
+
+
+
+class PositionColumns(NamedTuple):
+    """
+    Column snapshot of stored positions. Rows where `active` is False are
+    free slots and must be skipped. The store never writes to the arrays
+    after handing them out, so readers may use them after writers have moved
+    on; they may be read-only views of its storage.
+    """
+    label_ids: np.ndarray  # object array of str
+    x: np.ndarray
+    y: np.ndarray
+    is_base_station: np.ndarray
+    updated_at: np.ndarray  # NaN where unknown
+    active: np.ndarray
+
+
+class PositionState(NamedTuple):
+    """Positions and anchor state of a repository, see export_state"""
+    columns: PositionColumns  # active rows only, not shared with the store
+    base_stations_config: Dict
+    calibration: Dict[str, Dict]
+    labels_created: int
+
+
+# Removed-tag markers kept for delta queries before they are compacted
+TOMBSTONE_LIMIT = 10000
+
+
 class PositionRepository:
-    """In-memory storage for positions"""
-    def __init__(self):
+    """
+    In-memory storage for positions.
+
+    With a ttl, tags (not base stations) whose last update is older than
+    ttl seconds are dropped by expire_stale(), which a sweeper calls every
+    expiry_resolution seconds. Last-seen deadlines live in a TimingWheel,
+    so a sweep costs time in proportion to the tags it expires.
+    """
+    def __init__(self, cell_size: float = 5.0, ttl: Optional[float] = None, expiry_resolution: float = 1.0):
         self._positions: Dict[str, Position] = {}
         self._base_stations_config: Dict = {}
+        # Path loss profiles by anchor id, see core.calibration
+        self._calibration: Dict[str, Dict] = {}
+        # (base stations, solver coefficients cache), replaced as a whole
+        # whenever a base station changes so readers never see a mismatch
+        self._anchor_index: Tuple[Dict[str, Dict[str, float]], Dict] = ({}, {})
+        self._anchor_version = 0
+        # Change sequence for delta queries. It starts from the wall clock in
+        # microseconds so cursors held by clients stay monotonic across restarts
+        self._sequence = time.time_ns() // 1000
+        self._horizon = self._sequence
+        self._changes: "OrderedDict[str, int]" = OrderedDict()
+        self._tombstones: Dict[str, int] = {}
+        # (listener, local_only) pairs, see subscribe
+        self._listeners: List[Tuple[PositionListener, bool]] = []
+        self._labels_created = 0
+        # Grid index over current positions for proximity queries
+        self._spatial = SpatialGrid(cell_size)
+        # Writers may run on ingest worker threads
+        self._lock = threading.RLock()
+        self.ttl = ttl or None
+        self._expiry = TimingWheel(resolution=expiry_resolution) if self.ttl else None
     
     def save_position(self, position: Position):
         """Save or update a position"""
-        self._positions[position.label_id] = position
+        with self._lock:
+            self._store(position)
+    
+    def save_positions(self, positions: Iterable[Position]):
+        """Save or update many positions at once"""
+        with self._lock:
+            for position in positions:
+                self._store(position)
+    
+    def remove_position(self, label_id: str) -> bool:
+        """Remove a position, returns False if it was not stored"""
+        with self._lock:
+            return self._discard(label_id)
+    
+    def expire_stale(self, now: Optional[float] = None) -> List[str]:
+        """Remove tags not updated within the ttl, returns their ids"""
+        if self._expiry is None:
+            return []
+        with self._lock:
+            return [label_id for label_id in self._expiry.advance(now) if self._discard(label_id)]
+    
+    def assign_default_base_station(self, label_id: str) -> Optional[Position]:
+        """
+        Count a newly created label and make it a base station at the next
+        DEFAULT_BASE_STATIONS slot while any are left. Returns the saved
+        position, or None once the defaults are used up.
+        """
+        with self._lock:
+            self._labels_created += 1
+            if self._labels_created > len(DEFAULT_BASE_STATIONS):
+                return None
+            x, y = DEFAULT_BASE_STATIONS[self._labels_created - 1]
+            position = Position(label_id=label_id, x=x, y=y, is_base_station=True)
+            self._store(position)
+            return position
+    
+    def configure_base_stations(self, positions: Iterable[Position], config: Dict):
+        """Save base station positions and their configuration as one change"""
+        with self._lock:
+            for position in positions:
+                self._store(position)
+            self._base_stations_config = config
+    
+    def subscribe(self, listener: PositionListener, local_only: bool = False):
+        """
+        Register a callback invoked on every saved or removed position.
+
+        With local_only the callback skips changes that another process
+        wrote to a shared store, e.g. so history is recorded only once.
+        """
+        self._listeners.append((listener, local_only))
     
     def get_position(self, label_id: str) -> Optional[Position]:
         """Get position by label ID"""
@@ -17,12 +139,262 @@ class PositionRepository:
     
     def get_all_positions(self) -> Dict[str, Position]:
         """Get all positions"""
-        return self._positions.copy()
+        with self._lock:
+            return self._positions.copy()
+    
+    def find_within_radius(self, x: float, y: float, radius: float) -> List[Tuple[Position, float]]:
+        """Get (position, distance) pairs within radius of a point, nearest first"""
+        with self._lock:
+            return [(self._positions[label_id], distance)
+                    for label_id, distance in self._spatial.within_radius(x, y, radius)]
+    
+    def find_in_box(self, x0: float, y0: float, x1: float, y1: float) -> List[Position]:
+        """Get positions inside a bounding box"""
+        with self._lock:
+            return [self._positions[label_id] for label_id in self._spatial.within_box(x0, y0, x1, y1)]
+    
+    def find_nearest(self, x: float, y: float, k: int, exclude: Optional[str] = None) -> List[Tuple[Position, float]]:
+        """Get the k nearest (position, distance) pairs to a point"""
+        with self._lock:
+            return [(self._positions[label_id], distance)
+                    for label_id, distance in self._spatial.nearest(x, y, k, exclude)]
+    
+    def get_columns(self) -> PositionColumns:
+        """Get all positions as parallel arrays for bulk serialization"""
+        with self._lock:
+            positions = list(self._positions.values())
+        return self._columns_from(positions)
+    
+    def export_state(self) -> PositionState:
+        """
+        Copy positions and anchor state, e.g. for a snapshot.
+
+        Stored positions, the config and the calibration are replaced rather
+        than mutated, so only references are taken under the lock and writers
+        are held up for one list copy; the columns are built afterwards.
+        """
+        with self._lock:
+            positions = list(self._positions.values())
+            state = (self._base_stations_config, self._calibration, self._labels_created)
+        return PositionState(self._columns_from(positions), *state)
+    
+    def import_state(self, state: PositionState):
+        """
+        Replace all positions and anchor state in bulk, e.g. from a snapshot
+        at startup. Listeners are not notified and delta clients are sent
+        back to a full snapshot.
+        """
+        columns = state.columns
+        label_ids = columns.label_ids.tolist()
+        with self._lock:
+            self._positions.clear()
+            self._spatial.clear()
+            self._anchor_index = ({}, {})
+            self._anchor_version += 1
+            self._base_stations_config = state.base_stations_config
+            self._calibration = state.calibration
+            self._labels_created = state.labels_created
+            self._load_columns(label_ids, columns)
+            for index in np.flatnonzero(columns.is_base_station).tolist():
+                self._index_anchor(self._positions[label_ids[index]])
+            self._spatial.update_many(label_ids, columns.x, columns.y)
+            if self._expiry is not None:
+                self._expiry = TimingWheel(resolution=self._expiry.resolution)
+                tags = np.flatnonzero(~columns.is_base_station)
+                last_seen = columns.updated_at[tags]
+                last_seen = np.where(np.isnan(last_seen), time.time(), last_seen)
+                self._expiry.schedule_many(columns.label_ids[tags].tolist(), last_seen + self.ttl)
+            self._sequence += 1
+            self._horizon = self._sequence
+            self._changes.clear()
+            self._tombstones.clear()
+    
+    def _load_columns(self, label_ids: List[str], columns: PositionColumns):
+        """Fill the emptied position mapping from columns"""
+        for label_id, x, y, is_base_station, updated_at in zip(
+                label_ids, columns.x.tolist(), columns.y.tolist(), columns.is_base_station.tolist(),
+                columns.updated_at.tolist()):
+            self._positions[label_id] = Position.model_construct(
+                label_id=label_id, x=x, y=y, is_base_station=is_base_station, distance_to_base=None,
+                updated_at=None if updated_at != updated_at else updated_at,
+            )
+    
+    @staticmethod
+    def _columns_from(positions: List[Position]) -> PositionColumns:
+        count = len(positions)
+        label_ids = np.empty(count, dtype=object)
+        label_ids[:] = [pos.label_id for pos in positions]
+        return PositionColumns(
+            label_ids=label_ids,
+            x=np.fromiter((pos.x for pos in positions), dtype=np.float64, count=count),
+            y=np.fromiter((pos.y for pos in positions), dtype=np.float64, count=count),
+            is_base_station=np.fromiter((pos.is_base_station for pos in positions), dtype=bool, count=count),
+            updated_at=np.fromiter((np.nan if pos.updated_at is None else pos.updated_at for pos in positions),
+                                   dtype=np.float64, count=count),
+            active=np.ones(count, dtype=bool),
+        )
+    
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the latest change"""
+        return self._sequence
+    
+    def get_changes_since(self, since: int) -> Tuple[List[Position], List[str], int, bool]:
+        """
+        Get positions changed and label ids removed after the given sequence.
+
+        Returns (changed, removed, cursor, full). When the cursor is too old
+        or unknown, full is True and changed holds every position.
+        """
+        with self._lock:
+            cursor = self._sequence
+            if since < self._horizon or since > cursor:
+                return list(self._positions.values()), [], cursor, True
+
+            changed = []
+            removed = []
+            for label_id, sequence in reversed(self._changes.items()):
+                if sequence <= since:
+                    break
+                position = self._positions.get(label_id)
+                if position is not None:
+                    changed.append(position)
+                else:
+                    removed.append(label_id)
+            return changed, removed, cursor, False
+    
+    def get_base_stations(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get base station coordinates as {label_id: {"x": ..., "y": ...}}, plus
+        "tx_power" and "n" for calibrated ones; do not mutate
+        """
+        return self._anchor_index[0]
+    
+    @property
+    def anchor_version(self) -> int:
+        """Incremented whenever a base station is added, moved, demoted or recalibrated"""
+        return self._anchor_version
+    
+    def get_anchor_index(self) -> Tuple[Dict[str, Dict[str, float]], Dict]:
+        """
+        Get base stations together with the solver coefficients cache that
+        belongs to the same anchor version, so both always match
+        """
+        index = self._anchor_index
+        if len(index[1]) > SOLVER_CACHE_LIMIT:
+            # Solvers may be reading the full cache, so it is replaced rather than cleared
+            with self._lock:
+                if self._anchor_index is index:
+                    self._anchor_index = (index[0], {})
+                index = self._anchor_index
+        return index
     
     def set_base_stations_config(self, config: Dict):
         """Set base stations configuration"""
         self._base_stations_config = config
     
+    def set_calibration(self, profiles: Dict[str, Dict]):
+        """
+        Store path loss profiles by anchor id, replacing earlier ones of the
+        same anchors. Base stations carry "tx_power" and "n" of their profile.
+        """
+        with self._lock:
+            self._apply_calibration({**self._calibration, **profiles})
+    
+    def remove_calibration(self, label_id: str) -> bool:
+        """Drop an anchor's profile, returns False if it had none"""
+        with self._lock:
+            if label_id not in self._calibration:
+                return False
+            self._apply_calibration({k: v for k, v in self._calibration.items() if k != label_id})
+            return True
+    
+    def get_calibration(self) -> Dict[str, Dict]:
+        """Get path loss profiles by anchor id"""
+        return dict(self._calibration)
+    
     def get_base_stations_config(self) -> Dict:
         """Get base stations configuration"""
         return self._base_stations_config.copy()
+    
+    def _store(self, position: Position, sequence: Optional[int] = None, local: bool = True):
+        self._positions[position.label_id] = position
+        self._index_anchor(position)
+        self._track(position)
+        self._spatial.update(position.label_id, position.x, position.y)
+        self._record_change(position.label_id, sequence)
+        self._notify(position.label_id, position, local)
+    
+    def _discard(self, label_id: str, sequence: Optional[int] = None, local: bool = True) -> bool:
+        position = self._positions.pop(label_id, None)
+        if position is None:
+            return False
+        if position.is_base_station:
+            self._index_anchor(position.model_copy(update={"is_base_station": False}))
+        if self._expiry is not None:
+            self._expiry.discard(label_id)
+        self._spatial.remove(label_id)
+        self._record_change(label_id, sequence)
+        self._tombstones[label_id] = self._sequence
+        if len(self._tombstones) > TOMBSTONE_LIMIT:
+            self._compact_tombstones()
+        self._notify(label_id, None, local)
+        return True
+    
+    def _index_anchor(self, position: Position):
+        label_id = position.label_id
+        current = self._anchor_index[0]
+        if position.is_base_station:
+            anchor = self._anchor_entry(label_id, position.x, position.y)
+            if current.get(label_id) == anchor:
+                return
+            base_stations = {**current, label_id: anchor}
+        elif label_id in current:
+            base_stations = {k: v for k, v in current.items() if k != label_id}
+        else:
+            return
+        self._anchor_index = (base_stations, {})
+        self._anchor_version += 1
+
+    def _track(self, position: Position):
+        """Move a tag's expiry deadline to ttl after its last update, base stations never expire"""
+        if self._expiry is None:
+            return
+        if position.is_base_station:
+            self._expiry.discard(position.label_id)
+        else:
+            last_seen = position.updated_at if position.updated_at is not None else time.time()
+            self._expiry.schedule(position.label_id, last_seen + self.ttl)
+
+    def _anchor_entry(self, label_id: str, x: float, y: float) -> Dict[str, float]:
+        profile = self._calibration.get(label_id)
+        if profile is None:
+            return {"x": x, "y": y}
+        return {"x": x, "y": y, "tx_power": profile["tx_power"], "n": profile["n"]}
+
+    def _apply_calibration(self, calibration: Dict[str, Dict]):
+        self._calibration = calibration
+        current = self._anchor_index[0]
+        base_stations = {label_id: self._anchor_entry(label_id, anchor["x"], anchor["y"])
+                         for label_id, anchor in current.items()}
+        if base_stations != current:
+            self._anchor_index = (base_stations, {})
+            self._anchor_version += 1
+
+    def _record_change(self, label_id: str, sequence: Optional[int] = None):
+        self._sequence = self._sequence + 1 if sequence is None else sequence
+        self._changes[label_id] = self._sequence
+        self._changes.move_to_end(label_id)
+        self._tombstones.pop(label_id, None)
+    
+    def _compact_tombstones(self):
+        """Forget removed tags; clients behind this point get a full snapshot"""
+        for label_id in self._tombstones:
+            self._changes.pop(label_id, None)
+        self._tombstones.clear()
+        self._horizon = self._sequence
+
+    def _notify(self, label_id: str, position: Optional[Position], local: bool = True):
+        for listener, local_only in self._listeners:
+            if local or not local_only:
+                listener(label_id, position)
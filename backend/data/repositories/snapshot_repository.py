@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+
+from data.repositories.position_repository import PositionColumns, PositionRepository, PositionState
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GMXSNAP1"
+# magic, tag count, metadata bytes, label id bytes
+HEADER = struct.Struct("<8sIII")
+
+
+def _padding(offset: int) -> int:
+    return -offset % 8
+
+
+class PositionSnapshotRepository:
+    """
+    Periodic binary snapshot of a PositionRepository for warm restarts.
+
+    The file holds the header, JSON metadata (base station config,
+    calibration, created-labels counter), the NUL-separated label ids and
+    then the x, y, updated_at and base station columns as raw arrays, so
+    load() is one read and a few np.frombuffer views. save() writes a
+    temporary file and renames it over the old one, a crash leaves either
+    snapshot intact.
+    """
+    def __init__(self, path: str, position_repository: PositionRepository):
+        self.path = path
+        self.position_repository = position_repository
+        # Change sequence at the last save, unchanged state is not rewritten
+        self._saved_sequence: Optional[int] = None
+
+    def save(self, force: bool = False) -> Optional[int]:
+        """Write a snapshot, returns the number of positions or None if nothing changed"""
+        sequence = self.position_repository.sequence
+        if not force and sequence == self._saved_sequence:
+            return None
+        start = time.perf_counter()
+        state = self.position_repository.export_state()
+        columns = state.columns
+        count = len(columns.label_ids)
+        ids = "\0".join(columns.label_ids.tolist()).encode("utf-8")
+        if count and ids.count(b"\0") != count - 1:
+            logger.error("Position snapshot skipped: a label id contains a NUL character")
+            return None
+        meta = json.dumps({
+            "saved_at": time.time(),
+            "base_stations_config": state.base_stations_config,
+            "calibration": state.calibration,
+            "labels_created": state.labels_created,
+        }).encode("utf-8")
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as f:
+            offset = HEADER.size + len(meta) + len(ids)
+            f.write(HEADER.pack(MAGIC, count, len(meta), len(ids)))
+            f.write(meta)
+            f.write(ids)
+            f.write(b"\0" * _padding(offset))
+            for array in (columns.x, columns.y, columns.updated_at):
+                f.write(np.ascontiguousarray(array, dtype="<f8").tobytes())
+            f.write(np.ascontiguousarray(columns.is_base_station, dtype=np.uint8).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self._saved_sequence = sequence
+        logger.info(f"Position snapshot of {count} tags written in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return count
+
+    def load(self) -> Optional[int]:
+        """Restore the repository from the snapshot, returns the number of positions or None without one"""
+        if not os.path.exists(self.path):
+            return None
+        start = time.perf_counter()
+        with open(self.path, "rb") as f:
+            data = f.read()
+        try:
+            state = self._decode(data)
+        except (ValueError, struct.error) as e:
+            logger.error(f"Position snapshot {self.path} is unreadable, starting empty: {e}")
+            return None
+        self.position_repository.import_state(state)
+        self._saved_sequence = self.position_repository.sequence
+        count = len(state.columns.label_ids)
+        logger.info(f"Restored {count} positions from {self.path} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return count
+
+    @staticmethod
+    def _decode(data: bytes) -> PositionState:
+        magic, count, meta_size, ids_size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a position snapshot")
+        offset = HEADER.size
+        meta = json.loads(data[offset:offset + meta_size])
+        offset += meta_size
+        ids = data[offset:offset + ids_size].decode("utf-8").split("\0") if count else []
+        offset += ids_size + _padding(offset + ids_size)
+        if len(ids) != count or len(data) != offset + count * 25:
+            raise ValueError("truncated snapshot")
+        x, y, updated_at = (np.frombuffer(data, dtype="<f8", count=count, offset=offset + i * 8 * count)
+                            for i in range(3))
+        is_base_station = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset + 24 * count).astype(bool)
+        label_ids = np.empty(count, dtype=object)
+        label_ids[:] = ids
+        columns = PositionColumns(
+            label_ids=label_ids,
+            x=x,
+            y=y,
+            is_base_station=is_base_station,
+            updated_at=updated_at,
+            active=np.ones(count, dtype=bool),
+        )
+        return PositionState(columns, meta["base_stations_config"], meta["calibration"], meta["labels_created"])
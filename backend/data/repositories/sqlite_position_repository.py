@@ -0,0 +1,375 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data.repositories.position_repository import (
+    DEFAULT_BASE_STATIONS,
+    PositionColumns,
+    PositionRepository,
+)
+from domain.entities.position import Position
+
+SHARED_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Removed rows are kept as tombstones so other processes see the removal,
+# then purged once this many newer changes have been written
+TOMBSTONE_RETENTION = 100000
+
+UPSERT_POSITION = """
+    INSERT INTO positions (label_id, x, y, is_base_station, distance_to_base, updated_at, removed, seq)
+    VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+    ON CONFLICT(label_id) DO UPDATE SET
+        x = excluded.x,
+        y = excluded.y,
+        is_base_station = excluded.is_base_station,
+        distance_to_base = excluded.distance_to_base,
+        updated_at = excluded.updated_at,
+        removed = 0,
+        seq = excluded.seq
+"""
+
+
+class SqlitePositionRepository(PositionRepository):
+    """
+    Position storage shared by several processes through a WAL-mode SQLite
+    table, so routes:app can run with multiple uvicorn workers.
+
+    Every write is a transaction that takes the next numbers from a shared
+    change sequence. Each process keeps the in-memory indexes of the parent
+    class as a replica and catches up on rows with a newer sequence before
+    reads, which is a no-op while PRAGMA data_version reports no foreign commits.
+    """
+    def __init__(self, db_path: str = "dictionaries.db", cell_size: float = 5.0, ttl: Optional[float] = None,
+                 expiry_resolution: float = 1.0):
+        super().__init__(cell_size, ttl=ttl, expiry_resolution=expiry_resolution)
+        self.db_path = db_path
+        self._local = threading.local()
+        self._synced = 0
+        self._create_tables()
+        with self._lock:
+            self._sequence = self._horizon = self._synced = self._read_counter("sequence")
+            self._load()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection in autocommit mode, transactions are explicit"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            for pragma in SHARED_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.data_version = None
+        return conn
+
+    def _create_tables(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS positions (
+                    label_id TEXT PRIMARY KEY,
+                    x REAL NOT NULL,
+                    y REAL NOT NULL,
+                    is_base_station INTEGER NOT NULL,
+                    distance_to_base REAL,
+                    updated_at REAL,
+                    removed INTEGER NOT NULL DEFAULT 0,
+                    seq INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS positions_seq ON positions(seq)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS position_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+            # Same wall clock origin as the in-memory sequence, see PositionRepository
+            conn.execute("INSERT OR IGNORE INTO position_meta VALUES ('sequence', ?)", (str(time.time_ns() // 1000),))
+            conn.execute("INSERT OR IGNORE INTO position_meta VALUES ('labels_created', '0')")
+            conn.execute("INSERT OR IGNORE INTO position_meta VALUES ('base_stations_config', '{}')")
+            conn.execute("INSERT OR IGNORE INTO position_meta VALUES ('calibration', '{}')")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _read_counter(self, key: str) -> int:
+        row = self._connection().execute("SELECT value FROM position_meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0])
+
+    def _write(self, positions: Iterable[Position] = (), removed: Iterable[str] = (),
+               config: Optional[Dict] = None, assign_to: Optional[str] = None,
+               calibration: Optional[Dict[str, Optional[Dict]]] = None,
+               removed_before: Optional[float] = None) -> Optional[Position]:
+        """
+        Apply changes in one transaction, then replay them into the local indexes.
+
+        With assign_to the shared created-labels counter is bumped and the label
+        becomes a default base station while slots are left; that position is returned.
+        calibration is merged into the stored profiles, None values remove one.
+        With removed_before only rows last updated at or before it are removed.
+        """
+        conn = self._connection()
+        assigned = None
+        local_ids = set()
+        with self._lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                start = sequence = self._read_counter("sequence")
+                if assign_to is not None:
+                    created = self._read_counter("labels_created") + 1
+                    conn.execute("UPDATE position_meta SET value = ? WHERE key = 'labels_created'", (str(created),))
+                    if created <= len(DEFAULT_BASE_STATIONS):
+                        x, y = DEFAULT_BASE_STATIONS[created - 1]
+                        assigned = Position(label_id=assign_to, x=x, y=y, is_base_station=True)
+                        positions = [*positions, assigned]
+                rows = []
+                for position in positions:
+                    sequence += 1
+                    rows.append((position.label_id, position.x, position.y, int(position.is_base_station),
+                                 position.distance_to_base, position.updated_at, sequence))
+                    local_ids.add(position.label_id)
+                conn.executemany(UPSERT_POSITION, rows)
+                for label_id in removed:
+                    cursor = conn.execute(
+                        "UPDATE positions SET removed = 1, seq = ? WHERE label_id = ? AND removed = 0"
+                        " AND (? IS NULL OR COALESCE(updated_at, 0) <= ?)",
+                        (sequence + 1, label_id, removed_before, removed_before))
+                    if cursor.rowcount:
+                        sequence += 1
+                        local_ids.add(label_id)
+                if config is not None:
+                    conn.execute("UPDATE position_meta SET value = ? WHERE key = 'base_stations_config'",
+                                 (json.dumps(config),))
+                if calibration is not None:
+                    stored = json.loads(conn.execute(
+                        "SELECT value FROM position_meta WHERE key = 'calibration'").fetchone()[0])
+                    stored.update(calibration)
+                    stored = {label_id: profile for label_id, profile in stored.items() if profile is not None}
+                    conn.execute("UPDATE position_meta SET value = ? WHERE key = 'calibration'", (json.dumps(stored),))
+                conn.execute("UPDATE position_meta SET value = ? WHERE key = 'sequence'", (str(sequence),))
+                if start // TOMBSTONE_RETENTION != sequence // TOMBSTONE_RETENTION:
+                    conn.execute("DELETE FROM positions WHERE removed = 1 AND seq < ?",
+                                 (sequence - TOMBSTONE_RETENTION,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._sync(local_ids)
+        return assigned
+
+    def _load(self):
+        """Fill the local indexes from the table without notifying listeners"""
+        self._load_meta()
+        rows = self._connection().execute(
+            "SELECT label_id, x, y, is_base_station, distance_to_base, updated_at FROM positions WHERE removed = 0"
+        ).fetchall()
+        for row in rows:
+            position = self._row_to_position(row)
+            self._positions[position.label_id] = position
+            self._index_anchor(position)
+            self._track(position)
+            self._spatial.update(position.label_id, position.x, position.y)
+
+    def _load_meta(self):
+        """Read the base stations config and calibration written by any process"""
+        meta = dict(self._connection().execute(
+            "SELECT key, value FROM position_meta WHERE key IN ('base_stations_config', 'calibration')"
+        ).fetchall())
+        self._base_stations_config = json.loads(meta["base_stations_config"])
+        calibration = json.loads(meta["calibration"])
+        if calibration != self._calibration:
+            self._apply_calibration(calibration)
+
+    def _refresh(self):
+        """Catch up with commits from other processes, if there were any"""
+        conn = self._connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._local.data_version:
+            return
+        with self._lock:
+            self._sync()
+        self._local.data_version = data_version
+
+    def _sync(self, local_ids: Iterable[str] = ()):
+        conn = self._connection()
+        if self._read_counter("sequence") - self._synced > TOMBSTONE_RETENTION:
+            # Purged tombstones may be among the missed changes
+            self._reload()
+            return
+        self._load_meta()
+        rows = conn.execute(
+            "SELECT label_id, x, y, is_base_station, distance_to_base, updated_at, removed, seq"
+            " FROM positions WHERE seq > ? ORDER BY seq",
+            (self._synced,),
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            label_id, sequence = row[0], row[7]
+            local = label_id in local_ids
+            if row[6]:
+                self._discard(label_id, sequence, local)
+            else:
+                self._store(self._row_to_position(row), sequence, local)
+        self._synced = rows[-1][7]
+        self._sequence = max(self._sequence, self._synced)
+
+    def _reload(self):
+        """Rebuild the local indexes and move the horizon so delta clients take a full snapshot"""
+        for label_id in list(self._positions):
+            self._discard(label_id, local=False)
+        self._load()
+        for label_id, position in self._positions.items():
+            self._notify(label_id, position, local=False)
+        self._synced = self._read_counter("sequence")
+        self._sequence = self._horizon = max(self._sequence, self._synced)
+        self._changes.clear()
+        self._tombstones.clear()
+
+    @staticmethod
+    def _row_to_position(row: Tuple) -> Position:
+        return Position(
+            label_id=row[0],
+            x=row[1],
+            y=row[2],
+            is_base_station=bool(row[3]),
+            distance_to_base=row[4],
+            updated_at=row[5],
+        )
+
+    def save_position(self, position: Position):
+        """Save or update a position"""
+        self._write([position])
+
+    def save_positions(self, positions: Iterable[Position]):
+        """Save or update many positions in one transaction"""
+        self._write(positions)
+
+    def remove_position(self, label_id: str) -> bool:
+        """Remove a position, returns False if it was not stored"""
+        self._refresh()
+        with self._lock:
+            if label_id not in self._positions:
+                return False
+            self._write(removed=[label_id])
+            return True
+
+    def expire_stale(self, now: Optional[float] = None) -> List[str]:
+        """
+        Remove tags not updated within the ttl, returns their ids.
+
+        Every process sweeps its own replica; a tag that got a fresh update
+        in another process meanwhile is kept by the conditional delete, and
+        ids another process already removed are returned as well.
+        """
+        if self._expiry is None:
+            return []
+        self._refresh()
+        now = time.time() if now is None else now
+        with self._lock:
+            due = self._expiry.advance(now)
+            if not due:
+                return []
+            self._write(removed=due, removed_before=now - self.ttl)
+            return [label_id for label_id in due if label_id not in self._positions]
+
+    def assign_default_base_station(self, label_id: str) -> Optional[Position]:
+        """Same as PositionRepository, with the counter shared by all processes"""
+        return self._write(assign_to=label_id)
+
+    def configure_base_stations(self, positions: Iterable[Position], config: Dict):
+        """Save base station positions and their configuration in one transaction"""
+        self._write(positions, config=config)
+
+    def set_base_stations_config(self, config: Dict):
+        """Set base stations configuration"""
+        self._write(config=config)
+
+    def get_base_stations_config(self) -> Dict:
+        """Get base stations configuration"""
+        self._refresh()
+        return super().get_base_stations_config()
+
+    def set_calibration(self, profiles: Dict[str, Dict]):
+        """Store path loss profiles by anchor id, see PositionRepository"""
+        self._write(calibration=profiles)
+
+    def remove_calibration(self, label_id: str) -> bool:
+        """Drop an anchor's profile, returns False if it had none"""
+        self._refresh()
+        with self._lock:
+            if label_id not in self._calibration:
+                return False
+            self._write(calibration={label_id: None})
+            return True
+
+    def get_calibration(self) -> Dict[str, Dict]:
+        """Get path loss profiles by anchor id"""
+        self._refresh()
+        return super().get_calibration()
+
+    def get_position(self, label_id: str) -> Optional[Position]:
+        """Get position by label ID"""
+        self._refresh()
+        return super().get_position(label_id)
+
+    def get_all_positions(self) -> Dict[str, Position]:
+        """Get all positions"""
+        self._refresh()
+        return super().get_all_positions()
+
+    def find_within_radius(self, x: float, y: float, radius: float) -> List[Tuple[Position, float]]:
+        """Get (position, distance) pairs within radius of a point, nearest first"""
+        self._refresh()
+        return super().find_within_radius(x, y, radius)
+
+    def find_in_box(self, x0: float, y0: float, x1: float, y1: float) -> List[Position]:
+        """Get positions inside a bounding box"""
+        self._refresh()
+        return super().find_in_box(x0, y0, x1, y1)
+
+    def find_nearest(self, x: float, y: float, k: int, exclude: Optional[str] = None) -> List[Tuple[Position, float]]:
+        """Get the k nearest (position, distance) pairs to a point"""
+        self._refresh()
+        return super().find_nearest(x, y, k, exclude)
+
+    def get_columns(self) -> PositionColumns:
+        """Get all positions as parallel arrays for bulk serialization"""
+        self._refresh()
+        return super().get_columns()
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the latest change in any process"""
+        self._refresh()
+        return self._sequence
+
+    def get_changes_since(self, since: int) -> Tuple[List[Position], List[str], int, bool]:
+        """Get changes after the given sequence, see PositionRepository"""
+        self._refresh()
+        return super().get_changes_since(since)
+
+    def get_base_stations(self) -> Dict[str, Dict[str, float]]:
+        """Get base station coordinates and calibration, see PositionRepository"""
+        self._refresh()
+        return super().get_base_stations()
+
+    def get_anchor_index(self) -> Tuple[Dict[str, Dict[str, float]], Dict]:
+        """Get base stations with their solver coefficients cache, see PositionRepository"""
+        self._refresh()
+        return super().get_anchor_index()
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,209 @@
+import math
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from data.repositories.position_repository import PositionRepository
+from domain.entities.position import Position
+
+TileKey = Tuple[int, int, int]
+
+
+class PositionTileRepository:
+    """
+    Grid-clustered positions by map tile for level-of-detail views.
+
+    At zoom z the plane is cut into square tiles of tile_size / 2**z
+    meters, each split into grid x grid cells. A tile is the list of its
+    non-empty cells with the count and centroid of the positions in them,
+    binned with NumPy straight from PositionRepository.get_columns.
+
+    Tiles are cached until a position in them changes. The listener only
+    queues the changed ids; the next read looks up where those tags were
+    and are now, and evicts just the tiles holding either point at each
+    zoom in use.
+    """
+    def __init__(self, position_repository: PositionRepository, tile_size: float = 1024.0, grid: int = 16,
+                 cache_size: int = 10000):
+        self.position_repository = position_repository
+        self.tile_size = tile_size
+        self.grid = grid
+        self.cache_size = cache_size
+        self._tiles: "OrderedDict[TileKey, List[Dict]]" = OrderedDict()
+        # Coordinates of every tag as of the cached tiles, None until the first read
+        self._known: Optional[Dict[str, Tuple[float, float]]] = None
+        # Changes since the last read: label_id -> new coordinates, None when removed
+        self._pending: Dict[str, Optional[Tuple[float, float]]] = {}
+        self._pending_lock = threading.Lock()
+        self._zooms: Set[int] = set()
+        # Held for a whole read, so concurrent viewers build a missing tile once
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, label_id: str, position: Optional[Position]):
+        """Queue a changed position; usable as a PositionRepository listener"""
+        with self._pending_lock:
+            self._pending[label_id] = None if position is None else (position.x, position.y)
+
+    def edge(self, zoom: int) -> float:
+        """Tile edge length in meters at a zoom level"""
+        return self.tile_size / 2 ** zoom
+
+    def tile_range(self, zoom: int, x0: float, y0: float, x1: float, y1: float) -> Tuple[int, int, int, int]:
+        """Tile indices (tx0, ty0, tx1, ty1) covering a box, inclusive"""
+        edge = self.edge(zoom)
+        return (math.floor(min(x0, x1) / edge), math.floor(min(y0, y1) / edge),
+                math.floor(max(x0, x1) / edge), math.floor(max(y0, y1) / edge))
+
+    def count_tiles(self, zoom: int, x0: float, y0: float, x1: float, y1: float) -> int:
+        tx0, ty0, tx1, ty1 = self.tile_range(zoom, x0, y0, x1, y1)
+        return (tx1 - tx0 + 1) * (ty1 - ty0 + 1)
+
+    def get_clusters(self, zoom: int, x0: float, y0: float, x1: float, y1: float) -> List[Dict]:
+        """
+        Clusters of every tile overlapping a box, each {"x", "y", "count",
+        "base_stations"} with the centroid; single-position clusters also
+        carry the "label_id".
+        """
+        tx0, ty0, tx1, ty1 = self.tile_range(zoom, x0, y0, x1, y1)
+        keys = [(zoom, tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1)]
+        with self._lock:
+            self._zooms.add(zoom)
+            self._apply_pending()
+            tiles = {}
+            missing = []
+            for key in keys:
+                clusters = self._tiles.get(key)
+                if clusters is None:
+                    missing.append(key)
+                else:
+                    self._tiles.move_to_end(key)
+                    tiles[key] = clusters
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                built = self._build(zoom, missing)
+                tiles.update(built)
+                self._tiles.update(built)
+                while len(self._tiles) > self.cache_size:
+                    self._tiles.popitem(last=False)
+        return list(chain.from_iterable(tiles[key] for key in keys))
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters of the tile cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._tiles),
+            "max_size": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _apply_pending(self):
+        """Evict the tiles holding the previous or current point of every queued change"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if self._known is None:
+            # Nothing is cached yet, the first build reads the current state
+            columns = self.position_repository.get_columns()
+            active = columns.active
+            self._known = dict(zip(columns.label_ids[active].tolist(),
+                                   zip(columns.x[active].tolist(), columns.y[active].tolist())))
+            return
+        if not pending:
+            return
+        known = self._known
+        if self._tiles:
+            points = [point for label_id, current in pending.items()
+                      for point in (known.get(label_id), current) if point is not None]
+            xs = np.array([x for x, _ in points])
+            ys = np.array([y for _, y in points])
+            for zoom in self._zooms:
+                dirty = np.unique(np.column_stack(self._tiles_of(zoom, xs, ys)), axis=0)
+                if len(dirty) <= len(self._tiles):
+                    for tx, ty in dirty.tolist():
+                        self._tiles.pop((zoom, tx, ty), None)
+                    continue
+                # A burst dirtied more tiles than are cached, test the cached ones instead
+                cached = np.array([(tx, ty) for z, tx, ty in self._tiles if z == zoom], dtype=np.int64)
+                if len(cached):
+                    stale = np.isin(self._codes(cached[:, 0], cached[:, 1]), self._codes(dirty[:, 0], dirty[:, 1]))
+                    for tx, ty in cached[stale].tolist():
+                        del self._tiles[(zoom, tx, ty)]
+        for label_id, current in pending.items():
+            if current is None:
+                known.pop(label_id, None)
+            else:
+                known[label_id] = current
+
+    def _tiles_of(self, zoom: int, xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Tile indices of points, binned through their cell exactly like _build"""
+        cell = self.edge(zoom) / self.grid
+        return np.floor(xs / cell).astype(np.int64) // self.grid, np.floor(ys / cell).astype(np.int64) // self.grid
+
+    @staticmethod
+    def _codes(tx: np.ndarray, ty: np.ndarray) -> np.ndarray:
+        """One int64 per tile index pair, for set operations"""
+        return tx.astype(np.int64) * (1 << 32) + ty.astype(np.int64)
+
+    def _build(self, zoom: int, keys: List[TileKey]) -> Dict[TileKey, List[Dict]]:
+        """Cluster the positions of many tiles in one pass over the columns"""
+        tiles: Dict[TileKey, List[Dict]] = {key: [] for key in keys}
+        grid = self.grid
+        edge = self.edge(zoom)
+        cell = edge / grid
+        tx0 = min(tx for _, tx, _ in keys)
+        ty0 = min(ty for _, _, ty in keys)
+        width = max(tx for _, tx, _ in keys) - tx0 + 1
+        height = max(ty for _, _, ty in keys) - ty0 + 1
+        wanted = np.zeros((width, height), dtype=bool)
+        for _, tx, ty in keys:
+            wanted[tx - tx0, ty - ty0] = True
+
+        # Cheap float bounds first, so only positions near the block are binned
+        columns = self.position_repository.get_columns()
+        x = columns.x
+        y = columns.y
+        nearby = np.flatnonzero(columns.active & (x >= tx0 * edge) & (x < (tx0 + width) * edge)
+                                & (y >= ty0 * edge) & (y < (ty0 + height) * edge))
+        xs = x[nearby]
+        ys = y[nearby]
+        cx = np.floor(xs / cell).astype(np.int64)
+        cy = np.floor(ys / cell).astype(np.int64)
+        tx = cx // grid - tx0
+        ty = cy // grid - ty0
+        # Rounding at a tile border may still bin a point just outside the block
+        selected = (tx >= 0) & (tx < width) & (ty >= 0) & (ty < height)
+        selected[selected] = wanted[tx[selected], ty[selected]]
+        if not selected.any():
+            return tiles
+        nearby = nearby[selected]
+        xs = xs[selected]
+        ys = ys[selected]
+        cx = cx[selected]
+        cy = cy[selected]
+
+        rows = height * grid
+        codes = (cx - tx0 * grid) * rows + (cy - ty0 * grid)
+        cells, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        counts = np.bincount(inverse)
+        centroid_x = np.bincount(inverse, xs) / counts
+        centroid_y = np.bincount(inverse, ys) / counts
+        base_stations = np.bincount(inverse, columns.is_base_station[nearby])
+        cell_tx = cells // rows // grid + tx0
+        cell_ty = cells % rows // grid + ty0
+        members = columns.label_ids[nearby[first]]
+
+        for tile_x, tile_y, x, y, count, anchors, label_id in zip(
+                cell_tx.tolist(), cell_ty.tolist(), centroid_x.tolist(), centroid_y.tolist(), counts.tolist(),
+                base_stations.astype(np.int64).tolist(), members.tolist()):
+            cluster = {"x": x, "y": y, "count": count, "base_stations": anchors}
+            if count == 1:
+                cluster["label_id"] = label_id
+            tiles[(zoom, tile_x, tile_y)].append(cluster)
+        return tiles
@@ -0,0 +1,149 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from data.repositories.position_repository import PositionRepository
+from domain.entities.update_request import UpdateRequest
+
+logger = logging.getLogger(__name__)
+
+LOG_PREFIX = "updates-"
+LOG_SUFFIX = ".jsonl"
+# First bytes of a base station record, lets readers tell records apart without parsing
+ANCHORS_MARKER = b'{"type":"anchors"'
+
+
+class UpdateLogRepository:
+    """
+    Append-only log of accepted updates, one JSON object per line.
+
+    append() only puts the request on an in-memory queue, a background
+    thread serializes and writes in batches, so the request path never
+    touches the disk. Files rotate at max_bytes; each starts with the
+    base stations in effect and a new anchors record is written whenever
+    they change, so every file can be replayed on its own. When the queue
+    is full new records are dropped and counted.
+
+        {"type":"anchors","t":...,"anchors":{"<id>":{"x":..,"y":..}}}
+        {"t":...,"id":"<tag>","neighbors":{"<id>":-60}}
+    """
+    def __init__(self, directory: str = "update_log", position_repository: Optional[PositionRepository] = None,
+                 max_bytes: int = 64 * 1024 * 1024, flush_interval: float = 1.0,
+                 max_queue: int = 100000, writer: str = ""):
+        self.directory = directory
+        self.position_repository = position_repository
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.writer = writer
+        os.makedirs(directory, exist_ok=True)
+
+        # (timestamp, update) or (timestamp, anchors dict), appended from any thread
+        self._queue: deque = deque()
+        self._anchor_version: Optional[int] = None
+        self._anchors: Optional[Tuple[float, Dict]] = None
+        self._file = None
+        self._file_bytes = 0
+        self._dropped = 0
+        self._written = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="update-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write everything still queued and close the current file"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._drain()
+        self._close_file()
+
+    def append(self, update_request: UpdateRequest, timestamp: Optional[float] = None):
+        """Queue an accepted update for writing, never blocks"""
+        if len(self._queue) >= self.max_queue:
+            self._dropped += 1
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.position_repository is not None:
+            version = self.position_repository.anchor_version
+            if version != self._anchor_version:
+                self._anchor_version = version
+                self._queue.append((timestamp, self.position_repository.get_base_stations()))
+        self._queue.append((timestamp, update_request))
+
+    def stats(self) -> Dict:
+        return {"queued": len(self._queue), "written": self._written, "dropped": self._dropped}
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._drain()
+            except OSError as e:
+                logger.error(f"Update log write failed: {e}")
+
+    def _drain(self):
+        written = 0
+        while self._queue:
+            timestamp, record = self._queue.popleft()
+            if isinstance(record, UpdateRequest):
+                line = json.dumps({"t": timestamp, "id": record.id, "neighbors": record.neighbors},
+                                  separators=(",", ":")).encode()
+            else:
+                self._anchors = (timestamp, record)
+                line = self._anchors_line()
+            if self._file is None or self._file_bytes >= self.max_bytes:
+                # A new file starts with the current anchors record itself
+                self._rotate()
+                if not isinstance(record, UpdateRequest):
+                    continue
+            self._file.write(line + b"\n")
+            self._file_bytes += len(line) + 1
+            written += 1
+        if self._file is not None:
+            self._file.flush()
+        self._written += written
+
+    def _anchors_line(self) -> bytes:
+        timestamp, anchors = self._anchors
+        return json.dumps({"type": "anchors", "t": timestamp, "anchors": anchors}, separators=(",", ":")).encode()
+
+    def _rotate(self):
+        self._close_file()
+        name = f"{time.time_ns() // 1000}-{self.writer}" if self.writer else str(time.time_ns() // 1000)
+        self._file = open(os.path.join(self.directory, f"{LOG_PREFIX}{name}{LOG_SUFFIX}"), "ab", buffering=1 << 20)
+        self._file_bytes = 0
+        if self._anchors is not None:
+            line = self._anchors_line()
+            self._file.write(line + b"\n")
+            self._file_bytes += len(line) + 1
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def list_log_files(path: str) -> List[str]:
+    """Log files of a directory in the order they were started, or the path itself"""
+    if os.path.isfile(path):
+        return [path]
+    files = glob.glob(os.path.join(path, f"{LOG_PREFIX}*{LOG_SUFFIX}"))
+    return sorted(files, key=lambda name: int(os.path.basename(name)[len(LOG_PREFIX):].split("-")[0].split(".")[0]))
+
+
+def read_log_lines(path: str) -> Iterator[bytes]:
+    """Stream the raw lines of a log file, a truncated last line is skipped"""
+    with open(path, "rb") as f:
+        for line in f:
+            if line.endswith(b"\n"):
+                yield line
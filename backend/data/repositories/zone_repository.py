@@ -0,0 +1,192 @@
+import math
+import threading
+import time
+from itertools import chain
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from core.errors import InvalidZoneException
+from domain.entities.zone import Zone
+from domain.entities.zone_event import ZoneEvent
+
+Cell = Tuple[int, int]
+ZoneListener = Callable[[ZoneEvent], None]
+
+
+def point_in_polygon(x: float, y: float, polygon: List[Tuple[float, float]]) -> bool:
+    """Ray casting test, points on an edge may fall either way"""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+class ZoneRepository:
+    """
+    Zones indexed by a uniform grid over their bounding boxes, plus the
+    current zone membership of every tag.
+
+    evaluate() tests a position only against the zones registered in its
+    grid cell and diffs the result with the tag's previous membership, so
+    the cost per update does not depend on the total number of zones.
+    Zones spanning more than max_cells cells are not put in the grid but
+    kept in a list that every position is tested against, so one huge
+    zone costs a bounding box check per update instead of memory per cell.
+    Zones wider or taller than max_extent meters are rejected.
+    """
+    def __init__(self, cell_size: float = 5.0, max_cells: int = 4096, max_extent: float = 10000.0):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.max_extent = max_extent
+        self._zones: Dict[str, Zone] = {}
+        self._bounds: Dict[str, Tuple[float, float, float, float]] = {}
+        self._cells: Dict[Cell, Set[str]] = {}
+        # Zones too large for the grid
+        self._large: Set[str] = set()
+        self._membership: Dict[str, FrozenSet[str]] = {}
+        self._members: Dict[str, Set[str]] = {}
+        self._last_seen: Dict[str, Tuple[float, float]] = {}
+        self._listeners: List[ZoneListener] = []
+        self._lock = threading.RLock()
+
+    def subscribe(self, listener: ZoneListener):
+        """Register a callback invoked with every enter/exit event"""
+        self._listeners.append(listener)
+
+    def save_zone(self, zone: Zone):
+        """
+        Add or replace a zone; tags are re-evaluated on their next update.
+        Raises InvalidZoneException for non-finite or oversized polygons.
+        """
+        xs = [x for x, _ in zone.polygon]
+        ys = [y for _, y in zone.polygon]
+        if not all(map(math.isfinite, chain(xs, ys))):
+            raise InvalidZoneException(f"Zone {zone.id} has non-finite coordinates")
+        bounds = (min(xs), min(ys), max(xs), max(ys))
+        if bounds[2] - bounds[0] > self.max_extent or bounds[3] - bounds[1] > self.max_extent:
+            raise InvalidZoneException(f"Zone {zone.id} is larger than {self.max_extent} m across")
+        with self._lock:
+            if zone.id in self._zones:
+                self._unindex(zone.id)
+            self._zones[zone.id] = zone
+            self._bounds[zone.id] = bounds
+            self._members.setdefault(zone.id, set())
+            if self._count_cells(bounds) > self.max_cells:
+                self._large.add(zone.id)
+                return
+            for cell in self._cells_for(bounds):
+                self._cells.setdefault(cell, set()).add(zone.id)
+
+    def remove_zone(self, zone_id: str) -> bool:
+        """Remove a zone, emitting exit events for the tags inside it"""
+        with self._lock:
+            if zone_id not in self._zones:
+                return False
+            self._unindex(zone_id)
+            del self._zones[zone_id]
+            del self._bounds[zone_id]
+            for label_id in self._members.pop(zone_id, set()):
+                self._membership[label_id] = self._membership[label_id] - {zone_id}
+                x, y = self._last_seen[label_id]
+                self._emit(ZoneEvent(type="exit", zone_id=zone_id, label_id=label_id,
+                                     x=x, y=y, timestamp=time.time()))
+            return True
+
+    def get_zone(self, zone_id: str) -> Optional[Zone]:
+        return self._zones.get(zone_id)
+
+    def get_all_zones(self) -> List[Zone]:
+        with self._lock:
+            return list(self._zones.values())
+
+    def get_members(self, zone_id: str) -> List[str]:
+        """Label ids currently inside a zone"""
+        with self._lock:
+            return sorted(self._members.get(zone_id, ()))
+
+    def get_membership(self, label_id: str) -> FrozenSet[str]:
+        return self._membership.get(label_id, frozenset())
+
+    def zones_at(self, x: float, y: float) -> FrozenSet[str]:
+        """Ids of the zones containing a point"""
+        candidates = self._cells.get(self._cell(x, y), ())
+        if not candidates and not self._large:
+            return frozenset()
+        inside = []
+        for zone_id in chain(candidates, self._large):
+            x0, y0, x1, y1 = self._bounds[zone_id]
+            if x0 <= x <= x1 and y0 <= y <= y1 and point_in_polygon(x, y, self._zones[zone_id].polygon):
+                inside.append(zone_id)
+        return frozenset(inside)
+
+    def evaluate(self, label_id: str, x: float, y: float,
+                 timestamp: Optional[float] = None) -> List[ZoneEvent]:
+        """Update a tag's membership for a new position and emit enter/exit events"""
+        with self._lock:
+            current = self.zones_at(x, y)
+            previous = self._membership.get(label_id, frozenset())
+            self._last_seen[label_id] = (x, y)
+            if current == previous:
+                return []
+            self._membership[label_id] = current
+            timestamp = time.time() if timestamp is None else timestamp
+            events = []
+            for zone_id in previous - current:
+                self._members[zone_id].discard(label_id)
+                events.append(ZoneEvent(type="exit", zone_id=zone_id, label_id=label_id,
+                                        x=x, y=y, timestamp=timestamp))
+            for zone_id in current - previous:
+                self._members[zone_id].add(label_id)
+                events.append(ZoneEvent(type="enter", zone_id=zone_id, label_id=label_id,
+                                        x=x, y=y, timestamp=timestamp))
+            for event in events:
+                self._emit(event)
+            return events
+
+    def forget(self, label_id: str) -> List[ZoneEvent]:
+        """Drop a tag, emitting exit events for the zones it was in"""
+        with self._lock:
+            previous = self._membership.pop(label_id, frozenset())
+            x, y = self._last_seen.pop(label_id, (0.0, 0.0))
+            events = []
+            for zone_id in previous:
+                self._members[zone_id].discard(label_id)
+                events.append(ZoneEvent(type="exit", zone_id=zone_id, label_id=label_id,
+                                        x=x, y=y, timestamp=time.time()))
+            for event in events:
+                self._emit(event)
+            return events
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _count_cells(self, bounds: Tuple[float, float, float, float]) -> int:
+        cx0, cy0 = self._cell(bounds[0], bounds[1])
+        cx1, cy1 = self._cell(bounds[2], bounds[3])
+        return (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+
+    def _cells_for(self, bounds: Tuple[float, float, float, float]):
+        cx0, cy0 = self._cell(bounds[0], bounds[1])
+        cx1, cy1 = self._cell(bounds[2], bounds[3])
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                yield (cx, cy)
+
+    def _unindex(self, zone_id: str):
+        if zone_id in self._large:
+            self._large.discard(zone_id)
+            return
+        for cell in self._cells_for(self._bounds[zone_id]):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(zone_id)
+                if not bucket:
+                    del self._cells[cell]
+
+    def _emit(self, event: ZoneEvent):
+        for listener in self._listeners:
+            listener(event)
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class AccessBatchESPRequest(BaseModel):
+    my_id: str
+    seen_ids: List[str] = Field(max_length=1000)
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import List
+from domain.entities.update_request import UpdateRequest
+
+class BatchUpdateRequest(BaseModel):
+    updates: List[UpdateRequest]
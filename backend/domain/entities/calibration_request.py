@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List
+
+class CalibrationCapture(BaseModel):
+    distances: List[float] = Field(max_length=100000)  # meters from the anchor, parallel to rssi
+    rssi: List[int] = Field(max_length=100000)
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if len(self.distances) != len(self.rssi):
+            raise ValueError("distances and rssi must have the same length")
+        if any(distance <= 0 for distance in self.distances):
+            raise ValueError("distances must be positive")
+        return self
+
+class CalibrationRequest(BaseModel):
+    captures: Dict[str, CalibrationCapture]  # anchor_id -> reference capture
@@ -7,3 +7,4 @@ class Position(BaseModel):
     y: float
     is_base_station: bool = False
     distance_to_base: Optional[float] = None  # Distance to first base station in meters
+    updated_at: Optional[float] = None  # Unix time of the fix, None for configured base stations
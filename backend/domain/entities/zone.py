@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+from typing import List, Tuple
+
+class Zone(BaseModel):
+    id: str
+    name: str = ""
+    polygon: List[Tuple[float, float]] = Field(min_length=3)  # (x, y) vertices in meters
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+class ZoneEvent(BaseModel):
+    type: str  # "enter" or "exit"
+    zone_id: str
+    label_id: str
+    x: float
+    y: float
+    timestamp: float
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from domain.entities.update_request import UpdateRequest
+from domain.interactors.label_interactor import LabelInteractor
+
+logger = logging.getLogger(__name__)
+
+
+class IngestPipeline:
+    """
+    Staged, non-blocking /update ingestion.
+
+    Handlers only enqueue validated requests. Pending updates are coalesced to
+    the latest one per tag, so the queue holds at most one entry per tag and
+    never more than max_depth entries; beyond that new tags are shed. Worker
+    tasks drain the queue in batches and run LabelInteractor.post_updates on a
+    thread pool, keeping SQLite reads and the solve off the event loop.
+
+    Handlers cannot tell the sender about unknown tags, those are only
+    counted as not_found. on_applied is called on the event loop with every
+    update whose tag was found, e.g. to log it for replay.
+    """
+    def __init__(self, interactor: LabelInteractor, max_depth: int = 10000,
+                 workers: int = 2, batch_size: int = 256,
+                 on_applied: Optional[Callable[[UpdateRequest], object]] = None):
+        self.interactor = interactor
+        self.on_applied = on_applied
+        self.max_depth = max_depth
+        self.workers = workers
+        self.batch_size = batch_size
+        self._pending: "OrderedDict[str, Tuple[UpdateRequest, float]]" = OrderedDict()
+        self._in_flight: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._counters = {
+            "accepted": 0,
+            "coalesced": 0,
+            "shed": 0,
+            "processed": 0,
+            "not_found": 0,
+            "no_fix": 0,
+            "failed": 0,
+        }
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Process what is still pending, then stop the workers"""
+        while self._pending or self._in_flight:
+            await asyncio.sleep(0.01)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=True)
+
+    def submit(self, update_request: UpdateRequest) -> bool:
+        """Enqueue an update, returns False if it was shed because the queue is full"""
+        label_id = update_request.id
+        entry = self._pending.get(label_id)
+        if entry is not None:
+            # Keep the queue slot and original enqueue time, replace the payload
+            self._pending[label_id] = (update_request, entry[1])
+            self._counters["coalesced"] += 1
+            return True
+        if len(self._pending) >= self.max_depth:
+            self._counters["shed"] += 1
+            return False
+        self._pending[label_id] = (update_request, time.monotonic())
+        self._counters["accepted"] += 1
+        self._wakeup.set()
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "depth": len(self._pending),
+            "max_depth": self.max_depth,
+            "in_flight": len(self._in_flight),
+            "last_lag_seconds": self._last_lag,
+            "max_lag_seconds": self._max_lag,
+            **self._counters,
+        }
+
+    def _take_batch(self) -> List[Tuple[UpdateRequest, float]]:
+        # A tag already being solved stays pending so its updates apply in order
+        batch = []
+        for label_id in list(self._pending):
+            if label_id in self._in_flight:
+                continue
+            batch.append(self._pending.pop(label_id))
+            self._in_flight.add(label_id)
+            if len(batch) >= self.batch_size:
+                break
+        return batch
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            self._last_lag = now - min(enqueued_at for _, enqueued_at in batch)
+            self._max_lag = max(self._max_lag, self._last_lag)
+            requests = [update_request for update_request, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.interactor.post_updates, requests)
+                self._counters["processed"] += len(requests)
+                for status in results.values():
+                    if status in ("not_found", "no_fix"):
+                        self._counters[status] += 1
+                if self.on_applied is not None:
+                    for update_request in requests:
+                        if results.get(update_request.id) != "not_found":
+                            self.on_applied(update_request)
+            except Exception:
+                logger.exception("Ingest batch failed")
+                self._counters["failed"] += len(requests)
+            finally:
+                for update_request in requests:
+                    self._in_flight.discard(update_request.id)
+                if self._pending:
+                    self._wakeup.set()
@@ -1,43 +1,75 @@
 from data.repositories.label_repository import LabelRepository
 from data.repositories.position_repository import PositionRepository
+from data.repositories.zone_repository import ZoneRepository
 from domain.entities.label import Label
 from domain.entities.access_request import AccessRequest
 from domain.entities.signal_data import SignalData
 from domain.entities.update_request import UpdateRequest
 from domain.entities.position import Position
-from core.errors import NotFoundLabelException, DismatchPasswordException
-from core.geometry import calculate_position_from_signals
-from typing import List, Dict
+from domain.entities.zone import Zone
+from domain.entities.calibration_request import CalibrationRequest
+from core.errors import NotFoundLabelException, DismatchPasswordException, NotFoundZoneException, NotFoundCalibrationException
+from core.calibration import fit_profiles
+from core.cooperative import CooperativeLocalizer, CooperativeSolution
+from core.geometry import calculate_position_from_signals, calculate_positions_batch, SOLVER_TRILATERATION
+from core.metrics import MetricsRegistry
+from core.cache import LRUCache, MISSING
+from typing import Iterable, Iterator, List, Dict, Optional
+import struct
+import time
+import numpy as np
 
 class LabelInteractor():
-    def __init__(self, repository: LabelRepository, position_repository: PositionRepository = None):
+    def __init__(self, repository: LabelRepository, position_repository: PositionRepository = None,
+                 solver: str = SOLVER_TRILATERATION, refine_steps: int = 0,
+                 zone_repository: ZoneRepository = None, metrics: MetricsRegistry = None,
+                 access_cache_size: int = 0, access_cache_ttl: Optional[float] = None,
+                 cooperative: CooperativeLocalizer = None):
         self.repository = repository
         self.position_repository = position_repository or PositionRepository()
-        self._label_counter = 0
+        self.zone_repository = zone_repository or ZoneRepository()
+        # Position solver used by post_update/post_updates, see core.geometry
+        self.solver = solver
+        self.refine_steps = refine_steps
+        # Neighbour graph for tags without 3 anchors, see solve_cooperative; None disables
+        self.cooperative = cooperative
+        # (own_id, neighbour_id, passwords) -> (allowed, label repository version)
+        self._access_cache = LRUCache(max_size=access_cache_size, ttl=access_cache_ttl) if access_cache_size > 0 else None
+        # Hot path instrumentation, no-ops unless an enabled registry is passed
+        metrics = metrics or MetricsRegistry(enabled=False)
+        stage_seconds = metrics.histogram(
+            "geomax_stage_seconds", "Time spent in each stage of an interactor operation", ("operation", "stage"))
+        self._access_stages = stage_seconds.stages("access")
+        self._access_batch_stages = stage_seconds.stages("access_batch")
+        self._update_stages = stage_seconds.stages("update")
+        self._update_batch_stages = stage_seconds.stages("update_batch")
+        self._positions_stages = stage_seconds.stages("positions")
+        self._cooperative_stages = stage_seconds.stages("cooperative")
+        self._solver_failures = metrics.counter(
+            "geomax_solver_failures_total", "Updates with at least 3 known anchors that the solver could not place")
+        self._insufficient_anchors = metrics.counter(
+            "geomax_insufficient_anchors_total", "Updates that heard fewer than 3 known anchors")
+        self._expired = metrics.counter(
+            "geomax_positions_expired_total", "Tags dropped after not being updated within the position ttl")
+        self._cooperative_fixes = metrics.counter(
+            "geomax_cooperative_fixes_total", "Positions of tags without 3 anchors solved from the neighbour graph")
 
     def create(self, label: Label):
         self.repository.add(label)
         
-        # Automatically assign base station positions for first 3 labels
-        self._label_counter += 1
-        if self._label_counter <= 3:
-            # Set default positions for base stations
-            # These will be overridden by user configuration
-            if self._label_counter == 1:
-                position = Position(label_id=label.id, x=0.0, y=0.0, is_base_station=True)
-            elif self._label_counter == 2:
-                position = Position(label_id=label.id, x=10.0, y=0.0, is_base_station=True)
-            elif self._label_counter == 3:
-                position = Position(label_id=label.id, x=0.0, y=10.0, is_base_station=True)
-            
-            self.position_repository.save_position(position)
+        # Automatically assign base station positions for first 3 labels.
+        # These will be overridden by user configuration
+        self.position_repository.assign_default_base_station(label.id)
 
     def access_request(self, access_request: AccessRequest):
+        clock = self._access_stages
+        since = clock.start()
         existing_label = self.repository.get_by_id(access_request.own_id)
         if not existing_label:
             raise NotFoundLabelException("not found label sender")
         
         neighbour_label = self.repository.get_by_id(access_request.neighbour_id)
+        clock.mark("lookup", since)
         if not neighbour_label:
             raise NotFoundLabelException("not found label recipient")
         
@@ -49,48 +81,308 @@ class LabelInteractor():
         if existing_label.own_password != own_label.own_password:
             raise DismatchPasswordException("own passwords don't match")
     
+    def access_batch(self, own_id: str, neighbour_ids: List[str],
+                     com_password: str, own_password: str) -> Dict[str, bool]:
+        """
+        Decide access_request for many neighbours of one sender at once.
+
+        Returns {neighbour_id: allowed}. Unknown decisions are resolved
+        with a single repository lookup and memoized until the label
+        repository changes.
+        """
+        clock = self._access_batch_stages
+        since = clock.start()
+        version = self.repository.version
+        results: Dict[str, bool] = {}
+        unresolved = []
+        for neighbour_id in neighbour_ids:
+            cached = MISSING
+            if self._access_cache is not None:
+                cached = self._access_cache.get((own_id, neighbour_id, com_password, own_password))
+            if cached is not MISSING and cached[1] == version:
+                results[neighbour_id] = cached[0]
+            else:
+                unresolved.append(neighbour_id)
+        since = clock.mark("cache", since)
+        if not unresolved:
+            return results
+
+        labels = self.repository.get_by_ids([own_id, *unresolved])
+        clock.mark("lookup", since)
+        sender = labels[own_id]
+        sender_allowed = (sender is not None and sender.com_password == com_password
+                          and sender.own_password == own_password)
+        for neighbour_id in unresolved:
+            allowed = sender_allowed and labels[neighbour_id] is not None
+            results[neighbour_id] = allowed
+            if self._access_cache is not None:
+                self._access_cache.set((own_id, neighbour_id, com_password, own_password), (allowed, version))
+        return results
+
     def post_update(self, update_request: UpdateRequest):
         """Process update with neighbor RSSI data and calculate position"""
+        clock = self._update_stages
+        since = clock.start()
         # Verify label exists
         label = self.repository.get_by_id(update_request.id)
+        since = clock.mark("lookup", since)
         if not label:
             raise NotFoundLabelException("Label not found")
+        if self.cooperative is not None:
+            self.cooperative.observe(update_request.id, update_request.neighbors)
         
-        # Get base stations configuration
-        base_stations = {}
-        all_positions = self.position_repository.get_all_positions()
-        for label_id, position in all_positions.items():
-            if position.is_base_station:
-                base_stations[label_id] = {"x": position.x, "y": position.y}
+        base_stations, solver_cache = self.position_repository.get_anchor_index()
+        since = clock.mark("anchors", since)
         
         # Calculate position if we have enough base stations
-        if len(base_stations) >= 3:
-            result = calculate_position_from_signals(update_request.neighbors, base_stations)
+        if not self._count_anchors(update_request, base_stations):
+            return
+        result = calculate_position_from_signals(update_request.neighbors, base_stations,
+                                                 self.solver, self.refine_steps,
+                                                 solver_cache)
+        since = clock.mark("solve", since)
+        if not result:
+            self._solver_failures.inc()
+            return
+        x, y = result
+        position = Position(label_id=update_request.id, x=x, y=y, is_base_station=False,
+                            updated_at=time.time())
+        self.position_repository.save_position(position)
+        since = clock.mark("store", since)
+        self.zone_repository.evaluate(position.label_id, x, y)
+        clock.mark("zones", since)
+    
+    def post_updates(self, update_requests: List[UpdateRequest]) -> Dict[str, str]:
+        """
+        Process many updates at once and store the solved positions in bulk.
+
+        Returns a status per label id: "ok", "not_found" or "no_fix".
+        """
+        clock = self._update_batch_stages
+        since = clock.start()
+        results: Dict[str, str] = {}
+        known: List[UpdateRequest] = []
+        for update_request in update_requests:
+            if self.repository.get_by_id(update_request.id):
+                known.append(update_request)
+            else:
+                results[update_request.id] = "not_found"
+        since = clock.mark("lookup", since)
+        if self.cooperative is not None:
+            for update_request in known:
+                self.cooperative.observe(update_request.id, update_request.neighbors)
+
+        base_stations, solver_cache = self.position_repository.get_anchor_index()
+        since = clock.mark("anchors", since)
+        solvable = []
+        for update_request in known:
+            if self._count_anchors(update_request, base_stations):
+                solvable.append(update_request)
+            else:
+                results[update_request.id] = "no_fix"
+        if not solvable:
+            return results
+
+        solved = calculate_positions_batch([update_request.neighbors for update_request in solvable], base_stations,
+                                           self.solver, self.refine_steps,
+                                           solver_cache)
+        since = clock.mark("solve", since)
+        positions = []
+        now = time.time()
+        for update_request, result in zip(solvable, solved):
             if result:
                 x, y = result
-                position = Position(label_id=update_request.id, x=x, y=y, is_base_station=False)
-                self.position_repository.save_position(position)
-    
+                positions.append(Position(label_id=update_request.id, x=x, y=y, is_base_station=False,
+                                          updated_at=now))
+                results[update_request.id] = "ok"
+            else:
+                results[update_request.id] = "no_fix"
+        if len(positions) < len(solvable):
+            self._solver_failures.inc(len(solvable) - len(positions))
+
+        self.position_repository.save_positions(positions)
+        since = clock.mark("store", since)
+        for position in positions:
+            self.zone_repository.evaluate(position.label_id, position.x, position.y)
+        clock.mark("zones", since)
+        return results
+
+    def _count_anchors(self, update_request: UpdateRequest, base_stations: Dict) -> bool:
+        """Whether the update heard at least 3 known anchors, counts it otherwise"""
+        heard = 0
+        for neighbor_id in update_request.neighbors:
+            if neighbor_id in base_stations:
+                heard += 1
+                if heard >= 3:
+                    return True
+        self._insufficient_anchors.inc()
+        return False
+
+    def solve_cooperative(self) -> Optional[CooperativeSolution]:
+        """
+        Solve the neighbour graph and store the positions of tags that heard
+        fewer than 3 anchors; tags with a direct fix keep it.
+        """
+        if self.cooperative is None:
+            return None
+        clock = self._cooperative_stages
+        since = clock.start()
+        base_stations, solver_cache = self.position_repository.get_anchor_index()
+
+        def store(solved: Dict[str, tuple]):
+            # Runs under the localizer's lock, delete() waits for it in cooperative.forget
+            nonlocal since
+            since = clock.mark("solve", since)
+            now = time.time()
+            positions = [
+                Position(label_id=label_id, x=x, y=y, is_base_station=False, updated_at=now)
+                for label_id, (x, y) in solved.items()
+            ]
+            self.position_repository.save_positions(positions)
+            since = clock.mark("store", since)
+            for position in positions:
+                self.zone_repository.evaluate(position.label_id, position.x, position.y)
+            clock.mark("zones", since)
+            self._cooperative_fixes.inc(len(positions))
+
+        solution = self.cooperative.solve(base_stations, solver_cache, self._stored_coordinates, store=store)
+        if not solution.positions:
+            clock.mark("solve", since)
+        return solution
+
+    def _stored_coordinates(self, label_id: str) -> Optional[tuple]:
+        position = self.position_repository.get_position(label_id)
+        return (position.x, position.y) if position is not None else None
+
     def post_signals(self, signal_data: SignalData):
         """Legacy method for signal data"""
         pass
 
     def delete(self, label_id: str):
+        """
+        Delete a label and everything kept for it: the cached label, its
+        position (listeners drop the history ring and notify live clients)
+        and its zone memberships. Memoized access decisions are invalidated
+        by the label repository version.
+        """
         self.repository.delete(label_id)
+        # First, so a cooperative solve in flight cannot store the tag again afterwards
+        if self.cooperative is not None:
+            self.cooperative.forget(label_id)
+        self.position_repository.remove_position(label_id)
+        self.zone_repository.forget(label_id)
+
+    def expire_stale(self, now: Optional[float] = None) -> List[str]:
+        """Drop the positions and zone memberships of tags silent for longer than the ttl"""
+        expired = self.position_repository.expire_stale(now)
+        for label_id in expired:
+            self.zone_repository.forget(label_id)
+            if self.cooperative is not None:
+                self.cooperative.forget(label_id)
+        if expired:
+            self._expired.inc(len(expired))
+        return expired
+
+    def import_labels(self, documents: Iterable) -> Dict:
+        """
+        Provision labels in bulk, overwriting the passwords of existing ids.
+
+        Unlike create() this does not assign default base stations.
+        """
+        return self.repository.upsert_all(documents)
+
+    def export_labels(self) -> Iterator[Dict]:
+        """Stream every label as a document"""
+        return (self.repository.translator.to_document(label) for label in self.repository.iter_all())
     
     def get_all_positions(self) -> List[Dict]:
         """Get all positions for visualization"""
-        positions = self.position_repository.get_all_positions()
+        clock = self._positions_stages
+        since = clock.start()
+        columns = self.position_repository.get_columns()
+        since = clock.mark("columns", since)
+        active = columns.active
+        positions = [
+            {"label_id": label_id, "x": x, "y": y, "is_base_station": is_base_station}
+            for label_id, x, y, is_base_station in zip(
+                columns.label_ids[active].tolist(),
+                columns.x[active].tolist(),
+                columns.y[active].tolist(),
+                columns.is_base_station[active].tolist(),
+            )
+        ]
+        clock.mark("serialize", since)
+        return positions
+    
+    def get_all_positions_binary(self) -> bytes:
+        """
+        Get all positions in a compact little-endian layout:
+        uint32 count, float32 x[count], float32 y[count], uint8 is_base_station[count],
+        then the label ids as UTF-8 separated by newlines
+        """
+        columns = self.position_repository.get_columns()
+        active = columns.active
+        label_ids = columns.label_ids[active]
+        return b"".join((
+            struct.pack("<I", len(label_ids)),
+            columns.x[active].astype("<f4").tobytes(),
+            columns.y[active].astype("<f4").tobytes(),
+            columns.is_base_station[active].astype(np.uint8).tobytes(),
+            "\n".join(label_ids.tolist()).encode(),
+        ))
+    
+    def get_position_changes(self, since: int) -> Dict:
+        """Get positions changed after the `since` cursor for incremental polling"""
+        changed, removed, cursor, full = self.position_repository.get_changes_since(since)
+        return {
+            "cursor": cursor,
+            "full": full,
+            "changed": [self._position_to_dict(pos) for pos in changed],
+            "removed": removed,
+        }
+    
+    def format_position_changes(self, changes: Dict[str, Optional[Position]]) -> Dict:
+        """Shape coalesced {label_id: position or None} changes like get_position_changes"""
+        return {
+            "cursor": self.position_repository.sequence,
+            "full": False,
+            "changed": [self._position_to_dict(pos) for pos in changes.values() if pos is not None],
+            "removed": [label_id for label_id, pos in changes.items() if pos is None],
+        }
+    
+    def find_positions_near(self, x: float, y: float, radius: float) -> List[Dict]:
+        """Get tags within radius meters of a point, nearest first"""
+        return [
+            {**self._position_to_dict(pos), "distance": distance}
+            for pos, distance in self.position_repository.find_within_radius(x, y, radius)
+        ]
+    
+    def find_positions_in_box(self, x0: float, y0: float, x1: float, y1: float) -> List[Dict]:
+        """Get tags inside a bounding box"""
+        return [self._position_to_dict(pos) for pos in self.position_repository.find_in_box(x0, y0, x1, y1)]
+    
+    def find_nearest_positions(self, k: int, x: Optional[float] = None, y: Optional[float] = None,
+                               label_id: Optional[str] = None) -> List[Dict]:
+        """Get the k nearest tags to a point or to another tag"""
+        if label_id is not None:
+            origin = self.position_repository.get_position(label_id)
+            if origin is None:
+                raise NotFoundLabelException("Position not found")
+            x, y = origin.x, origin.y
         return [
-            {
-                "label_id": pos.label_id,
-                "x": pos.x,
-                "y": pos.y,
-                "is_base_station": pos.is_base_station
-            }
-            for pos in positions.values()
+            {**self._position_to_dict(pos), "distance": distance}
+            for pos, distance in self.position_repository.find_nearest(x, y, k, exclude=label_id)
         ]
     
+    @staticmethod
+    def _position_to_dict(pos: Position) -> Dict:
+        return {
+            "label_id": pos.label_id,
+            "x": pos.x,
+            "y": pos.y,
+            "is_base_station": pos.is_base_station
+        }
+    
     def configure_base_stations(self, config: Dict):
         """Configure base station positions from user input"""
         # Expected config format:
@@ -99,13 +391,46 @@ class LabelInteractor():
         #   "base_station_2": {"label_id": "...", "x": 10, "y": 0},
         #   "base_station_3": {"label_id": "...", "x": 0, "y": 10}
         # }
+        positions = []
         for key, station_config in config.items():
             label_id = station_config.get("label_id")
             x = station_config.get("x", 0.0)
             y = station_config.get("y", 0.0)
             
             if label_id:
-                position = Position(label_id=label_id, x=float(x), y=float(y), is_base_station=True)
-                self.position_repository.save_position(position)
+                positions.append(Position(label_id=label_id, x=float(x), y=float(y), is_base_station=True))
         
-        self.position_repository.set_base_stations_config(config)
+        self.position_repository.configure_base_stations(positions, config)
+
+    def calibrate(self, request: CalibrationRequest) -> Dict:
+        """
+        Fit path loss profiles from reference captures and store the ones
+        that fit, returns {"profiles": {...}, "errors": {anchor_id: reason}}
+        """
+        profiles, errors = fit_profiles({
+            anchor_id: (capture.distances, capture.rssi) for anchor_id, capture in request.captures.items()
+        })
+        if profiles:
+            self.position_repository.set_calibration(profiles)
+        return {"profiles": profiles, "errors": errors}
+
+    def get_calibration(self) -> Dict[str, Dict]:
+        return self.position_repository.get_calibration()
+
+    def delete_calibration(self, anchor_id: str):
+        if not self.position_repository.remove_calibration(anchor_id):
+            raise NotFoundCalibrationException("Calibration not found")
+
+    def save_zone(self, zone: Zone):
+        """Register or replace a zone"""
+        self.zone_repository.save_zone(zone)
+    
+    def delete_zone(self, zone_id: str):
+        if not self.zone_repository.remove_zone(zone_id):
+            raise NotFoundZoneException("Zone not found")
+    
+    def get_zones(self) -> List[Dict]:
+        return [
+            {**zone.model_dump(), "members": self.zone_repository.get_members(zone.id)}
+            for zone in self.zone_repository.get_all_zones()
+        ]
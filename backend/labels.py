@@ -0,0 +1,83 @@
+"""
+Bulk import and export of labels straight against the label database.
+
+Run from the backend directory:
+    python labels.py import labels.csv
+    python labels.py import labels.jsonl --db dictionaries.db --report errors.json
+    python labels.py export --format csv --output labels.csv
+
+Files are JSON lines or CSV with the columns id, own_password and
+com_password; the format follows the file extension unless --format is
+given, and "-" reads stdin or writes stdout. Imports insert new ids and
+overwrite the passwords of existing ones in a single transaction, rows
+that fail validation are listed in the report. A running server picks
+up changed passwords once its label cache entries expire
+(GEOMAX_LABEL_CACHE_TTL); POST /api/labels/import updates it at once.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from core import config, label_io
+from data.repositories.label_repository import LabelRepository
+
+
+def import_file(repository: LabelRepository, path: str, fmt: str) -> dict:
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+    with stream:
+        return repository.upsert_all(label_io.read_rows(stream, fmt))
+
+
+def export_file(repository: LabelRepository, path: str, fmt: str) -> int:
+    count = 0
+
+    def documents():
+        nonlocal count
+        for label in repository.iter_all():
+            count += 1
+            yield repository.translator.to_document(label)
+
+    stream = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+    with stream:
+        stream.writelines(label_io.write_rows(documents(), fmt))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=config.DB_PATH, help="label database, default GEOMAX_DB_PATH")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="insert or update labels from a file")
+    import_parser.add_argument("file", help="JSON lines or CSV file, - for stdin")
+    import_parser.add_argument("--format", choices=label_io.FORMATS)
+    import_parser.add_argument("--report", help="write the full import report to this JSON file")
+    export_parser = commands.add_parser("export", help="write every label to a file")
+    export_parser.add_argument("--output", default="-", help="output file, - for stdout")
+    export_parser.add_argument("--format", choices=label_io.FORMATS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    repository = LabelRepository(db_path=args.db)
+    start = time.perf_counter()
+    if args.command == "import":
+        fmt = args.format or label_io.format_from_name(args.file)
+        report = import_file(repository, args.file, fmt)
+        elapsed = time.perf_counter() - start
+        print(f"{report['inserted']} inserted, {report['updated']} updated, {report['failed']} failed "
+              f"in {elapsed:.2f}s", file=sys.stderr)
+        for error in report["errors"][:20]:
+            print(f"row {error['row']} ({error['id']}): {error['error']}", file=sys.stderr)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+        sys.exit(1 if report["failed"] else 0)
+
+    fmt = args.format or label_io.format_from_name(args.output)
+    count = export_file(repository, args.output, fmt)
+    print(f"{count} labels exported in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
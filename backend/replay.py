@@ -0,0 +1,156 @@
+"""
+Replay update logs written by UpdateLogRepository and recompute positions.
+
+Run from the backend directory:
+    python replay.py update_log --solver least_squares --output fixes.jsonl
+    python replay.py update_log --apply-db dictionaries.db
+
+Log lines are read in order and cut into chunks that share the same base
+stations; worker processes parse and solve each chunk with the batch
+solver. --output writes every recomputed fix as JSON lines, --apply-db
+stores the latest fix of each tag and the last base stations into the
+shared SQLite position store (GEOMAX_POSITION_STORE=sqlite), e.g. to
+rebuild it after a crash.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.geometry import SOLVER_LEAST_SQUARES, SOLVER_TRILATERATION, calculate_positions_batch
+from data.repositories.update_log_repository import ANCHORS_MARKER, list_log_files, read_log_lines
+
+# (timestamp, label id, x, y)
+Fix = Tuple[float, str, float, float]
+
+
+def iter_chunks(paths: List[str], chunk_size: int) -> Iterator[Tuple[List[bytes], Dict]]:
+    """Yield (update lines, base stations) chunks, cut wherever the base stations change"""
+    anchors: Dict = {}
+    lines: List[bytes] = []
+    for path in paths:
+        for line in read_log_lines(path):
+            if line.startswith(ANCHORS_MARKER):
+                if lines:
+                    yield lines, anchors
+                    lines = []
+                anchors = json.loads(line)["anchors"]
+                continue
+            lines.append(line)
+            if len(lines) >= chunk_size:
+                yield lines, anchors
+                lines = []
+    if lines:
+        yield lines, anchors
+
+
+def solve_chunk(lines: List[bytes], anchors: Dict, solver: str, refine_steps: int,
+                since: Optional[float], until: Optional[float]) -> Tuple[int, List[Fix]]:
+    """Parse and solve one chunk, returns (updates considered, fixes)"""
+    records = [json.loads(line) for line in lines]
+    if since is not None or until is not None:
+        low = float("-inf") if since is None else since
+        high = float("inf") if until is None else until
+        records = [record for record in records if low <= record["t"] <= high]
+    if len(anchors) < 3:
+        return len(records), []
+    solved = calculate_positions_batch([record["neighbors"] for record in records], anchors,
+                                       solver, refine_steps, {})
+    fixes = [(record["t"], record["id"], result[0], result[1])
+             for record, result in zip(records, solved) if result]
+    return len(records), fixes
+
+
+def replay(chunks: Iterator[Tuple[List[bytes], Dict]], executor: Optional[Executor], args,
+           on_fixes) -> Tuple[int, int, Dict]:
+    """Solve all chunks keeping at most a few per process in flight, in log order"""
+    settings = (args.solver, args.refine_steps, args.since, args.until)
+    updates = fixes_total = 0
+    last_anchors: Dict = {}
+    pending = deque()
+
+    def collect(result):
+        nonlocal updates, fixes_total
+        count, fixes = result
+        updates += count
+        fixes_total += len(fixes)
+        on_fixes(fixes)
+
+    for lines, anchors in chunks:
+        last_anchors = anchors
+        if executor is None:
+            collect(solve_chunk(lines, anchors, *settings))
+            continue
+        pending.append(executor.submit(solve_chunk, lines, anchors, *settings))
+        if len(pending) >= 2 * args.processes:
+            collect(pending.popleft().result())
+    while pending:
+        collect(pending.popleft().result())
+    return updates, fixes_total, last_anchors
+
+
+def apply_to_db(db_path: str, latest: Dict[str, Fix], anchors: Dict):
+    from data.repositories.sqlite_position_repository import SqlitePositionRepository
+    from domain.entities.position import Position
+
+    repository = SqlitePositionRepository(db_path=db_path)
+    positions = [Position(label_id=label_id, x=x, y=y, is_base_station=False, updated_at=t)
+                 for label_id, (t, _, x, y) in latest.items() if label_id not in anchors]
+    positions += [Position(label_id=label_id, x=anchor["x"], y=anchor["y"], is_base_station=True)
+                  for label_id, anchor in anchors.items()]
+    repository.save_positions(positions)
+    repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="+", help="log files or directories")
+    parser.add_argument("--solver", default=SOLVER_TRILATERATION, choices=[SOLVER_TRILATERATION, SOLVER_LEAST_SQUARES])
+    parser.add_argument("--refine-steps", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="0 solves in this process")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--since", type=float, help="skip updates before this Unix time")
+    parser.add_argument("--until", type=float, help="skip updates after this Unix time")
+    parser.add_argument("--output", help="write every recomputed fix to this JSON lines file")
+    parser.add_argument("--apply-db", help="store the latest fixes into this SQLite position store")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    paths = [path for log in args.logs for path in list_log_files(log)]
+    latest: Dict[str, Fix] = {}
+    output = open(args.output, "w") if args.output else None
+
+    def on_fixes(fixes: List[Fix]):
+        for fix in fixes:
+            current = latest.get(fix[1])
+            if current is None or fix[0] >= current[0]:
+                latest[fix[1]] = fix
+        if output:
+            output.writelines(json.dumps({"t": t, "id": label_id, "x": x, "y": y}) + "\n"
+                              for t, label_id, x, y in fixes)
+
+    start = time.perf_counter()
+    chunks = iter_chunks(paths, args.chunk_size)
+    if args.processes > 0:
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            updates, fixes, anchors = replay(chunks, executor, args, on_fixes)
+    else:
+        updates, fixes, anchors = replay(chunks, None, args, on_fixes)
+    elapsed = time.perf_counter() - start
+    if output:
+        output.close()
+
+    logging.info(f"Replayed {updates} updates from {len(paths)} files in {elapsed:.2f}s "
+                 f"({updates / elapsed if elapsed else 0:,.0f} updates/s), {fixes} fixes, {len(latest)} tags")
+
+    if args.apply_db:
+        apply_to_db(args.apply_db, latest, anchors)
+        logging.info(f"Stored {len(latest)} positions and {len(anchors)} base stations in {args.apply_db}")
+
+
+if __name__ == "__main__":
+    main()
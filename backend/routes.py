@@ -1,25 +1,246 @@
-from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from domain.interactors.label_interactor import LabelInteractor
+from domain.interactors.ingest_pipeline import IngestPipeline
 from data.repositories.label_repository import LabelRepository
 from domain.entities.label import Label
 from domain.entities.signal_data import Signal, SignalData
 from domain.entities.access_request import AccessRequest
 from domain.entities.create_request import CreateRequest
 from domain.entities.access_esp_request import AccessESPRequest
+from domain.entities.access_batch_esp_request import AccessBatchESPRequest
 from domain.entities.update_request import UpdateRequest
-from core.errors import NotFoundLabelException, DismatchPasswordException
+from domain.entities.batch_update_request import BatchUpdateRequest
+from domain.entities.zone import Zone
+from domain.entities.calibration_request import CalibrationRequest
+from core.errors import (NotFoundLabelException, DismatchPasswordException, NotFoundZoneException,
+                         NotFoundCalibrationException, MalformedFrameException, InvalidZoneException)
+from core import config
+from core.hub import CoalescingHub, EventHub
+from core.metrics import MetricsMiddleware, MetricsRegistry
+from core import label_io
+from core.cooperative import CooperativeLocalizer
+from core.response_cache import ResponseCache
+from contextlib import asynccontextmanager
+from typing import Annotated, Dict, List, Optional
+import asyncio
+import io
+import json
+import tempfile
+import time
 import uvicorn
 import os
-
-app = FastAPI()
+from udp_server import start_udp_listener, updates_from_frames
 
 from data.repositories.position_repository import PositionRepository
+from data.repositories.columnar_position_repository import ColumnarPositionRepository
+from data.repositories.sqlite_position_repository import SqlitePositionRepository
+from data.repositories.history_repository import PositionHistoryRepository
+from data.repositories.zone_repository import ZoneRepository
+from data.repositories.update_log_repository import UpdateLogRepository
+from data.repositories.snapshot_repository import PositionSnapshotRepository
+from data.repositories.tile_repository import PositionTileRepository
+
+# Query coordinate; inf and nan are rejected with 422 before reaching the grid index
+Coordinate = Annotated[float, Query(allow_inf_nan=False)]
+
+# Prometheus metrics served on /metrics; disabled registries record nothing
+metrics = MetricsRegistry(enabled=config.METRICS_ENABLED)
+
+repository = LabelRepository(
+    db_path=config.DB_PATH,
+    pooled=config.DB_POOLED,
+    cache_size=config.LABEL_CACHE_SIZE if config.PER_PROCESS_STATE else 0,
+    cache_ttl=config.LABEL_CACHE_TTL,
+    negative_ttl=config.LABEL_NEGATIVE_TTL,
+)
+position_expiry = {"ttl": config.POSITION_TTL, "expiry_resolution": config.POSITION_EXPIRY_RESOLUTION}
+if config.POSITION_STORE == "columnar":
+    position_repository = ColumnarPositionRepository(cell_size=config.SPATIAL_CELL_SIZE, **position_expiry)
+elif config.POSITION_STORE == "sqlite":
+    position_repository = SqlitePositionRepository(db_path=config.DB_PATH, cell_size=config.SPATIAL_CELL_SIZE,
+                                                   **position_expiry)
+else:
+    position_repository = PositionRepository(cell_size=config.SPATIAL_CELL_SIZE, **position_expiry)
+zone_repository = ZoneRepository(
+    cell_size=config.ZONE_CELL_SIZE,
+    max_cells=config.ZONE_MAX_CELLS,
+    max_extent=config.ZONE_MAX_EXTENT,
+)
+interactor = LabelInteractor(
+    repository=repository,
+    position_repository=position_repository,
+    solver=config.SOLVER,
+    refine_steps=config.SOLVER_REFINE_STEPS,
+    zone_repository=zone_repository,
+    metrics=metrics,
+    access_cache_size=config.ACCESS_CACHE_SIZE if config.PER_PROCESS_STATE else 0,
+    access_cache_ttl=config.ACCESS_CACHE_TTL,
+    cooperative=CooperativeLocalizer(
+        max_age=config.COOPERATIVE_MAX_AGE,
+        max_iterations=config.COOPERATIVE_ITERATIONS,
+    ) if config.COOPERATIVE_INTERVAL > 0 and config.PER_PROCESS_STATE else None,
+)
+
+# Fan-out of position changes to live stream subscribers
+position_hub = CoalescingHub(max_pending=config.STREAM_MAX_PENDING)
+position_repository.subscribe(position_hub.publish)
+
+# Zone enter/exit events for in-process and streaming consumers
+zone_event_hub = EventHub(max_queue=config.ZONE_EVENT_QUEUE)
+zone_repository.subscribe(zone_event_hub.publish)
+
+history_repository = PositionHistoryRepository(
+    directory=config.HISTORY_DIR,
+    capacity=config.HISTORY_CAPACITY,
+    max_tags=config.HISTORY_MAX_TAGS,
+    segment_seconds=config.HISTORY_SEGMENT_SECONDS,
+    retention_seconds=config.HISTORY_RETENTION_SECONDS,
+    # Worker processes sharing the position store write their own segment files
+    writer=str(os.getpid()) if config.POSITION_STORE == "sqlite" else "",
+)
+position_repository.subscribe(history_repository.record, local_only=True)
+
+# Clustered level-of-detail tiles, evicted by the positions that change in them
+tile_repository = PositionTileRepository(
+    position_repository,
+    tile_size=config.TILE_SIZE,
+    grid=config.TILE_GRID,
+    cache_size=config.TILE_CACHE_SIZE,
+)
+position_repository.subscribe(tile_repository.record)
+
+# Encoded bodies of the read endpoints, rebuilt once per position store change
+response_cache = ResponseCache(
+    max_size=config.RESPONSE_CACHE_SIZE,
+    encodings=config.RESPONSE_ENCODINGS,
+    min_size=config.RESPONSE_MIN_COMPRESS_SIZE,
+    gzip_level=config.RESPONSE_GZIP_LEVEL,
+    brotli_quality=config.RESPONSE_BROTLI_QUALITY,
+    encoder=config.JSON_ENCODER,
+)
+
+# Replayable log of accepted updates, see replay.py; None when disabled
+update_log = UpdateLogRepository(
+    directory=config.UPDATE_LOG_DIR,
+    position_repository=position_repository,
+    max_bytes=config.UPDATE_LOG_MAX_BYTES,
+    flush_interval=config.UPDATE_LOG_FLUSH_INTERVAL,
+    max_queue=config.UPDATE_LOG_MAX_QUEUE,
+    writer=str(os.getpid()) if config.POSITION_STORE == "sqlite" else "",
+) if config.UPDATE_LOG_ENABLED else None
+
+# Queue between the /update handlers and the solver, None when ingesting inline.
+# Queued updates reach the update log once their tag is known to exist
+ingest_pipeline = IngestPipeline(
+    interactor,
+    max_depth=config.INGEST_MAX_DEPTH,
+    workers=config.INGEST_WORKERS,
+    batch_size=config.INGEST_BATCH_SIZE,
+    on_applied=update_log.append if update_log else None,
+) if config.INGEST_ASYNC else None
+
+
+if ingest_pipeline:
+    metrics.gauge("geomax_ingest_queue_depth", "Updates waiting in the ingest queue",
+                  lambda: ingest_pipeline.stats()["depth"])
+metrics.gauge("geomax_response_cache_hit_ratio", "Share of read responses served from encoded bodies",
+              lambda: response_cache.stats()["hit_ratio"])
+metrics.gauge("geomax_label_cache_hit_ratio", "Share of label lookups answered by the cache",
+              lambda: (repository.cache_stats() or {}).get("hit_ratio", 0.0))
+if interactor.cooperative is not None:
+    metrics.gauge("geomax_cooperative_reports", "Tags whose latest neighbour report is in the cooperative graph",
+                  lambda: len(interactor.cooperative))
+
+
+# Warm restart state; the sqlite store is persistent already
+snapshot_repository = PositionSnapshotRepository(
+    config.SNAPSHOT_PATH, position_repository,
+) if config.SNAPSHOT_INTERVAL > 0 and config.POSITION_STORE != "sqlite" else None
+
+
+def ingest_updates(updates: List[UpdateRequest]) -> Dict[str, str]:
+    """Hand updates to the ingest pipeline, or solve them inline when it is disabled"""
+    if ingest_pipeline:
+        # Logged by the pipeline once solved, see IngestPipeline.on_applied
+        return {update.id: "accepted" if ingest_pipeline.submit(update) else "shed" for update in updates}
+    results = interactor.post_updates(updates)
+    if update_log:
+        for update in updates:
+            if results[update.id] != "not_found":
+                update_log.append(update)
+    return results
+
+
+async def flush_history_periodically():
+    while True:
+        await asyncio.sleep(config.HISTORY_FLUSH_INTERVAL)
+        await asyncio.to_thread(history_repository.flush)
+
+
+async def snapshot_periodically():
+    while True:
+        await asyncio.sleep(config.SNAPSHOT_INTERVAL)
+        await asyncio.to_thread(snapshot_repository.save)
 
-repository = LabelRepository()
-position_repository = PositionRepository()
-interactor = LabelInteractor(repository=repository, position_repository=position_repository)
+
+async def expire_positions_periodically():
+    while True:
+        await asyncio.sleep(config.POSITION_EXPIRY_RESOLUTION)
+        await asyncio.to_thread(interactor.expire_stale)
+
+
+async def solve_cooperative_periodically():
+    delay = config.COOPERATIVE_INTERVAL
+    while True:
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        await asyncio.to_thread(interactor.solve_cooperative)
+        # Large graphs are solved less often, keeping the solver under its share of a core
+        elapsed = time.perf_counter() - start
+        delay = max(config.COOPERATIVE_INTERVAL, elapsed * (1 / config.COOPERATIVE_MAX_LOAD - 1))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if snapshot_repository:
+        snapshot_repository.load()
+    position_hub.attach(asyncio.get_running_loop())
+    zone_event_hub.attach(asyncio.get_running_loop())
+    if ingest_pipeline:
+        await ingest_pipeline.start()
+    if update_log:
+        update_log.start()
+    history_task = asyncio.create_task(flush_history_periodically())
+    expiry_task = asyncio.create_task(expire_positions_periodically()) if config.POSITION_TTL > 0 else None
+    snapshot_task = asyncio.create_task(snapshot_periodically()) if snapshot_repository else None
+    cooperative_task = asyncio.create_task(solve_cooperative_periodically()) if interactor.cooperative is not None else None
+    udp_transport = None
+    if config.UDP_PORT:
+        udp_transport, _ = await start_udp_listener(config.UDP_HOST, config.UDP_PORT, ingest_updates)
+    yield
+    if udp_transport:
+        udp_transport.close()
+    history_task.cancel()
+    if expiry_task:
+        expiry_task.cancel()
+    if snapshot_task:
+        snapshot_task.cancel()
+    if cooperative_task:
+        cooperative_task.cancel()
+    if ingest_pipeline:
+        await ingest_pipeline.stop()
+    if update_log:
+        update_log.stop()
+    history_repository.flush()
+    if snapshot_repository:
+        snapshot_repository.save()
+
+
+app = FastAPI(lifespan=lifespan)
+if metrics.enabled:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
 
 
 # ESP endpoints
@@ -50,14 +271,52 @@ async def access_request(model: AccessESPRequest):
         return JSONResponse(content="false", status_code=200)
     except DismatchPasswordException:
         return JSONResponse(content="false", status_code=200)
+
+@app.post("/access/batch")
+async def access_request_batch(model: AccessBatchESPRequest):
+    """Check several newly seen neighbours at once, returns {"results": {seen_id: bool}}"""
+    results = interactor.access_batch(
+        own_id=model.my_id,
+        neighbour_ids=model.seen_ids,
+        com_password="corporate_secret",
+        own_password="corporate_secret",
+    )
+    return JSONResponse(content={"results": results}, status_code=200)
     
 @app.post("/update")
 async def send_signals(model: UpdateRequest):
+    """
+    Report a tag's neighbours. Inline ingestion answers 404 for an unknown
+    tag. With the ingest pipeline (GEOMAX_INGEST_ASYNC) the update is only
+    queued: 200 means accepted, unknown tags are counted as not_found in
+    /api/stats/ingest instead, and a full queue answers 503 with Retry-After.
+    """
+    if ingest_pipeline:
+        if not ingest_pipeline.submit(model):
+            raise HTTPException(status_code=503, headers={"Retry-After": "1"})
+        return JSONResponse(content={"status": "ok"}, status_code=200)
     try:
         interactor.post_update(model)
-        return JSONResponse(content={"status": "ok"}, status_code=200)
     except NotFoundLabelException:
         raise HTTPException(status_code=404)
+    if update_log:
+        update_log.append(model)
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+@app.post("/update/batch")
+async def send_signals_batch(model: BatchUpdateRequest):
+    results = ingest_updates(model.updates)
+    return JSONResponse(content={"status": "ok", "results": results}, status_code=200)
+
+@app.post("/update/binary")
+async def send_signals_binary(request: Request):
+    """Accept concatenated binary update frames, see core.binary_protocol"""
+    try:
+        updates = updates_from_frames(await request.body())
+    except MalformedFrameException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    results = ingest_updates(updates)
+    return JSONResponse(content={"status": "ok", "results": results}, status_code=200)
 
 @app.delete("/delete/{label_id}")
 async def delete(label_id: str):
@@ -65,18 +324,272 @@ async def delete(label_id: str):
     return JSONResponse(content={"status": "ok"}, status_code=200)
 
 # Web interface endpoints
+async def cached_response(request: Request, key, build, media_type: str = "application/json",
+                          raw: bool = False) -> Response:
+    """
+    Serve the encoded body of `key` for the current store version from
+    response_cache, built by `build` in a worker thread on a miss, in the
+    best coding the client accepts
+    """
+    version = position_repository.sequence
+    encoding = response_cache.negotiate(request.headers.get("accept-encoding"))
+    cached = response_cache.get(key, version, encoding)
+    if cached is None:
+        cached = await asyncio.to_thread(response_cache.get_or_build, key, version, build, encoding, raw)
+    headers = {"ETag": f'"{cached.version}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if cached.encoding:
+        headers["Content-Encoding"] = cached.encoding
+    return Response(content=cached.body, status_code=200, media_type=media_type, headers=headers)
+
 @app.get("/api/positions")
-async def get_positions():
-    """Get all calculated positions"""
-    positions = interactor.get_all_positions()
+async def get_positions(request: Request, since: Optional[int] = None):
+    """
+    Get all calculated positions, or only the changes after `since`.
+
+    The ETag is the change sequence, so an unchanged floor answers 304.
+    """
+    etag = f'"{position_repository.sequence}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    if since is None:
+        return await cached_response(request, "positions", interactor.get_all_positions)
+    return JSONResponse(content=interactor.get_position_changes(since), status_code=200, headers=headers)
+
+@app.get("/api/positions/binary")
+async def get_positions_binary(request: Request):
+    """Get all positions packed as arrays, see LabelInteractor.get_all_positions_binary"""
+    return await cached_response(request, "positions/binary", interactor.get_all_positions_binary,
+                                 media_type="application/octet-stream", raw=True)
+
+@app.get("/api/positions/stream")
+async def stream_positions():
+    """
+    Server-sent events: a full snapshot, then coalesced deltas in the same
+    shape as /api/positions?since=
+    """
+    subscription = position_hub.subscribe()
+
+    async def events():
+        try:
+            snapshot = interactor.get_position_changes(since=0)
+            yield f"event: positions\ndata: {json.dumps(snapshot)}\n\n"
+            while True:
+                changes, resync = await subscription.next_batch(timeout=config.STREAM_HEARTBEAT)
+                if resync:
+                    payload = interactor.get_position_changes(since=0)
+                elif changes:
+                    payload = interactor.format_position_changes(changes)
+                else:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: positions\ndata: {json.dumps(payload)}\n\n"
+                await asyncio.sleep(config.STREAM_INTERVAL)
+        finally:
+            position_hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/positions/near")
+async def get_positions_near(x: Coordinate, y: Coordinate, radius: float = Query(..., gt=0, allow_inf_nan=False)):
+    """Get tags within `radius` meters of (x, y)"""
+    return JSONResponse(content=interactor.find_positions_near(x, y, radius), status_code=200)
+
+@app.get("/api/positions/within")
+async def get_positions_within(x0: Coordinate, y0: Coordinate, x1: Coordinate, y1: Coordinate):
+    """Get tags inside the box spanned by (x0, y0) and (x1, y1)"""
+    return JSONResponse(content=interactor.find_positions_in_box(x0, y0, x1, y1), status_code=200)
+
+@app.get("/api/positions/nearest")
+async def get_nearest_positions(k: int = Query(5, gt=0, le=1000), x: Optional[Coordinate] = None,
+                                y: Optional[Coordinate] = None, label_id: Optional[str] = None):
+    """Get the k nearest tags to (x, y) or to the tag `label_id`"""
+    if label_id is None and (x is None or y is None):
+        raise HTTPException(status_code=422, detail="pass x and y, or label_id")
+    try:
+        positions = interactor.find_nearest_positions(k, x=x, y=y, label_id=label_id)
+    except NotFoundLabelException:
+        raise HTTPException(status_code=404)
     return JSONResponse(content=positions, status_code=200)
 
+@app.get("/api/positions/clusters")
+async def get_position_clusters(request: Request, x0: Coordinate, y0: Coordinate, x1: Coordinate, y1: Coordinate,
+                                zoom: int = Query(..., ge=0, le=config.TILE_MAX_ZOOM)):
+    """
+    Get tag counts and centroids clustered on a grid for the box spanned by
+    (x0, y0) and (x1, y1), see PositionTileRepository for the tiling
+    """
+    if tile_repository.count_tiles(zoom, x0, y0, x1, y1) > config.TILE_MAX_PER_REQUEST:
+        raise HTTPException(status_code=422, detail="the box covers too many tiles, lower the zoom or shrink the box")
+    etag = f'"{position_repository.sequence}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    edge = tile_repository.edge(zoom)
+
+    def build():
+        return {
+            "zoom": zoom,
+            "tile_size": edge,
+            "cell_size": edge / tile_repository.grid,
+            "clusters": tile_repository.get_clusters(zoom, x0, y0, x1, y1),
+        }
+
+    # Viewers sharing a view share the encoded body
+    return await cached_response(request, ("positions/clusters", zoom, x0, y0, x1, y1), build)
+
+@app.get("/api/positions/{label_id}/history")
+async def get_position_history(label_id: str,
+                               start: Optional[float] = Query(None, alias="from"),
+                               end: Optional[float] = Query(None, alias="to")):
+    """Get the track of a tag between unix timestamps `from` and `to`"""
+    timestamps, xs, ys = await asyncio.to_thread(history_repository.get_history, label_id, start, end)
+    content = {
+        "label_id": label_id,
+        "timestamps": timestamps.tolist(),
+        "x": xs.tolist(),
+        "y": ys.tolist(),
+    }
+    return JSONResponse(content=content, status_code=200)
+
 @app.post("/api/base-stations")
 async def configure_base_stations(config: dict):
     """Configure base station positions"""
     interactor.configure_base_stations(config)
     return JSONResponse(content={"status": "ok"}, status_code=200)
 
+@app.post("/api/calibration")
+async def calibrate_base_stations(model: CalibrationRequest):
+    """Fit per-anchor RSSI path loss profiles from reference captures at known distances"""
+    return JSONResponse(content=interactor.calibrate(model), status_code=200)
+
+@app.get("/api/calibration")
+async def get_calibration():
+    """Get the stored path loss profile of every calibrated anchor"""
+    return JSONResponse(content=interactor.get_calibration(), status_code=200)
+
+@app.delete("/api/calibration/{anchor_id}")
+async def delete_calibration(anchor_id: str):
+    """Return an anchor to the default path loss model"""
+    try:
+        interactor.delete_calibration(anchor_id)
+    except NotFoundCalibrationException:
+        raise HTTPException(status_code=404)
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+@app.post("/api/labels/import")
+async def import_labels(request: Request, format: Optional[str] = Query(None, pattern="^(jsonl|csv)$")):
+    """
+    Bulk insert or update labels from a JSON lines or CSV body.
+
+    The body is spooled to disk past a few megabytes and written in one
+    transaction; the report lists rows that were rejected by number.
+    """
+    fmt = format or label_io.format_from_name(request.headers.get("content-type", ""))
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        lines = io.TextIOWrapper(body, encoding="utf-8-sig", errors="replace", newline="")
+        report = await asyncio.to_thread(interactor.import_labels, label_io.read_rows(lines, fmt))
+    return JSONResponse(content=report, status_code=200)
+
+@app.get("/api/labels/export")
+async def export_labels(format: str = Query(label_io.FORMAT_JSONL, pattern="^(jsonl|csv)$")):
+    """Stream every label as JSON lines or CSV"""
+    media_type = "text/csv" if format == label_io.FORMAT_CSV else "application/x-ndjson"
+    return StreamingResponse(label_io.write_rows(interactor.export_labels(), format), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="labels.{format}"'})
+
+def require_zones():
+    """Zones live in each process, so every zone route is off while workers share the sqlite store"""
+    if not config.PER_PROCESS_STATE:
+        raise HTTPException(status_code=409, detail="zones are kept per process and are off with the sqlite store")
+
+@app.post("/api/zones")
+async def save_zone(zone: Zone):
+    """Register or replace a zone polygon"""
+    require_zones()
+    try:
+        await asyncio.to_thread(interactor.save_zone, zone)
+    except InvalidZoneException as e:
+        raise HTTPException(status_code=422, detail=e.message)
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+@app.get("/api/zones")
+async def get_zones():
+    """Get all zones with the tags currently inside them"""
+    require_zones()
+    return JSONResponse(content=interactor.get_zones(), status_code=200)
+
+@app.delete("/api/zones/{zone_id}")
+async def delete_zone(zone_id: str):
+    require_zones()
+    try:
+        interactor.delete_zone(zone_id)
+    except NotFoundZoneException:
+        raise HTTPException(status_code=404)
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+@app.get("/api/zones/events")
+async def stream_zone_events():
+    """Server-sent events: every zone enter/exit transition"""
+    require_zones()
+    queue = zone_event_hub.subscribe()
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=config.STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: zone\ndata: {event.model_dump_json()}\n\n"
+        finally:
+            zone_event_hub.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/stats/label-cache")
+async def label_cache_stats():
+    """Get label cache hit/miss/eviction counters"""
+    return JSONResponse(content=repository.cache_stats(), status_code=200)
+
+@app.get("/api/stats/tiles")
+async def tile_cache_stats():
+    """Get cluster tile cache hit/miss counters"""
+    return JSONResponse(content=tile_repository.stats(), status_code=200)
+
+@app.get("/api/stats/responses")
+async def response_cache_stats():
+    """Get encoded response cache hit/miss counters, size and codings"""
+    return JSONResponse(content=response_cache.stats(), status_code=200)
+
+@app.get("/api/stats/ingest")
+async def ingest_stats():
+    """Get ingest queue depth, lag and load-shedding counters"""
+    if not ingest_pipeline:
+        return JSONResponse(content={"enabled": False}, status_code=200)
+    return JSONResponse(content={"enabled": True, **ingest_pipeline.stats()}, status_code=200)
+
+@app.get("/api/stats/update-log")
+async def update_log_stats():
+    """Get queued, written and dropped update log records"""
+    if not update_log:
+        return JSONResponse(content={"enabled": False}, status_code=200)
+    return JSONResponse(content={"enabled": True, **update_log.stats()}, status_code=200)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage timings, solver counters and queue gauges in Prometheus text format"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404)
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/", response_class=HTMLResponse)
 async def serve_frontend():
     """Serve the web interface"""
@@ -0,0 +1,46 @@
+"""
+Start routes:app under uvicorn, optionally with several worker processes.
+
+Run from the backend directory:
+    GEOMAX_WORKERS=4 GEOMAX_POSITION_STORE=sqlite python serve.py
+
+Only positions are shared between workers. State kept per process (zones,
+the label and access caches, the cooperative graph) is turned off with
+the sqlite store, see config.PER_PROCESS_STATE.
+
+uvicorn --workers binds the shared listening socket without a protocol
+number, so asyncio does not enable TCP_NODELAY on accepted connections
+and responses written in two parts stall on delayed ACKs (about 40 ms).
+The socket is bound here with TCP_NODELAY set, which accepted
+connections inherit, and handed to uvicorn by file descriptor.
+"""
+import socket
+
+import uvicorn
+
+from core import config
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    if config.SERVER_WORKERS > 1 and config.PER_PROCESS_STATE:
+        raise SystemExit("GEOMAX_WORKERS > 1 needs GEOMAX_POSITION_STORE=sqlite to share positions")
+    if config.SERVER_WORKERS <= 1:
+        uvicorn.run("routes:app", host=config.SERVER_HOST, port=config.SERVER_PORT)
+        return
+    sock = bind_socket(config.SERVER_HOST, config.SERVER_PORT)
+    uvicorn.run("routes:app", fd=sock.fileno(), workers=config.SERVER_WORKERS)
+
+
+if __name__ == "__main__":
+    main()
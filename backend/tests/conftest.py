@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Modules import each other from the backend directory, as when run by uvicorn
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_client(tmp_path_factory):
+    """TestClient of routes.app with every file it writes under a temporary directory"""
+    directory = tmp_path_factory.mktemp("app")
+    os.environ.update({
+        "GEOMAX_DB_PATH": str(directory / "dictionaries.db"),
+        "GEOMAX_HISTORY_DIR": str(directory / "history"),
+        "GEOMAX_UPDATE_LOG_DIR": str(directory / "update_log"),
+        "GEOMAX_SNAPSHOT_PATH": str(directory / "positions.snapshot"),
+    })
+    from fastapi.testclient import TestClient
+    import routes
+    with TestClient(routes.app) as client:
+        yield client
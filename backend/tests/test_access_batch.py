@@ -0,0 +1,38 @@
+import pytest
+
+from data.repositories.label_repository import LabelRepository
+from domain.entities.label import Label
+from domain.interactors.label_interactor import LabelInteractor
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return LabelRepository(db_path=str(tmp_path / "dictionaries.db"), cache_size=100, cache_ttl=300.0,
+                           negative_ttl=30.0)
+
+
+@pytest.fixture
+def interactor(repository):
+    interactor = LabelInteractor(repository=repository, access_cache_size=100, access_cache_ttl=300.0)
+    for label_id in ("a", "b", "c"):
+        interactor.create(Label(id=label_id, own_password="own", com_password="com"))
+    return interactor
+
+
+def test_deleted_label_is_not_served_from_the_access_cache(interactor):
+    assert interactor.access_batch("a", ["b", "c"], "com", "own") == {"b": True, "c": True}
+    # Memoized for the next call
+    assert interactor._access_cache.get(("a", "b", "com", "own"))[0] is True
+    interactor.delete("b")
+    assert interactor.access_batch("a", ["b", "c"], "com", "own") == {"b": False, "c": True}
+    interactor.delete("a")
+    assert interactor.access_batch("a", ["c"], "com", "own") == {"c": False}
+
+
+def test_import_drops_cached_labels(repository, interactor):
+    assert repository.get_by_id("a").own_password == "own"
+    assert interactor.access_batch("a", ["b"], "com", "own") == {"b": True}
+    interactor.import_labels([{"id": "a", "own_password": "new", "com_password": "com"}])
+    assert repository.get_by_id("a").own_password == "new"
+    assert interactor.access_batch("a", ["b"], "com", "own") == {"b": False}
+
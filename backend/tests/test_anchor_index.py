@@ -0,0 +1,28 @@
+from core import geometry
+from data.repositories import position_repository
+from data.repositories.position_repository import PositionRepository
+from domain.entities.position import Position
+
+
+def test_full_solver_cache_is_replaced_not_cleared(monkeypatch):
+    monkeypatch.setattr(position_repository, "SOLVER_CACHE_LIMIT", 2)
+    repository = PositionRepository()
+    repository.save_position(Position(label_id="a", x=0.0, y=0.0, is_base_station=True))
+    base_stations, solver_cache = repository.get_anchor_index()
+    solver_cache.update({("a", "b", "c"): None, ("a", "c", "d"): None, ("b", "c", "d"): None})
+
+    fresh_stations, fresh_cache = repository.get_anchor_index()
+    # A solver still holding the full cache keeps reading all of its entries
+    assert len(solver_cache) == 3
+    assert fresh_cache == {}
+    assert fresh_stations is base_stations
+    assert repository.get_anchor_index()[1] is fresh_cache
+
+
+def test_cached_coefficients_remember_collinear_anchors(monkeypatch):
+    base_stations = {bs_id: {"x": x, "y": 0.0} for bs_id, x in (("a", 0.0), ("b", 5.0), ("c", 10.0))}
+    solver_cache = {}
+    assert geometry._cached_coefficients(solver_cache, ("a", "b", "c"), base_stations) is None
+    assert solver_cache == {("a", "b", "c"): None}
+    monkeypatch.setattr(geometry, "trilateration_coefficients", None)
+    assert geometry._cached_coefficients(solver_cache, ("a", "b", "c"), base_stations) is None
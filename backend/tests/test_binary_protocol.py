@@ -0,0 +1,60 @@
+import pytest
+
+from core.binary_protocol import HEADER, MAX_NEIGHBORS, PAIR, decode_updates, encode_frame
+from core.errors import MalformedFrameException
+from udp_server import UpdateDatagramProtocol
+
+FRAMES = [
+    (1, {10: -40, 11: -128, 4294967295: 127}),
+    (2, {}),
+    (4294967295, {10: -70}),
+]
+
+
+def encoded() -> bytes:
+    return b"".join(encode_frame(tag_id, neighbors) for tag_id, neighbors in FRAMES)
+
+
+def test_round_trip():
+    assert decode_updates(encoded()) == [
+        (str(tag_id), {str(nid): rssi for nid, rssi in neighbors.items()}) for tag_id, neighbors in FRAMES
+    ]
+    assert decode_updates(b"") == []
+
+
+def test_encoder_keeps_at_most_max_neighbors():
+    frame = encode_frame(7, {i: -50 for i in range(MAX_NEIGHBORS + 10)})
+    assert len(frame) == HEADER.size + PAIR.size * MAX_NEIGHBORS
+    assert len(decode_updates(frame)[0][1]) == MAX_NEIGHBORS
+
+
+@pytest.mark.parametrize("cut", range(1, len(encoded())))
+def test_truncated_input_is_rejected_unless_cut_between_frames(cut):
+    data = encoded()[:cut]
+    # Byte offsets where frames 1 and 2 end
+    boundaries = [len(b"".join(encode_frame(*frame) for frame in FRAMES[:n])) for n in (1, 2)]
+    if cut in boundaries:
+        assert len(decode_updates(data)) == boundaries.index(cut) + 1
+    else:
+        with pytest.raises(MalformedFrameException):
+            decode_updates(data)
+
+
+def test_count_past_the_end_is_rejected():
+    with pytest.raises(MalformedFrameException):
+        decode_updates(HEADER.pack(1, 3) + PAIR.pack(10, -40))
+
+
+def test_malformed_datagram_is_counted_and_dropped():
+    handled = []
+    protocol = UpdateDatagramProtocol(handled.append)
+    protocol.datagram_received(encoded()[:-1], ("127.0.0.1", 9000))
+    protocol.datagram_received(encoded(), ("127.0.0.1", 9000))
+    assert (protocol.datagrams, protocol.malformed) == (2, 1)
+    assert [[update.id for update in updates] for updates in handled] == [["1", "2", "4294967295"]]
+
+
+def test_truncated_body_is_a_bad_request(app_client):
+    response = app_client.post("/update/binary", content=encode_frame(1, {10: -40})[:-2])
+    assert response.status_code == 400
+    assert "truncated" in response.json()["detail"]
@@ -0,0 +1,83 @@
+import struct
+import threading
+
+import numpy as np
+
+from data.repositories.columnar_position_repository import ColumnarPositionRepository
+from domain.entities.position import Position
+from domain.interactors.label_interactor import LabelInteractor
+
+
+def make_position(label_id: str, x: float = 1.0, y: float = 2.0) -> Position:
+    return Position(label_id=label_id, x=x, y=y, updated_at=0.0)
+
+
+def test_columns_skip_deleted_slots():
+    repository = ColumnarPositionRepository(capacity=4)
+    repository.save_positions([make_position(f"tag-{i}", x=i) for i in range(6)])
+    repository.remove_position("tag-2")
+    columns = repository.get_columns()
+    active = columns.active
+    assert sorted(columns.label_ids[active].tolist()) == ["tag-0", "tag-1", "tag-3", "tag-4", "tag-5"]
+    assert dict(zip(columns.label_ids[active].tolist(), columns.x[active].tolist()))["tag-4"] == 4.0
+    assert repository.export_state().columns.active.all()
+
+
+def test_columns_are_not_changed_by_later_writes():
+    repository = ColumnarPositionRepository()
+    repository.save_position(make_position("tag-1"))
+    columns = repository.get_columns()
+    repository.remove_position("tag-1")
+    repository.save_position(make_position("tag-2", x=9.0))
+    assert columns.label_ids.tolist() == ["tag-1"]
+    assert columns.x.tolist() == [1.0]
+    assert columns.active.tolist() == [True]
+
+
+def test_columns_are_shared_until_the_next_write():
+    repository = ColumnarPositionRepository()
+    repository.save_positions([make_position(f"tag-{i}", x=i) for i in range(3)])
+    first = repository.get_columns()
+    second = repository.get_columns()
+    assert np.shares_memory(first.x, second.x)
+    assert not first.x.flags.writeable
+    repository.save_position(make_position("tag-0", x=7.0))
+    third = repository.get_columns()
+    assert not np.shares_memory(first.x, third.x)
+    assert first.x.tolist() == [0.0, 1.0, 2.0]
+    assert third.x.tolist() == [7.0, 1.0, 2.0]
+
+
+def test_binary_reads_during_deletes_and_saves():
+    repository = ColumnarPositionRepository()
+    interactor = LabelInteractor(repository=None, position_repository=repository)
+    repository.save_positions([make_position(f"tag-{i}") for i in range(2000)])
+    stop = threading.Event()
+    errors = []
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            label_id = f"tag-{i % 2000}"
+            repository.remove_position(label_id)
+            repository.save_position(make_position(label_id))
+            i += 1
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        for _ in range(200):
+            try:
+                data = interactor.get_all_positions_binary()
+                positions = interactor.get_all_positions()
+            except Exception as e:
+                errors.append(e)
+                break
+            count, = struct.unpack_from("<I", data)
+            label_ids = data[4 + 9 * count:].decode().split("\n")
+            assert len(label_ids) == count
+            assert all(position["label_id"] for position in positions)
+    finally:
+        stop.set()
+        writer.join()
+    assert not errors
@@ -0,0 +1,64 @@
+import math
+import time
+
+import pytest
+
+from core.calibration import DEFAULT_PATH_LOSS_EXPONENT, DEFAULT_TX_POWER
+from core.cooperative import CooperativeLocalizer
+
+ANCHORS = {
+    "a": {"x": 0.0, "y": 0.0},
+    "b": {"x": 20.0, "y": 0.0},
+    "c": {"x": 0.0, "y": 20.0},
+    "d": {"x": 20.0, "y": 20.0},
+}
+TAGS = {"direct": (5.0, 5.0), "indirect": (12.0, 6.0)}
+
+
+def rssi(p, q) -> int:
+    distance = math.hypot(p[0] - q[0], p[1] - q[1])
+    return round(DEFAULT_TX_POWER - 10 * DEFAULT_PATH_LOSS_EXPONENT * math.log10(distance))
+
+
+def observe_all(localizer: CooperativeLocalizer, now: float = 0.0):
+    points = {bs_id: (bs["x"], bs["y"]) for bs_id, bs in ANCHORS.items()}
+    # "direct" hears three anchors, "indirect" only two plus "direct"
+    localizer.observe("direct", {bs_id: rssi(TAGS["direct"], points[bs_id]) for bs_id in ("a", "b", "c")}
+                      | {"indirect": rssi(TAGS["direct"], TAGS["indirect"])}, now=now)
+    localizer.observe("indirect", {bs_id: rssi(TAGS["indirect"], points[bs_id]) for bs_id in ("b", "d")}
+                      | {"direct": rssi(TAGS["direct"], TAGS["indirect"])}, now=now)
+
+
+def test_tag_without_three_anchors_is_placed():
+    localizer = CooperativeLocalizer()
+    observe_all(localizer)
+    stored = {}
+    solution = localizer.solve(ANCHORS, now=0.0, store=stored.update)
+    assert list(solution.positions) == ["indirect"]
+    assert stored == solution.positions
+    assert solution.positions["indirect"] == pytest.approx(TAGS["indirect"], abs=2.0)
+
+
+def test_tag_forgotten_during_a_solve_is_not_returned():
+    localizer = CooperativeLocalizer()
+    observe_all(localizer)
+    stored = {}
+
+    def locate(label_id):
+        # Stands in for a delete arriving while the solve runs
+        localizer.forget("indirect")
+        return None
+
+    solution = localizer.solve(ANCHORS, locate=locate, now=0.0, store=stored.update)
+    assert "indirect" not in solution.positions
+    assert stored == {}
+    assert "indirect" not in localizer._solution
+
+
+def test_expired_reports_leave_the_graph():
+    localizer = CooperativeLocalizer(max_age=5.0)
+    now = time.time()
+    observe_all(localizer, now)
+    assert list(localizer.solve(ANCHORS, now=now).positions) == ["indirect"]
+    assert localizer.solve(ANCHORS, now=now + 10.0).positions == {}
+    assert len(localizer) == 0
@@ -0,0 +1,44 @@
+import sqlite3
+
+import pytest
+
+from data.datasource import BULK_CHUNK, DictionaryManager
+
+
+def rows(count: int, prefix: str = "label"):
+    for i in range(count):
+        yield {"id": f"{prefix}-{i}", "own_password": "own", "com_password": "com"}
+
+
+@pytest.fixture(params=[False, True], ids=["fresh", "pooled"])
+def manager(tmp_path, request):
+    return DictionaryManager(db_path=str(tmp_path / "dictionaries.db"), pooled=request.param)
+
+
+def count_rows(manager: DictionaryManager) -> int:
+    with sqlite3.connect(manager.db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM dictionaries").fetchone()[0]
+
+
+def test_upsert_reports_inserted_updated_and_invalid_rows(manager):
+    manager.upsert_dictionaries(rows(3))
+    report = manager.upsert_dictionaries([*rows(5), {"id": "no-password"}])
+    assert (report["inserted"], report["updated"], report["failed"]) == (2, 3, 1)
+    assert report["errors"][0]["row"] == 5
+    assert count_rows(manager) == 5
+
+
+def test_upsert_is_one_transaction(manager):
+    def failing_stream():
+        yield from rows(2 * BULK_CHUNK + 10)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    report = manager.upsert_dictionaries(failing_stream())
+    # Earlier chunks are rolled back with the rest, so nothing counts as written
+    assert report["inserted"] == report["updated"] == 0
+    assert report["failed"] == 2 * BULK_CHUNK + 10
+    assert count_rows(manager) == 0
+
+    report = manager.upsert_dictionaries(rows(2 * BULK_CHUNK + 10))
+    assert report["inserted"] == 2 * BULK_CHUNK + 10
+    assert count_rows(manager) == 2 * BULK_CHUNK + 10
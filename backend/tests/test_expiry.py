@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from core.cooperative import CooperativeLocalizer
+from core.timing_wheel import TimingWheel
+from data.repositories.columnar_position_repository import ColumnarPositionRepository
+from data.repositories.history_repository import PositionHistoryRepository
+from data.repositories.position_repository import PositionRepository
+from data.repositories.zone_repository import ZoneRepository
+from domain.entities.position import Position
+from domain.entities.zone import Zone
+from domain.interactors.label_interactor import LabelInteractor
+
+
+def test_timing_wheel_expires_keys_at_their_latest_deadline():
+    wheel = TimingWheel(resolution=1.0, slots=8, now=0.0)
+    wheel.schedule("a", 5.0)
+    wheel.schedule("b", 5.0)
+    wheel.schedule("b", 30.0)
+    wheel.schedule("c", 3.0)
+    wheel.discard("c")
+    assert wheel.advance(4.0) == []
+    assert wheel.advance(6.0) == ["a"]
+    # "b" went a few turns around the wheel first
+    assert wheel.advance(29.0) == []
+    assert wheel.advance(30.0) == ["b"]
+    assert len(wheel) == 0
+
+
+@pytest.fixture(params=[PositionRepository, ColumnarPositionRepository])
+def setup(request, tmp_path):
+    positions = request.param(ttl=10.0)
+    history = PositionHistoryRepository(directory=str(tmp_path), retention_seconds=None)
+    positions.subscribe(history.record, local_only=True)
+    zones = ZoneRepository()
+    zones.save_zone(Zone(id="dock", polygon=[(0, 0), (10, 0), (10, 10), (0, 10)]))
+    events = []
+    zones.subscribe(events.append)
+    interactor = LabelInteractor(repository=None, position_repository=positions, zone_repository=zones,
+                                 cooperative=CooperativeLocalizer(max_age=1000.0))
+    return interactor, positions, history, zones, events
+
+
+def report(interactor: LabelInteractor, label_id: str, at: float, is_base_station: bool = False):
+    position = Position(label_id=label_id, x=5.0, y=5.0, is_base_station=is_base_station, updated_at=at)
+    interactor.position_repository.save_position(position)
+    interactor.zone_repository.evaluate(label_id, position.x, position.y, timestamp=at)
+
+
+def test_expiry_cascades_to_history_zones_and_deltas(setup):
+    interactor, positions, history, zones, events = setup
+    now = time.time()
+    report(interactor, "silent", now)
+    report(interactor, "active", now)
+    report(interactor, "anchor", now, is_base_station=True)
+    cursor = positions.sequence
+    report(interactor, "active", now + 8.0)
+    interactor.cooperative.observe("silent", {"active": -60}, now=now)
+    interactor.cooperative.observe("active", {"silent": -60}, now=now)
+
+    assert interactor.expire_stale(now + 5.0) == []
+    assert interactor.expire_stale(now + 11.0) == ["silent"]
+    assert positions.get_position("silent") is None
+    assert positions.get_position("active") is not None
+    assert positions.get_position("anchor") is not None
+    # Live clients get the removal, the history ring is dropped, the zone sees an exit
+    assert positions.get_changes_since(cursor)[1] == ["silent"]
+    assert "silent" not in history._slots
+    assert zones.get_members("dock") == ["active", "anchor"]
+    assert [(event.type, event.label_id) for event in events if event.type == "exit"] == [("exit", "silent")]
+    assert len(interactor.cooperative) == 1
+
+    assert interactor.expire_stale(now + 19.0) == ["active"]
+    assert interactor.expire_stale(now + 1000.0) == []
+    assert positions.get_position("anchor") is not None
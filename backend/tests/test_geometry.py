@@ -0,0 +1,66 @@
+import math
+import random
+
+import pytest
+
+from core.calibration import DEFAULT_PATH_LOSS_EXPONENT, DEFAULT_TX_POWER
+from core.geometry import (SOLVER_LEAST_SQUARES, SOLVER_TRILATERATION, calculate_position_from_signals,
+                           calculate_positions_batch)
+
+BASE_STATIONS = {
+    "1": {"x": 0.0, "y": 0.0},
+    "2": {"x": 10.0, "y": 0.0},
+    "3": {"x": 0.0, "y": 10.0},
+    "4": {"x": 10.0, "y": 10.0, "tx_power": -62, "n": 2.4},
+}
+
+
+def random_signals(rng: random.Random) -> dict:
+    return {bs_id: rng.randint(-95, -40) for bs_id in rng.sample(list(BASE_STATIONS) + ["unknown"], 4)}
+
+
+def assert_same(scalar, batch):
+    if scalar is None or batch is None:
+        assert scalar is None and batch is None
+    else:
+        assert scalar == pytest.approx(batch, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("solver", [SOLVER_TRILATERATION, SOLVER_LEAST_SQUARES])
+@pytest.mark.parametrize("cached", [False, True])
+def test_scalar_and_batch_solvers_agree(solver, cached):
+    rng = random.Random(7)
+    signals_list = [random_signals(rng) for _ in range(200)]
+    scalar_cache = {} if cached else None
+    batch_cache = {} if cached else None
+    batch = calculate_positions_batch(signals_list, BASE_STATIONS, solver=solver, solver_cache=batch_cache)
+    for signals, batch_position in zip(signals_list, batch):
+        scalar = calculate_position_from_signals(signals, BASE_STATIONS, solver=solver, solver_cache=scalar_cache)
+        assert_same(scalar, batch_position)
+
+
+@pytest.mark.parametrize("solver", [SOLVER_TRILATERATION, SOLVER_LEAST_SQUARES])
+@pytest.mark.parametrize("cached", [False, True])
+@pytest.mark.parametrize("rssi", [-200, -129, 128, 200, 1000])
+def test_out_of_range_rssi_is_clamped_by_both_solvers(solver, cached, rssi):
+    signals = {"1": rssi, "2": -70, "3": -70, "4": -75}
+    clamped = dict(signals, **{"1": max(-128, min(rssi, 127))})
+    cache = {} if cached else None
+    expected = calculate_position_from_signals(clamped, BASE_STATIONS, solver=solver)
+    scalar = calculate_position_from_signals(signals, BASE_STATIONS, solver=solver, solver_cache=cache)
+    batch, = calculate_positions_batch([signals], BASE_STATIONS, solver=solver, solver_cache=cache)
+    assert_same(scalar, expected)
+    assert_same(batch, expected)
+
+
+def test_position_of_a_noise_free_tag():
+    x, y = 3.0, 4.0
+    signals = {}
+    for bs_id, bs in BASE_STATIONS.items():
+        tx_power = bs.get("tx_power", DEFAULT_TX_POWER)
+        n = bs.get("n", DEFAULT_PATH_LOSS_EXPONENT)
+        distance = ((bs["x"] - x) ** 2 + (bs["y"] - y) ** 2) ** 0.5
+        signals[bs_id] = tx_power - 10 * n * math.log10(distance)
+    signals = {bs_id: round(value) for bs_id, value in signals.items()}
+    position = calculate_position_from_signals(signals, BASE_STATIONS, solver=SOLVER_LEAST_SQUARES)
+    assert position == pytest.approx((x, y), abs=1.0)
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+from data.repositories.history_repository import (INDEX_DTYPE, SEGMENT_DTYPE, PositionHistoryRepository,
+                                                  disk_key)
+from domain.entities.position import Position
+
+
+def point(label_id: str, x: float) -> Position:
+    return Position(label_id=label_id, x=x, y=-x)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return PositionHistoryRepository(directory=str(tmp_path), capacity=8, max_tags=16, segment_seconds=100,
+                                     retention_seconds=None)
+
+
+def files(history, suffix):
+    return sorted(name for name in os.listdir(history.directory) if name.endswith(suffix))
+
+
+def test_history_comes_from_the_index_and_the_ring(history):
+    for t in range(10):
+        for tag in ("tag-a", "tag-b", "tag-c"):
+            history.record(tag, point(tag, t), timestamp=95.0 + t)
+        if t in (3, 6):
+            history.flush()
+    timestamps, xs, ys = history.get_history("tag-b")
+    assert timestamps.tolist() == [95.0 + t for t in range(10)]
+    assert xs.tolist() == list(range(10))
+    assert history.get_history("tag-b", start=99.0, end=101.0)[0].tolist() == [99.0, 100.0, 101.0]
+
+    history.flush()
+    # Two segments, each flush added one run per tag to each segment it touched
+    assert files(history, ".idx") == ["positions-0.idx", "positions-100.idx"]
+    entries = np.fromfile(os.path.join(history.directory, "positions-0.idx"), dtype=INDEX_DTYPE)
+    assert len(entries) == 2 * 3
+    assert history.get_history("tag-b")[0].tolist() == [95.0 + t for t in range(10)]
+
+
+def test_queries_only_read_the_runs_of_the_tag(history, monkeypatch):
+    for t in range(5):
+        for tag in ("tag-a", "tag-b"):
+            history.record(tag, point(tag, t), timestamp=10.0 + t)
+    history.flush()
+    history.forget("tag-a")
+    entries = history._segment_index(os.path.join(history.directory, "positions-0.bin")).runs(b"tag-a")
+    assert entries["count"].tolist() == [5]
+    assert history.get_history("tag-a")[0].tolist() == [10.0, 11.0, 12.0, 13.0, 14.0]
+
+
+def test_long_ids_are_hashed_not_truncated(history):
+    long_a = "warehouse-7/" + "x" * 20 + "-a"
+    long_b = "warehouse-7/" + "x" * 20 + "-b"
+    assert disk_key(long_a) != disk_key(long_b)
+    assert len(disk_key(long_a)) <= SEGMENT_DTYPE["label_id"].itemsize
+    history.record(long_a, point(long_a, 1.0), timestamp=1.0)
+    history.record(long_b, point(long_b, 2.0), timestamp=1.0)
+    history.flush()
+    history.forget(long_a)
+    history.forget(long_b)
+    assert history.get_history(long_a)[1].tolist() == [1.0]
+    assert history.get_history(long_b)[1].tolist() == [2.0]
+
+
+def test_segment_without_index_is_scanned_and_indexed_on_the_next_flush(history):
+    legacy = np.zeros(3, dtype=SEGMENT_DTYPE)
+    legacy["label_id"] = [b"tag-a", b"tag-b", b"tag-a"]
+    legacy["timestamp"] = [1.0, 2.0, 3.0]
+    legacy["x"] = [1.0, 2.0, 3.0]
+    path = os.path.join(history.directory, "positions-0.bin")
+    with open(path, "wb") as f:
+        f.write(legacy.tobytes())
+        # A record cut short by a crash
+        f.write(b"\0" * 5)
+    assert history.get_history("tag-a")[0].tolist() == [1.0, 3.0]
+
+    history.record("tag-a", point("tag-a", 4.0), timestamp=4.0)
+    history.flush()
+    history.forget("tag-a")
+    assert os.path.getsize(path) == 4 * SEGMENT_DTYPE.itemsize
+    index = history._segment_index(path)
+    assert index.covered == 4
+    assert history.get_history("tag-a")[0].tolist() == [1.0, 3.0, 4.0]
@@ -0,0 +1,27 @@
+import asyncio
+
+from data.repositories.label_repository import LabelRepository
+from data.repositories.position_repository import PositionRepository
+from domain.entities.label import Label
+from domain.entities.update_request import UpdateRequest
+from domain.interactors.ingest_pipeline import IngestPipeline
+from domain.interactors.label_interactor import LabelInteractor
+
+
+def test_only_updates_of_known_tags_are_passed_on(tmp_path):
+    interactor = LabelInteractor(repository=LabelRepository(db_path=str(tmp_path / "dictionaries.db")),
+                                 position_repository=PositionRepository())
+    interactor.create(Label(id="known", own_password="own", com_password="com"))
+    applied = []
+
+    async def run():
+        pipeline = IngestPipeline(interactor, workers=1, on_applied=applied.append)
+        await pipeline.start()
+        assert pipeline.submit(UpdateRequest(id="known", neighbors={"x": -60}))
+        assert pipeline.submit(UpdateRequest(id="unknown", neighbors={"x": -60}))
+        await pipeline.stop()
+        return pipeline.stats()
+
+    stats = asyncio.run(run())
+    assert [update.id for update in applied] == ["known"]
+    assert (stats["processed"], stats["not_found"]) == (2, 1)
@@ -0,0 +1,70 @@
+import pytest
+
+from core.errors import NotFoundLabelException
+from data.repositories.label_repository import LabelRepository
+from domain.entities.access_request import AccessRequest
+from domain.entities.label import Label
+from domain.interactors.label_interactor import LabelInteractor
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return LabelRepository(db_path=str(tmp_path / "dictionaries.db"), cache_size=100, cache_ttl=300.0,
+                           negative_ttl=30.0)
+
+
+@pytest.fixture
+def interactor(repository):
+    interactor = LabelInteractor(repository=repository, access_cache_size=100, access_cache_ttl=300.0)
+    for label_id in ("a", "b", "c"):
+        interactor.create(Label(id=label_id, own_password="own", com_password="com"))
+    return interactor
+
+
+def access(interactor: LabelInteractor, own_id: str, neighbour_id: str):
+    interactor.access_request(AccessRequest(own_id=own_id, neighbour_id=neighbour_id,
+                                            com_password="com", own_password="own"))
+
+
+def test_deleted_label_is_not_served_from_the_label_cache(repository, interactor):
+    access(interactor, "a", "b")
+    assert repository.get_by_id("b") is not None
+    interactor.delete("b")
+    assert repository.get_by_id("b") is None
+    with pytest.raises(NotFoundLabelException):
+        access(interactor, "a", "b")
+
+
+def test_known_missing_label_is_cached_until_created(repository, interactor):
+    assert repository.get_by_id("d") is None
+    hits = repository.cache_stats()["hits"]
+    assert repository.get_by_id("d") is None
+    assert repository.cache_stats()["hits"] == hits + 1
+    interactor.create(Label(id="d", own_password="own", com_password="com"))
+    assert repository.get_by_id("d").id == "d"
+
+
+@pytest.mark.parametrize("lookup", ["get_by_id", "get_by_ids"])
+def test_read_racing_a_delete_does_not_cache_the_deleted_label(repository, interactor, monkeypatch, lookup):
+    repository._cache.clear()
+    manager = repository._manager
+    read_one, read_many = manager.get_dictionary_by_id, manager.get_dictionaries_by_ids
+
+    def delete_after(read):
+        def racing(*args):
+            raw = read(*args)
+            # The row was read, then a delete lands before the reader fills the cache
+            repository.delete("b")
+            return raw
+        return racing
+
+    monkeypatch.setattr(manager, "get_dictionary_by_id", delete_after(read_one))
+    monkeypatch.setattr(manager, "get_dictionaries_by_ids", delete_after(read_many))
+    if lookup == "get_by_id":
+        assert repository.get_by_id("b") is not None
+    else:
+        assert repository.get_by_ids(["b"])["b"] is not None
+    monkeypatch.undo()
+    assert repository.get_by_id("b") is None
+    with pytest.raises(NotFoundLabelException):
+        access(interactor, "a", "b")
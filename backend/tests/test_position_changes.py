@@ -0,0 +1,106 @@
+import pytest
+
+import data.repositories.position_repository as position_module
+from data.repositories.columnar_position_repository import ColumnarPositionRepository
+from data.repositories.position_repository import PositionRepository
+from data.repositories.sqlite_position_repository import SqlitePositionRepository
+from domain.entities.position import Position
+from domain.interactors.label_interactor import LabelInteractor
+
+
+@pytest.fixture(params=["dict", "columnar", "sqlite"])
+def repository(request, tmp_path):
+    if request.param == "columnar":
+        return ColumnarPositionRepository()
+    if request.param == "sqlite":
+        return SqlitePositionRepository(db_path=str(tmp_path / "positions.db"))
+    return PositionRepository()
+
+
+def save(repository, label_id: str, x: float):
+    repository.save_position(Position(label_id=label_id, x=x, y=0.0, updated_at=0.0))
+
+
+def changes(repository, since: int) -> dict:
+    return LabelInteractor(repository=None, position_repository=repository).get_position_changes(since)
+
+
+def test_changes_carry_moves_and_removals(repository):
+    save(repository, "a", 1.0)
+    save(repository, "b", 2.0)
+    cursor = changes(repository, 0)["cursor"]
+    save(repository, "a", 3.0)
+    repository.remove_position("b")
+    delta = changes(repository, cursor)
+    assert delta["full"] is False
+    assert [(position["label_id"], position["x"]) for position in delta["changed"]] == [("a", 3.0)]
+    assert delta["removed"] == ["b"]
+    assert delta["cursor"] > cursor
+
+    # Nothing new after the returned cursor
+    assert changes(repository, delta["cursor"]) == {"cursor": delta["cursor"], "full": False, "changed": [],
+                                                    "removed": []}
+
+
+def test_tag_saved_again_after_removal_is_no_longer_a_tombstone(repository):
+    save(repository, "a", 1.0)
+    cursor = changes(repository, 0)["cursor"]
+    repository.remove_position("a")
+    save(repository, "a", 5.0)
+    delta = changes(repository, cursor)
+    assert [position["label_id"] for position in delta["changed"]] == ["a"]
+    assert delta["removed"] == []
+
+
+def test_unknown_cursors_get_a_full_snapshot(repository):
+    save(repository, "a", 1.0)
+    cursor = changes(repository, 0)["cursor"]
+    for since in (0, cursor + 1000):
+        delta = changes(repository, since)
+        assert delta["full"] is True
+        assert [position["label_id"] for position in delta["changed"]] == ["a"]
+
+
+def test_compacted_tombstones_send_old_cursors_back_to_a_snapshot(monkeypatch):
+    monkeypatch.setattr(position_module, "TOMBSTONE_LIMIT", 2)
+    repository = PositionRepository()
+    for label_id in "abcd":
+        save(repository, label_id, 1.0)
+    cursor = changes(repository, 0)["cursor"]
+    repository.remove_position("a")
+    assert changes(repository, cursor)["removed"] == ["a"]
+    repository.remove_position("b")
+    repository.remove_position("c")
+    delta = changes(repository, cursor)
+    assert delta["full"] is True
+    assert [position["label_id"] for position in delta["changed"]] == ["d"]
+    # Cursors taken after the compaction keep getting deltas
+    repository.remove_position("d")
+    assert changes(repository, delta["cursor"])["removed"] == ["d"]
+
+
+def test_tombstones_reach_other_workers_through_the_sqlite_store(tmp_path):
+    path = str(tmp_path / "positions.db")
+    writer = SqlitePositionRepository(db_path=path)
+    reader = SqlitePositionRepository(db_path=path)
+    save(writer, "a", 1.0)
+    save(writer, "b", 1.0)
+    cursor = changes(reader, 0)["cursor"]
+    writer.remove_position("a")
+    delta = changes(reader, cursor)
+    assert delta["removed"] == ["a"]
+    assert delta["changed"] == []
+
+
+def test_positions_endpoint_serves_deltas_with_removals(app_client):
+    import routes
+    save(routes.position_repository, "http-a", 1.0)
+    save(routes.position_repository, "http-b", 2.0)
+    response = app_client.get("/api/positions", params={"since": 0})
+    cursor = response.json()["cursor"]
+    assert response.headers["etag"] == f'"{cursor}"'
+    routes.position_repository.remove_position("http-b")
+    delta = app_client.get("/api/positions", params={"since": cursor}).json()
+    assert delta["full"] is False
+    assert delta["removed"] == ["http-b"]
+    assert delta["changed"] == []
@@ -0,0 +1,72 @@
+import math
+import random
+import time
+
+import numpy as np
+import pytest
+
+from core.spatial import SpatialGrid
+
+
+def brute_nearest(points, x, y, k, exclude=None):
+    found = sorted((math.hypot(px - x, py - y), key) for key, (px, py) in points.items() if key != exclude)
+    return [key for _, key in found[:k]]
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(1)
+    grid = SpatialGrid(cell_size=5.0)
+    points = {f"t{i}": (rng.uniform(0, 200), rng.uniform(0, 200)) for i in range(500)}
+    for key, (x, y) in points.items():
+        grid.update(key, x, y)
+    for _ in range(50):
+        x, y, k = rng.uniform(-50, 250), rng.uniform(-50, 250), rng.randint(1, 20)
+        assert [key for key, _ in grid.nearest(x, y, k)] == brute_nearest(points, x, y, k)
+    assert [key for key, _ in grid.nearest(10, 10, 3, exclude="t0")] == brute_nearest(points, 10, 10, 3, "t0")
+
+
+def test_far_outlier_and_large_k_stay_fast():
+    grid = SpatialGrid(cell_size=5.0)
+    grid.update("near", 1.0, 1.0)
+    grid.update("outlier", 1e5, 1e5)
+    start = time.perf_counter()
+    # k above the point count used to scan every ring out to the outlier
+    assert [key for key, _ in grid.nearest(0.0, 0.0, 10)] == ["near", "outlier"]
+    assert [key for key, _ in grid.nearest(1e5, -1e5, 1)] == ["near"]
+    assert time.perf_counter() - start < 0.5
+
+
+def test_extent_shrinks_when_the_outlier_leaves():
+    grid = SpatialGrid(cell_size=5.0)
+    grid.update("a", 1.0, 1.0)
+    grid.update("b", 12.0, 1.0)
+    grid.update("outlier", 1e7, 1e7)
+    grid.remove("outlier")
+    assert [key for key, _ in grid.nearest(0.0, 0.0, 5)] == ["a", "b"]
+    assert grid._bounds() == (0, 0, 2, 0)
+    grid.update("b", -20.0, 1.0)
+    assert grid._bounds() == (-4, 0, 0, 0)
+
+
+def test_non_finite_points_are_not_indexed():
+    grid = SpatialGrid(cell_size=5.0)
+    grid.update("a", 1.0, 1.0)
+    grid.update("a", math.nan, 1.0)
+    grid.update("b", math.inf, 0.0)
+    assert len(grid) == 0
+    grid.update_many(["c", "d"], np.array([2.0, math.nan]), np.array([2.0, 3.0]))
+    assert len(grid) == 1
+    assert grid.nearest(math.nan, 0.0, 1) == []
+    assert grid.within_radius(0.0, 0.0, math.inf) == []
+    assert grid.within_box(-math.inf, -math.inf, math.inf, math.inf) == []
+
+
+@pytest.mark.parametrize("path", [
+    "/api/positions/near?x=inf&y=0&radius=5",
+    "/api/positions/near?x=0&y=0&radius=inf",
+    "/api/positions/within?x0=0&y0=0&x1=nan&y1=1",
+    "/api/positions/nearest?x=-inf&y=0",
+    "/api/positions/clusters?x0=0&y0=0&x1=inf&y1=1&zoom=0",
+])
+def test_non_finite_query_is_rejected(app_client, path):
+    assert app_client.get(path).status_code == 422
@@ -0,0 +1,59 @@
+import math
+
+import pytest
+
+from core import config
+from core.errors import InvalidZoneException
+from data.repositories.zone_repository import ZoneRepository
+from domain.entities.zone import Zone
+
+
+def square(zone_id: str, x0: float, y0: float, size: float) -> Zone:
+    return Zone(id=zone_id, polygon=[(x0, y0), (x0 + size, y0), (x0 + size, y0 + size), (x0, y0 + size)])
+
+
+def test_large_zone_is_kept_out_of_the_grid():
+    zones = ZoneRepository(cell_size=5.0, max_cells=100)
+    zones.save_zone(square("small", 0, 0, 10))
+    zones.save_zone(square("large", 0, 0, 5000))
+    assert len(zones._cells) == 9
+    assert zones.zones_at(3, 3) == {"small", "large"}
+    assert zones.zones_at(4000, 4000) == {"large"}
+    assert zones.zones_at(6000, 1) == frozenset()
+
+    events = zones.evaluate("tag-1", 4000, 4000)
+    assert [(event.type, event.zone_id) for event in events] == [("enter", "large")]
+    assert zones.remove_zone("large")
+    assert zones.zones_at(4000, 4000) == frozenset()
+
+
+def test_replacing_a_large_zone_with_a_small_one_reindexes_it():
+    zones = ZoneRepository(cell_size=5.0, max_cells=100)
+    zones.save_zone(square("zone", 0, 0, 5000))
+    zones.save_zone(square("zone", 100, 100, 10))
+    assert zones.zones_at(4000, 4000) == frozenset()
+    assert zones.zones_at(105, 105) == {"zone"}
+
+
+@pytest.mark.parametrize("zone", [
+    square("wide", 0, 0, 20000),
+    Zone(id="nan", polygon=[(0, 0), (math.nan, 0), (0, 1)]),
+    Zone(id="inf", polygon=[(0, 0), (math.inf, 0), (0, 1)]),
+])
+def test_unreasonable_zones_are_rejected(zone):
+    zones = ZoneRepository(max_extent=10000.0)
+    with pytest.raises(InvalidZoneException):
+        zones.save_zone(zone)
+    assert zones.get_all_zones() == []
+
+
+@pytest.mark.parametrize("method, path", [
+    ("post", "/api/zones"),
+    ("get", "/api/zones"),
+    ("delete", "/api/zones/dock"),
+    ("get", "/api/zones/events"),
+])
+def test_zone_routes_are_off_without_per_process_state(app_client, monkeypatch, method, path):
+    monkeypatch.setattr(config, "PER_PROCESS_STATE", False)
+    body = {"id": "dock", "polygon": [[0, 0], [1, 0], [1, 1]]} if method == "post" else None
+    assert app_client.request(method, path, json=body).status_code == 409
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import socket
+from typing import Callable, List, Tuple
+
+from core.binary_protocol import decode_updates
+from core.errors import MalformedFrameException
+from domain.entities.update_request import UpdateRequest
+
+logger = logging.getLogger(__name__)
+
+
+def updates_from_frames(data: bytes) -> List[UpdateRequest]:
+    """Decode binary frames into UpdateRequests"""
+    return [
+        UpdateRequest(id=tag_id, neighbors=neighbors)
+        for tag_id, neighbors in decode_updates(data)
+    ]
+
+
+class UpdateDatagramProtocol(asyncio.DatagramProtocol):
+    """Accepts binary update frames (see core.binary_protocol) as UDP datagrams"""
+    def __init__(self, handle: Callable[[List[UpdateRequest]], object]):
+        self.handle = handle
+        self.datagrams = 0
+        self.malformed = 0
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        self.datagrams += 1
+        try:
+            updates = updates_from_frames(data)
+        except MalformedFrameException as e:
+            self.malformed += 1
+            logger.warning(f"Malformed update datagram from {addr[0]}: {e.message}")
+            return
+        if updates:
+            self.handle(updates)
+
+
+async def start_udp_listener(host: str, port: int, handle: Callable[[List[UpdateRequest]], object]):
+    """Start listening, returns (transport, protocol)"""
+    loop = asyncio.get_running_loop()
+    # reuse_port lets every uvicorn worker bind the same port, the kernel spreads datagrams
+    return await loop.create_datagram_endpoint(lambda: UpdateDatagramProtocol(handle), local_addr=(host, port),
+                                               reuse_port=hasattr(socket, "SO_REUSEPORT"))
@@ -3,17 +3,32 @@
 #include <esp_now.h>
 #include <esp_wifi.h> 
 #include <ArduinoJson.h>
+#include <WiFiUdp.h>
 #include <map> 
 
 const char* wifiSSID = "corpnet";  
 const char* wifiPassword = "hornet228"; 
 const String serverUrl = "http://10.37.152.60:8000";  
+const char* serverHost = "10.37.152.60";
+// Binary UDP updates, the server must run with GEOMAX_UDP_PORT set to udpPort
+const bool useBinaryUdp = false;
+const uint16_t udpPort = 9000;
+// Check newly seen neighbors with /access/batch before using their RSSI
+const bool useAccessCheck = true;
+// Refused neighbors are checked again after this long, a denial may be transient
+// (server restart, label not created yet, the server's 30 s negative cache)
+const unsigned long deniedRetryMs = 60000;
+
+WiFiUDP udp;
 
 String myID; 
 
 uint8_t broadcastAddress[] = {0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF};
 
 std::map<String, int> neighbors;
+// Seen but not yet authorized, and refused neighbors with the millis() of the refusal
+std::map<String, int> pendingNeighbors;
+std::map<String, unsigned long> deniedNeighbors;
 
 void setup() {
   Serial.begin(115200);
@@ -67,11 +82,19 @@ void OnDataRecv(const esp_now_recv_info_t *info, const uint8_t *incomingData, in
 
   if (receivedID != myID) {
     if (neighbors.find(receivedID) == neighbors.end()) {
-      //if (access(receivedID)) {
+      if (!useAccessCheck) {
         neighbors[receivedID] = rssi;
-      //} else {
-       // Serial.println("Access denied for " + receivedID);
-      //}
+      } else {
+        auto denied = deniedNeighbors.find(receivedID);
+        if (denied != deniedNeighbors.end() && millis() - denied->second < deniedRetryMs) {
+          return;
+        }
+        if (denied != deniedNeighbors.end()) {
+          deniedNeighbors.erase(denied);
+        }
+        // Authorized in one request from loop(), see accessBatch()
+        pendingNeighbors[receivedID] = rssi;
+      }
     } else {
       neighbors[receivedID] = rssi;  
     }
@@ -112,6 +135,52 @@ bool access(String seenID) {
   return false;
 }
 
+// Authorize all pending neighbors with one /access/batch request
+void accessBatch() {
+  // Forget expired refusals so the map does not grow with every tag ever refused
+  for (auto it = deniedNeighbors.begin(); it != deniedNeighbors.end();) {
+    if (millis() - it->second >= deniedRetryMs) {
+      it = deniedNeighbors.erase(it);
+    } else {
+      ++it;
+    }
+  }
+  if (pendingNeighbors.empty()) return;
+
+  HTTPClient http;
+  http.begin(serverUrl + "/access/batch");
+  http.addHeader("Content-Type", "application/json");
+
+  DynamicJsonDocument doc(2048);
+  doc["my_id"] = myID;
+  JsonArray seen = doc.createNestedArray("seen_ids");
+  for (auto& pair : pendingNeighbors) {
+    seen.add(pair.first);
+  }
+  String json;
+  serializeJson(doc, json);
+
+  int httpCode = http.POST(json);
+  if (httpCode != 200) {
+    return;  // keep them pending and retry on the next round
+  }
+
+  DynamicJsonDocument response(2048);
+  if (deserializeJson(response, http.getString())) {
+    return;
+  }
+  JsonObject results = response["results"];
+  for (auto& pair : pendingNeighbors) {
+    if (results[pair.first] | false) {
+      neighbors[pair.first] = pair.second;
+    } else {
+      Serial.println("Access denied for " + pair.first);
+      deniedNeighbors[pair.first] = millis();
+    }
+  }
+  pendingNeighbors.clear();
+}
+
 void update() {
   std::vector<std::pair<String, int>> topNeighbors;
   for (auto& pair : neighbors) {
@@ -143,13 +212,51 @@ void update() {
   }
 }
 
+// Frame: uint32 tag id, uint8 count, count x (uint32 neighbor id, int8 rssi), little-endian
+void updateBinary() {
+  std::vector<std::pair<String, int>> topNeighbors;
+  for (auto& pair : neighbors) {
+    topNeighbors.push_back(pair);
+  }
+  std::sort(topNeighbors.begin(), topNeighbors.end(), [](const auto& a, const auto& b) {
+    return a.second > b.second; 
+  });
+  if (topNeighbors.size() > 3) topNeighbors.resize(3);
+
+  if (topNeighbors.empty()) return;
+
+  uint8_t frame[5 + 5 * 3];
+  uint32_t id = strtoul(myID.c_str(), NULL, 10);
+  memcpy(frame, &id, 4);
+  frame[4] = topNeighbors.size();
+  size_t len = 5;
+  for (auto& pair : topNeighbors) {
+    uint32_t neighborId = strtoul(pair.first.c_str(), NULL, 10);
+    int8_t rssi = pair.second;
+    memcpy(frame + len, &neighborId, 4);
+    memcpy(frame + len + 4, &rssi, 1);
+    len += 5;
+  }
+
+  udp.beginPacket(serverHost, udpPort);
+  udp.write(frame, len);
+  udp.endPacket();
+}
+
 void loop() {
   delay(random(0, 100)); 
   esp_now_send(broadcastAddress, (uint8_t *)myID.c_str(), myID.length());
 
   static unsigned long lastUpdate = 0;
   if (millis() - lastUpdate > 5000) { // можно менять в зависимости от точности устройства.
-    update();
+    if (useAccessCheck) {
+      accessBatch();
+    }
+    if (useBinaryUdp) {
+      updateBinary();
+    } else {
+      update();
+    }
     lastUpdate = millis();
   }
 